@@ -1,10 +1,24 @@
+import itertools
 import json
+import os
+import threading
 import requests
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Annotated, Callable, Dict, Iterator, List, Optional, Tuple
 from dataclasses import dataclass
 from config import Config
-from openai import OpenAI
+from archive import ColdArchive
+from persistence import DebouncedWriter, atomic_write, file_lock, get_write_queue
+from history_store import ColumnarHistory
+from duration_model import DurationModel, DurationPrediction
+from distractions import get_distraction_classifier
+from serialization import dumps, loads
+from llm_cache import cache_key, get_response_cache
+from streaming import collect_stream, extract_first_json, extract_json, stream_text
+from resilience import CircuitOpenError, acall_with_resilience, call_with_resilience, get_breaker
+from llm_clients import api_base_url, get_client_registry
+from openai import BadRequestError
+from pydantic import Field, TypeAdapter, ValidationError
 
 @dataclass
 class TaskContext:
@@ -19,12 +33,20 @@ class TaskContext:
 @dataclass
 class SessionRecommendation:
     """Recommendation for focus session parameters"""
-    focus_duration: int  # minutes
-    break_duration: int  # minutes
+    focus_duration: Annotated[int, Field(ge=15, le=60)]  # minutes
+    break_duration: Annotated[int, Field(ge=3, le=15)]  # minutes
     reasoning: str
-    confidence: float  # 0-1
+    confidence: Annotated[float, Field(ge=0, le=1)]
     suggested_approach: str
 
+# Built once: model output is validated against the compiled core schema, and the
+# same schema is what the endpoint is asked to constrain generation to
+RECOMMENDATION_ADAPTER = TypeAdapter(SessionRecommendation)
+RECOMMENDATION_SCHEMA = {
+    **RECOMMENDATION_ADAPTER.json_schema(),
+    "additionalProperties": False,
+}
+
 @dataclass
 class PerformanceData:
     """User performance data for adaptation"""
@@ -41,16 +63,30 @@ class AdaptiveAgent:
     def __init__(self):
         # Load API credentials securely
         self.api_key = Config.NEMOTRON_API_KEY
-        self.api_url = Config.NEMOTRON_API_URL
+        self.api_url = api_base_url()
         self.model = Config.NEMOTRON_MODEL
-        self.user_history = self._load_user_history()
+        self.breaker = get_breaker(f"nemotron:{self.model}")
+        self.history_file = Config.USER_HISTORY_FILE
+        self.history_journal = Config.HISTORY_JOURNAL_FILE
+        self.archive = ColdArchive("user_performance", time_key="timestamp")
+        self._history_lock = threading.Lock()
+        self._history_writer = None
+        if Config.HISTORY_DEBOUNCE_SECONDS > 0:
+            self._history_writer = DebouncedWriter(self._append_history_journal, Config.HISTORY_DEBOUNCE_SECONDS)
+        with file_lock(self.history_file):
+            self.user_history = self._load_user_history()
+            self._ensure_pattern_index(self.user_history)
+            self._fold_history_journal(self.user_history)
+        self.distraction_classifier = get_distraction_classifier()
+        self.history_columns = ColumnarHistory.from_sessions(
+            self.user_history.get("sessions", []), classify=self.distraction_classifier.categorize
+        )
+        self.weekly_window = self.history_columns.window(timedelta(days=7).total_seconds())
+        self.duration_model = DurationModel.from_sessions(self.user_history.get("sessions", []))
         
-        # Initialize OpenAI client for NVIDIA API (only if credentials available)
+        # Shared OpenAI client for NVIDIA API (only if credentials available)
         if self.api_key and self.api_key != "your_nvidia_api_key_here":
-            self.client = OpenAI(
-                base_url=self.api_url,
-                api_key=self.api_key
-            )
+            self.client = get_client_registry().openai_client(self.api_url, self.api_key)
         else:
             self.client = None
             print("AI service not configured - using fallback logic")
@@ -58,8 +94,8 @@ class AdaptiveAgent:
     def _load_user_history(self) -> Dict:
         """Load user's historical performance data"""
         try:
-            with open("user_performance.json", "r") as f:
-                return json.load(f)
+            with open(self.history_file, "r") as f:
+                return loads(f.read())
         except FileNotFoundError:
             return {
                 "sessions": [],
@@ -68,37 +104,261 @@ class AdaptiveAgent:
                 "success_rates": {}
             }
     
-    def _save_user_history(self):
-        """Save user's performance data"""
-        with open("user_performance.json", "w") as f:
-            json.dump(self.user_history, f, indent=2, default=str)
+    def _record_session(self, session_data: Dict):
+        """Persist one new session: debounced NDJSON tail, or straight into the snapshot
+        
+        With write-behind enabled the snapshot is written by the background
+        writer thread, so disk latency never blocks the caller.
+        """
+        if self._history_writer is not None:
+            self._history_writer.submit(session_data)
+        elif Config.WRITE_BEHIND:
+            get_write_queue().submit(self._write_history_sessions, session_data)
+        else:
+            self._write_history_sessions([session_data])
+    
+    # The history files are shared by every agent (one per Streamlit session) and
+    # by the compaction job, so they are only ever changed under ``file_lock`` and
+    # by merging new sessions into what is on disk, never by writing one agent's
+    # in-memory copy over it.
+    
+    def _write_history_sessions(self, sessions: List[Dict]):
+        """Merge sessions into the on-disk snapshot, folding in and truncating the tail"""
+        with file_lock(self.history_file):
+            history = self._load_user_history()
+            self._ensure_pattern_index(history)
+            self._fold_history_journal(history)
+            self._merge_sessions(history, sessions)
+            # Older snapshots carried a timestamp watermark; deduplication replaces it
+            history.pop("folded_through", None)
+            atomic_write(self.history_file, dumps(history))
+            if os.path.exists(self.history_journal):
+                os.remove(self.history_journal)
+    
+    def _append_history_journal(self, sessions: List[Dict]):
+        """Commit a coalesced batch of sessions to the NDJSON tail
+        
+        Once the tail holds ``HISTORY_SNAPSHOT_EVERY`` sessions (from any
+        agent) it is folded into a fresh snapshot and truncated. Tail
+        records the snapshot already holds (a crash before the truncate)
+        are dropped by the timestamp deduplication in ``_merge_sessions``.
+        Batches from different agents commit out of creation order, so
+        nothing is skipped just for being older than the snapshot.
+        """
+        with file_lock(self.history_file):
+            with open(self.history_journal, "a+") as f:
+                f.write("".join(dumps(session) + "\n" for session in sessions))
+                f.seek(0)
+                tail_length = sum(1 for line in f if line.strip())
+        if tail_length >= Config.HISTORY_SNAPSHOT_EVERY:
+            self._write_history_sessions([])
+    
+    def _fold_history_journal(self, history: Dict):
+        """Fold NDJSON tail sessions the snapshot does not already hold into ``history``"""
+        try:
+            with open(self.history_journal, "r") as f:
+                lines = [line for line in f if line.strip()]
+        except FileNotFoundError:
+            return
+        
+        sessions = []
+        for line in lines:
+            try:
+                sessions.append(loads(line))
+            except json.JSONDecodeError:
+                print(f"Skipping unreadable history line in {self.history_journal}")
+        self._merge_sessions(history, sessions)
+    
+    def _merge_sessions(self, history: Dict, sessions: List[Dict]):
+        """Append sessions ``history`` does not already hold, keeping its pattern index current
+        
+        Sessions are keyed by timestamp; ones older than ``compacted_before``
+        have already been archived (and indexed) and are dropped.
+        """
+        known = {session["timestamp"] for session in history.get("sessions", [])}
+        compacted_before = history.get("compacted_before")
+        for session in sessions:
+            if session["timestamp"] in known or (compacted_before and session["timestamp"] < compacted_before):
+                continue
+            known.add(session["timestamp"])
+            history.setdefault("sessions", []).append(session)
+            self._index_session(history, session)
+    
+    def flush(self):
+        """Write any debounced history sessions now"""
+        if self._history_writer is not None:
+            self._history_writer.flush()
+    
+    def _iter_sessions(self, since: datetime = None):
+        """Iterate stored sessions, reading archived ones only when ``since`` predates the hot history"""
+        compacted_before = self.user_history.get("compacted_before")
+        if compacted_before and (since is None or since < datetime.fromisoformat(compacted_before)):
+            yield from self.archive.iter_records(start=since)
+        
+        for session in self.user_history.get("sessions", []):
+            if since is None or datetime.fromisoformat(session["timestamp"]) > since:
+                yield session
+    
+    # Sampling parameters shared by every Nemotron call
+    COMPLETION_PARAMS = {
+        "temperature": 0.6,  # Balanced creativity and consistency
+        "top_p": 0.95,       # High nucleus sampling for quality
+        "max_tokens": 2048,   # Reasonable limit for productivity advice
+        "frequency_penalty": 0.1,  # Slight penalty to avoid repetition
+        "presence_penalty": 0.1,   # Encourage diverse responses
+    }
+    
+    # Recommendations are a few short fields: a low token cap and cooler sampling
+    STRUCTURED_PARAMS = {
+        **COMPLETION_PARAMS,
+        "temperature": 0.3,
+        "max_tokens": Config.STRUCTURED_MAX_TOKENS,
+    }
+    
+    # Cleared the first time the endpoint rejects ``response_format``
+    _json_schema_supported = True
+    
+    @staticmethod
+    def _rejects_response_format(error: BadRequestError) -> bool:
+        """Whether a 400 is the endpoint refusing ``response_format``, not some other bad request"""
+        detail = f"{error} {error.body or ''}".lower()
+        return "response_format" in detail or "json_schema" in detail
     
-    def _call_nemotron(self, messages: List[Dict]) -> Optional[str]:
-        """Make API call to Nemotron using NVIDIA API"""
+    def _call_nemotron(self, messages: List[Dict], use_cache: bool = True, params: Dict = None) -> Optional[str]:
+        """Make API call to Nemotron using NVIDIA API
+        
+        Identical requests are answered from the shared response cache
+        unless ``use_cache`` is False. ``params`` replaces the default
+        sampling parameters.
+        """
         if not self.client:
             return None
         
+        params = params or self.COMPLETION_PARAMS
+        cache = get_response_cache() if use_cache else None
+        if cache is not None:
+            key = cache_key(self.model, params, messages)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.6,  # Balanced creativity and consistency
-                top_p=0.95,       # High nucleus sampling for quality
-                max_tokens=2048,   # Reasonable limit for productivity advice
-                frequency_penalty=0.1,  # Slight penalty to avoid repetition
-                presence_penalty=0.1,   # Encourage diverse responses
-                stream=False  # Non-streaming for simpler handling
+            completion = call_with_resilience(
+                lambda timeout: self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    stream=False,
+                    timeout=timeout,
+                    **params
+                ),
+                self.breaker
             )
             
-            return completion.choices[0].message.content
+            content = completion.choices[0].message.content
             
+        except BadRequestError as e:
+            if "response_format" in params and self._rejects_response_format(e):
+                # Endpoint does not support schema-constrained output; callers fall back to prompting
+                AdaptiveAgent._json_schema_supported = False
+            else:
+                print("Error calling AI service: BadRequestError")
+            return None
+        except CircuitOpenError:
+            # Service is known to be down: go straight to the rule-based fallback
+            return None
         except Exception as e:
             # Don't expose API details in error messages
             print(f"Error calling AI service: {type(e).__name__}")
             return None
+        
+        if cache is not None and content:
+            cache.put(key, content)
+        return content
     
-    def analyze_task_and_plan_session(self, task_context: TaskContext) -> SessionRecommendation:
-        """Analyze task and recommend optimal session parameters"""
+    def stream_nemotron(self, messages: List[Dict], use_cache: bool = True, params: Dict = None) -> Iterator[str]:
+        """Stream a Nemotron call, yielding visible text chunks as they arrive
+        
+        ``<think>`` sections are filtered out. Yields nothing when the API
+        is not configured or the request fails.
+        """
+        if not self.client:
+            return
+        
+        params = params or self.COMPLETION_PARAMS
+        cache = get_response_cache() if use_cache else None
+        
+        def open_stream():
+            stream = call_with_resilience(
+                lambda timeout: self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    stream=True,
+                    timeout=timeout,
+                    **params
+                ),
+                self.breaker
+            )
+            try:
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                stream.close()
+        
+        yield from stream_text(open_stream, cache, cache_key(self.model, params, messages) if cache is not None else None)
+    
+    async def _call_nemotron_async(self, messages: List[Dict], use_cache: bool = True,
+                                   params: Dict = None) -> Optional[str]:
+        """Async ``_call_nemotron`` on the shared AsyncOpenAI client
+        
+        At most LLM_MAX_CONCURRENCY calls are in flight per event loop.
+        Cancelling the calling task cancels the HTTP request.
+        """
+        if not self.client:
+            return None
+        
+        params = params or self.COMPLETION_PARAMS
+        cache = get_response_cache() if use_cache else None
+        if cache is not None:
+            key = cache_key(self.model, params, messages)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        
+        registry = get_client_registry()
+        client = registry.async_openai_client(self.api_url, self.api_key)
+        try:
+            async with registry.async_limiter():
+                completion = await acall_with_resilience(
+                    lambda timeout: client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        stream=False,
+                        timeout=timeout,
+                        **params
+                    ),
+                    self.breaker
+                )
+            content = completion.choices[0].message.content
+        except BadRequestError as e:
+            if "response_format" in params and self._rejects_response_format(e):
+                AdaptiveAgent._json_schema_supported = False
+            else:
+                print("Error calling AI service: BadRequestError")
+            return None
+        except CircuitOpenError:
+            return None
+        except Exception as e:
+            # Don't expose API details in error messages
+            print(f"Error calling AI service: {type(e).__name__}")
+            return None
+        
+        if cache is not None and content:
+            cache.put(key, content)
+        return content
+    
+    def _plan_context(self, task_context: TaskContext) -> Tuple[str, str, DurationPrediction]:
+        """Prompt context, history summary and local duration prediction for a task"""
         
         # Prepare context for Nemotron
         context_info = f"""
@@ -114,73 +374,209 @@ class AdaptiveAgent:
             context_info += f"Deadline: {time_until_deadline.days} days away\n"
         
         # Add historical performance data
-        history_summary = self._get_performance_summary(task_context.task_type)
+        history_summary = self._get_performance_summary(
+            task_context.task_type, task_context.difficulty, task_context.energy_level
+        )
+        
+        prediction = self.duration_model.predict(task_context.difficulty, task_context.energy_level)
+        return context_info, history_summary, prediction
+    
+    def analyze_task_and_plan_session(self, task_context: TaskContext) -> SessionRecommendation:
+        """Analyze task and recommend optimal session parameters"""
+        context_info, history_summary, prediction = self._plan_context(task_context)
+        
+        # Durations come from the local model once it has enough evidence;
+        # the LLM then only writes the explanation and approach
+        if prediction.confidence >= Config.DURATION_MODEL_MIN_CONFIDENCE:
+            return self._explain_model_recommendation(task_context, prediction, context_info, history_summary)
+        
+        recommendation = self._request_recommendation(context_info, history_summary)
+        if recommendation is None:
+            return self._get_fallback_recommendation(task_context)
+        return recommendation
+    
+    async def analyze_task_and_plan_session_async(self, task_context: TaskContext) -> SessionRecommendation:
+        """Async ``analyze_task_and_plan_session``"""
+        context_info, history_summary, prediction = self._plan_context(task_context)
+        
+        if prediction.confidence >= Config.DURATION_MODEL_MIN_CONFIDENCE:
+            messages = self._explanation_messages(prediction, context_info, history_summary)
+            response = await self._call_nemotron_async(messages)
+            text = self._extract_json(response, accept=lambda value: "reasoning" in value) or {}
+            return self._explained_recommendation(task_context, prediction, text)
+        
+        structured = Config.STRUCTURED_OUTPUT and AdaptiveAgent._json_schema_supported
+        messages, params = self._recommendation_request(context_info, history_summary, structured)
+        response = await self._call_nemotron_async(messages, params=params)
+        if structured and response is None and not AdaptiveAgent._json_schema_supported:
+            messages, params = self._recommendation_request(context_info, history_summary, structured=False)
+            response = await self._call_nemotron_async(messages, params=params)
+        
+        recommendation = self._parse_recommendation(response)
+        if recommendation is None:
+            return self._get_fallback_recommendation(task_context)
+        return recommendation
+    
+    RECOMMENDATION_SYSTEM_PROMPT = """/no_think
+You are a productivity coach. Recommend focus session parameters for the task.
+Shorter sessions for low energy or review work, longer for writing and deep work; weigh urgency and the user's history.
+focus_duration: 15-60 minutes. break_duration: 3-15 minutes. confidence: 0-1. Keep reasoning and suggested_approach to one sentence each."""
+    
+    RECOMMENDATION_EXAMPLE = [
+        {
+            "role": "user",
+            "content": "Task: Draft report intro\nDifficulty: 4/5\nEnergy Level: 2/5\nTask Type: writing\nUrgency: 3/5\n\nHistorical Performance:\nNo historical data available for this task type."
+        },
+        {
+            "role": "assistant",
+            "content": '{"focus_duration": 20, "break_duration": 5, "reasoning": "Hard writing on low energy needs a short first block", "confidence": 0.6, "suggested_approach": "Outline three key points before writing sentences"}'
+        },
+    ]
+    
+    def _request_recommendation(self, context_info: str, history_summary: str) -> Optional[SessionRecommendation]:
+        """Ask the LLM for a validated recommendation, or None
+        
+        Uses schema-constrained output (``response_format``) when enabled
+        and supported by the endpoint, otherwise a one-shot JSON prompt.
+        Either way the answer is validated once with the precompiled
+        ``RECOMMENDATION_ADAPTER``; invalid output goes to the rule-based
+        fallback rather than being retried.
+        """
+        if Config.STRUCTURED_OUTPUT and AdaptiveAgent._json_schema_supported:
+            messages, params = self._recommendation_request(context_info, history_summary, structured=True)
+            response = self._call_nemotron(messages, params=params)
+            if response is not None or AdaptiveAgent._json_schema_supported:
+                return self._parse_recommendation(response)
+        
+        messages, params = self._recommendation_request(context_info, history_summary, structured=False)
+        value = self._call_nemotron_json(messages, accept=lambda value: "focus_duration" in value, params=params)
+        return self._parse_recommendation(value)
+    
+    def _recommendation_request(self, context_info: str, history_summary: str,
+                                structured: bool) -> Tuple[List[Dict], Dict]:
+        """Messages and parameters for a schema-constrained or one-shot recommendation call"""
+        user_message = {
+            "role": "user",
+            "content": f"{context_info.strip()}\n\nHistorical Performance:\n{history_summary}"
+        }
+        
+        if structured:
+            params = {
+                **self.STRUCTURED_PARAMS,
+                "response_format": {
+                    "type": "json_schema",
+                    "json_schema": {"name": "session_recommendation", "schema": RECOMMENDATION_SCHEMA, "strict": True},
+                },
+            }
+            return [{"role": "system", "content": self.RECOMMENDATION_SYSTEM_PROMPT}, user_message], params
         
         messages = [
+            {"role": "system", "content": self.RECOMMENDATION_SYSTEM_PROMPT + "\nReply with only a JSON object like the example."},
+            *self.RECOMMENDATION_EXAMPLE,
+            user_message,
+        ]
+        return messages, self.STRUCTURED_PARAMS
+    
+    @staticmethod
+    def _parse_recommendation(value) -> Optional[SessionRecommendation]:
+        """Validate a JSON string or dict against ``SessionRecommendation``"""
+        if value is None:
+            return None
+        try:
+            if isinstance(value, str):
+                try:
+                    return RECOMMENDATION_ADAPTER.validate_json(value)
+                except ValidationError:
+                    # Tolerate a think section or prose around the object
+                    value = extract_json(value)
+                    if value is None:
+                        return None
+            return RECOMMENDATION_ADAPTER.validate_python(value)
+        except ValidationError:
+            print("AI recommendation did not match the expected schema - using fallback logic")
+            return None
+    
+    @staticmethod
+    def _extract_json(response: Optional[str], accept: Callable[[Dict], bool] = None) -> Optional[Dict]:
+        """First JSON object in a model response, skipping <think> sections, or None"""
+        if not response:
+            return None
+        return extract_json(response, accept)
+    
+    def _call_nemotron_json(self, messages: List[Dict], accept: Callable[[Dict], bool] = None,
+                            params: Dict = None) -> Optional[Dict]:
+        """Stream a call and stop at the first complete acceptable JSON object
+        
+        The stream is cancelled as soon as the object closes, so trailing
+        tokens are never generated. The object is cached on its own, which
+        also answers later non-streaming calls with the same prompt.
+        """
+        if not self.client:
+            return None
+        
+        params = params or self.COMPLETION_PARAMS
+        cache = get_response_cache()
+        key = cache_key(self.model, params, messages)
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return self._extract_json(cached, accept)
+        
+        result = extract_first_json(self.stream_nemotron(messages, use_cache=False, params=params), accept)
+        if cache is not None and result is not None:
+            cache.put(key, json.dumps(result))
+        return result
+    
+    def _explain_model_recommendation(self, task_context: TaskContext, prediction: DurationPrediction,
+                                      context_info: str, history_summary: str) -> SessionRecommendation:
+        """Recommendation with durations from the local model and text from the LLM when available"""
+        messages = self._explanation_messages(prediction, context_info, history_summary)
+        text = self._call_nemotron_json(messages, accept=lambda value: "reasoning" in value) or {}
+        return self._explained_recommendation(task_context, prediction, text)
+    
+    def _explanation_messages(self, prediction: DurationPrediction, context_info: str,
+                              history_summary: str) -> List[Dict]:
+        focus_duration = prediction.focus_duration
+        break_duration = max(3, focus_duration // 5)
+        
+        return [
             {
                 "role": "system",
-                "content": """You are an intelligent productivity coach that analyzes tasks and recommends optimal focus session parameters. 
-
-Consider these factors:
-1. Task complexity and type (writing needs longer sessions, reviewing can be shorter)
-2. User energy level (lower energy = shorter sessions)
-3. Urgency and deadlines
-4. Historical performance patterns
-5. Optimal focus-to-break ratios
-
-Provide specific recommendations for:
-- Focus duration (15-60 minutes)
-- Break duration (3-15 minutes)
-- Reasoning for your recommendation
-- Suggested approach for the session
+                "content": """You are an intelligent productivity coach. The session length has already been chosen from the user's own history; do not change it. Briefly explain why it suits this task and give one specific approach for the session.
 
 Format your response as JSON:
 {
-    "focus_duration": 25,
-    "break_duration": 5,
     "reasoning": "explanation",
-    "confidence": 0.8,
     "suggested_approach": "specific advice"
 }"""
             },
             {
                 "role": "user",
-                "content": f"""Analyze this task and recommend optimal session parameters:
-
-{context_info}
+                "content": f"""{context_info}
+Planned session: {focus_duration} minutes of focus, then a {break_duration}-minute break.
 
 Historical Performance:
 {history_summary}
 
-Provide a JSON response with your recommendation."""
+Provide a JSON response."""
             }
         ]
-        
-        response = self._call_nemotron(messages)
-        
-        if response:
-            try:
-                # Extract JSON from response (handle <think> tags)
-                import re
-                json_match = re.search(r'\{.*\}', response, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group()
-                    recommendation = json.loads(json_str)
-                    return SessionRecommendation(
-                        focus_duration=recommendation.get("focus_duration", 25),
-                        break_duration=recommendation.get("break_duration", 5),
-                        reasoning=recommendation.get("reasoning", "Standard Pomodoro session"),
-                        confidence=recommendation.get("confidence", 0.5),
-                        suggested_approach=recommendation.get("suggested_approach", "Focus on the task")
-                    )
-                else:
-                    # No JSON found, use fallback
-                    return self._get_fallback_recommendation(task_context)
-            except json.JSONDecodeError as e:
-                print(f"JSON parsing error: {e}")
-                return self._get_fallback_recommendation(task_context)
-        
-        return self._get_fallback_recommendation(task_context)
+    
+    @staticmethod
+    def _explained_recommendation(task_context: TaskContext, prediction: DurationPrediction,
+                                  text: Dict) -> SessionRecommendation:
+        focus_duration = prediction.focus_duration
+        return SessionRecommendation(
+            focus_duration=focus_duration,
+            break_duration=max(3, focus_duration // 5),
+            reasoning=text.get("reasoning") or (
+                f"{focus_duration}-minute blocks are predicted to work best at difficulty "
+                f"{task_context.difficulty}/5 and energy {task_context.energy_level}/5, "
+                f"learned across {prediction.sessions} of your sessions with this length"
+            ),
+            confidence=prediction.confidence,
+            suggested_approach=text.get("suggested_approach") or "Focus on completing the core task"
+        )
     
     def _get_fallback_recommendation(self, task_context: TaskContext) -> SessionRecommendation:
         """Fallback recommendation when Nemotron is unavailable"""
@@ -213,37 +609,115 @@ Provide a JSON response with your recommendation."""
             suggested_approach="Focus on completing the core task"
         )
     
-    def _get_performance_summary(self, task_type: str) -> str:
+    @staticmethod
+    def _energy_band(energy_level: int) -> str:
+        """Coarse energy band used to key the pattern index"""
+        if energy_level <= 2:
+            return "low"
+        if energy_level >= 4:
+            return "high"
+        return "medium"
+    
+    @classmethod
+    def _index_session(cls, history: Dict, session: Dict):
+        """Fold one session into the task_patterns / success_rates index of ``history``"""
+        task_type = session.get("task_type", "general")
+        completed = int(bool(session.get("completed", False)))
+        pattern = history["task_patterns"].setdefault(task_type, {"difficulty": {}, "energy": {}})
+        rates = history["success_rates"].setdefault(task_type, {
+            "overall": 0.0, "difficulty": {}, "energy": {}
+        })
+        buckets = [
+            (pattern, "totals", None),
+            (pattern["difficulty"], str(session.get("difficulty", 3)), rates["difficulty"]),
+            (pattern["energy"], cls._energy_band(session.get("energy_before", 3)), rates["energy"]),
+        ]
+        for parent, key, rate_parent in buckets:
+            totals = parent.setdefault(key, {
+                "sessions": 0, "completed": 0, "duration": 0, "focus_rating": 0, "energy_after": 0
+            })
+            totals["sessions"] += 1
+            totals["completed"] += completed
+            totals["duration"] += session.get("duration", 25)
+            totals["focus_rating"] += session.get("focus_rating", 3)
+            totals["energy_after"] += session.get("energy_after", 3)
+            rate = totals["completed"] / totals["sessions"]
+            if rate_parent is None:
+                rates["overall"] = rate
+            else:
+                rate_parent[key] = rate
+    
+    def _ensure_pattern_index(self, history: Dict):
+        """Rebuild task_patterns / success_rates of ``history`` from its sessions when the index is missing"""
+        if history.get("task_patterns") and history.get("success_rates"):
+            return
+        history["task_patterns"] = {}
+        history["success_rates"] = {}
+        sessions = history.get("sessions", [])
+        if history.get("compacted_before"):
+            sessions = itertools.chain(self.archive.iter_records(), sessions)
+        for session in sessions:
+            self._index_session(history, session)
+    
+    def _get_performance_summary(self, task_type: str, difficulty: int = None, energy_level: int = None) -> str:
         """Get summary of historical performance for task type"""
-        sessions = self.user_history.get("sessions", [])
-        
-        if not sessions:
+        patterns = self.user_history.get("task_patterns", {})
+        if not patterns:
             return "No historical data available"
         
-        # Filter sessions by task type
-        type_sessions = [s for s in sessions if s.get("task_type") == task_type]
-        
-        if not type_sessions:
+        pattern = patterns.get(task_type)
+        if not pattern:
             return f"No data for {task_type} tasks"
         
-        # Calculate success rate
-        completed = sum(1 for s in type_sessions if s.get("completed", False))
-        success_rate = completed / len(type_sessions)
+        totals = pattern["totals"]
+        total = totals["sessions"]
+        success_rate = totals["completed"] / total
+        avg_duration = totals["duration"] / total
         
-        # Average session duration
-        avg_duration = sum(s.get("duration", 25) for s in type_sessions) / len(type_sessions)
-        
-        return f"""
+        summary = f"""
         {task_type.title()} tasks:
         - Success rate: {success_rate:.1%}
         - Average duration: {avg_duration:.0f} minutes
-        - Total sessions: {len(type_sessions)}
+        - Total sessions: {total}
         """
+        
+        band = self._energy_band(energy_level) if energy_level is not None else None
+        for label, bucket in (
+            (f"At difficulty {difficulty}/5", pattern["difficulty"].get(str(difficulty))),
+            (f"At {band} energy", pattern["energy"].get(band)),
+        ):
+            if bucket:
+                summary += (f"- {label}: {bucket['completed'] / bucket['sessions']:.1%} success, "
+                            f"{bucket['duration'] / bucket['sessions']:.0f} min average over {bucket['sessions']} sessions\n        ")
+        
+        return summary
     
-    def adapt_after_session(self, performance: PerformanceData, task_context: TaskContext) -> Dict:
-        """Analyze session performance and provide adaptation recommendations"""
+    def adapt_after_session(self, performance: PerformanceData, task_context: TaskContext,
+                            on_token: Callable[[str], None] = None) -> Dict:
+        """Analyze session performance and provide adaptation recommendations
+        
+        Pass ``on_token`` to receive the coach's suggestions incrementally as they stream.
+        """
+        self._store_session(performance, task_context)
+        messages = self._adaptation_messages(performance, task_context)
+        
+        # Post-session prompts embed this session's numbers and almost never repeat
+        if on_token is None:
+            adaptation_response = self._call_nemotron(messages, use_cache=False)
+        else:
+            adaptation_response = collect_stream(self.stream_nemotron(messages, use_cache=False), on_token)
         
-        # Save performance data
+        return self._adaptation_result(performance, task_context, adaptation_response)
+    
+    async def adapt_after_session_async(self, performance: PerformanceData, task_context: TaskContext) -> Dict:
+        """Async ``adapt_after_session``"""
+        self._store_session(performance, task_context)
+        messages = self._adaptation_messages(performance, task_context)
+        adaptation_response = await self._call_nemotron_async(messages, use_cache=False)
+        return self._adaptation_result(performance, task_context, adaptation_response)
+    
+    def _store_session(self, performance: PerformanceData, task_context: TaskContext) -> Dict:
+        """Record a finished session in the history, indexes and duration model"""
         session_data = {
             "timestamp": datetime.now().isoformat(),
             "task_name": task_context.task_name,
@@ -258,11 +732,16 @@ Provide a JSON response with your recommendation."""
             "what_worked": performance.what_worked
         }
         
-        self.user_history["sessions"].append(session_data)
-        self._save_user_history()
-        
-        # Get adaptation recommendation from Nemotron
-        messages = [
+        with self._history_lock:
+            self.user_history["sessions"].append(session_data)
+            self.history_columns.append(session_data)
+            self._index_session(self.user_history, session_data)
+            self.duration_model.update(session_data)
+        self._record_session(session_data)
+        return session_data
+    
+    def _adaptation_messages(self, performance: PerformanceData, task_context: TaskContext) -> List[Dict]:
+        return [
             {
                 "role": "system",
                 "content": """You are an adaptive productivity coach. Analyze the user's session performance and provide specific recommendations for improvement.
@@ -293,9 +772,9 @@ What worked: {performance.what_worked}
 Provide specific recommendations for the next session."""
             }
         ]
-        
-        adaptation_response = self._call_nemotron(messages)
-        
+    
+    def _adaptation_result(self, performance: PerformanceData, task_context: TaskContext,
+                           adaptation_response: Optional[str]) -> Dict:
         # Generate adaptation logic
         adaptation = {
             "next_session_duration": self._calculate_next_duration(performance, task_context),
@@ -350,70 +829,47 @@ Provide specific recommendations for the next session."""
     
     def _get_distraction_strategies(self, distractions: List[str]) -> List[str]:
         """Get strategies to address specific distractions"""
-        strategies = []
-        
-        for distraction in distractions:
-            if "phone" in distraction.lower():
-                strategies.append("Put phone in another room or use Do Not Disturb")
-            elif "email" in distraction.lower():
-                strategies.append("Close email and check only during breaks")
-            elif "social media" in distraction.lower():
-                strategies.append("Use website blockers or log out of social accounts")
-            elif "noise" in distraction.lower():
-                strategies.append("Use noise-canceling headphones or find a quieter space")
-        
-        return strategies
+        return self.distraction_classifier.strategies(distractions)
     
     def get_weekly_insights(self) -> Dict:
         """Generate weekly performance insights"""
         sessions = self.user_history.get("sessions", [])
         
-        if not sessions:
+        if not sessions and not self.user_history.get("compacted_before"):
             return {"message": "No data available yet"}
         
         # Get last 7 days of sessions
-        week_ago = datetime.now() - timedelta(days=7)
-        recent_sessions = [
-            s for s in sessions 
-            if datetime.fromisoformat(s["timestamp"]) > week_ago
-        ]
+        now = datetime.now()
+        week_ago = now - timedelta(days=7)
+        compacted_before = self.user_history.get("compacted_before")
+        if compacted_before and week_ago < datetime.fromisoformat(compacted_before):
+            # The window reaches into the archive: build throwaway columns for it
+            columns = ColumnarHistory.from_sessions(
+                self._iter_sessions(since=week_ago), classify=self.distraction_classifier.categorize
+            )
+            totals = columns.window(timedelta(days=7).total_seconds()).totals(now)
+        else:
+            totals = self.weekly_window.totals(now)
         
-        if not recent_sessions:
+        total_sessions = totals["sessions"]
+        if not total_sessions:
             return {"message": "No sessions in the last week"}
         
-        # Calculate insights
-        total_sessions = len(recent_sessions)
-        completed_sessions = sum(1 for s in recent_sessions if s.get("completed", False))
-        success_rate = completed_sessions / total_sessions
-        
-        avg_focus = sum(s.get("focus_rating", 3) for s in recent_sessions) / total_sessions
-        total_focus_time = sum(s.get("duration", 25) for s in recent_sessions)
-        
-        # Most common distractions
-        all_distractions = []
-        for s in recent_sessions:
-            all_distractions.extend(s.get("distractions", []))
-        
-        distraction_counts = {}
-        for distraction in all_distractions:
-            distraction_counts[distraction] = distraction_counts.get(distraction, 0) + 1
-        
-        top_distractions = sorted(distraction_counts.items(), key=lambda x: x[1], reverse=True)[:3]
-        
         return {
             "total_sessions": total_sessions,
-            "success_rate": success_rate,
-            "average_focus": avg_focus,
-            "total_focus_time": total_focus_time,
-            "top_distractions": top_distractions,
-            "recommendations": self._generate_weekly_recommendations(recent_sessions)
+            "success_rate": totals["completed"] / total_sessions,
+            "average_focus": totals["focus_rating"] / total_sessions,
+            "total_focus_time": totals["duration"],
+            "top_distractions": totals["distractions"].most_common(3),
+            "recommendations": self._generate_weekly_recommendations(totals)
         }
     
-    def _generate_weekly_recommendations(self, sessions: List[Dict]) -> List[str]:
+    def _generate_weekly_recommendations(self, totals: Dict) -> List[str]:
         """Generate weekly recommendations based on patterns"""
         recommendations = []
+        total_sessions = totals["sessions"]
         
-        success_rate = sum(1 for s in sessions if s.get("completed", False)) / len(sessions)
+        success_rate = totals["completed"] / total_sessions
         
         if success_rate < 0.5:
             recommendations.append("Consider shorter sessions to build momentum")
@@ -421,16 +877,11 @@ Provide specific recommendations for the next session."""
             recommendations.append("You're doing great! Consider longer sessions")
         
         # Check for energy patterns
-        low_energy_sessions = [s for s in sessions if s.get("energy_after", 3) <= 2]
-        if len(low_energy_sessions) > len(sessions) * 0.5:
+        if totals["low_energy"] > total_sessions * 0.5:
             recommendations.append("Focus on energy management - take longer breaks")
         
         # Check for distraction patterns
-        all_distractions = []
-        for s in sessions:
-            all_distractions.extend(s.get("distractions", []))
-        
-        if len(all_distractions) > len(sessions) * 2:
+        if totals["distraction_count"] > total_sessions * 2:
             recommendations.append("Work on reducing distractions - try a dedicated workspace")
         
-        return recommendations 
\ No newline at end of file
+        return recommendations
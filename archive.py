@@ -0,0 +1,154 @@
+import gzip
+import json
+import lzma
+import os
+from datetime import datetime
+from typing import List, Dict, Any, Iterable, Iterator
+
+from config import Config
+from storage import parse_timestamp
+from serialization import dumps, loads
+
+COMPRESSION_FORMATS = {
+    "gzip": (gzip.open, ".gz"),
+    "lzma": (lzma.open, ".xz"),
+}
+
+def merge_counts(target: Dict[str, Any], source: Dict[str, Any]) -> Dict[str, Any]:
+    """Recursively add the numeric leaves of ``source`` into ``target``"""
+    for key, value in source.items():
+        if isinstance(value, dict):
+            merge_counts(target.setdefault(key, {}), value)
+        else:
+            target[key] = target.get(key, 0) + value
+    return target
+
+def _write_json_atomic(path: str, data: Any) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+class ColdArchive:
+    """Compressed cold tier for records rolled out of a hot log
+
+    Every compaction run writes one compressed JSONL archive. A manifest
+    records each archive's min/max timestamp so range reads only open the
+    archives that overlap, and a daily aggregates file keeps the rolled-up
+    totals so most queries never need the raw archived records at all.
+    """
+
+    def __init__(self, name: str, time_key: str, directory: str = None, compression: str = None):
+        self.name = name
+        self.time_key = time_key
+        self.directory = directory or Config.ARCHIVE_DIR
+        self.compression = compression or Config.ARCHIVE_COMPRESSION
+        if self.compression not in COMPRESSION_FORMATS:
+            raise ValueError(f"Unknown archive compression: {self.compression}")
+        self.manifest_path = os.path.join(self.directory, f"{name}.manifest.json")
+        self.daily_path = os.path.join(self.directory, f"{name}.daily.json")
+
+    def _load_manifest(self) -> List[Dict[str, Any]]:
+        try:
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def _open(self, entry: Dict[str, Any], mode: str):
+        opener, _ = COMPRESSION_FORMATS[entry["compression"]]
+        return opener(os.path.join(self.directory, entry["file"]), mode)
+
+    def archive(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Stream records into a new compressed archive, returning how many were written"""
+        os.makedirs(self.directory, exist_ok=True)
+        opener, extension = COMPRESSION_FORMATS[self.compression]
+        filename = f"{self.name}-{datetime.now().strftime('%Y%m%dT%H%M%S%f')}.jsonl{extension}"
+        path = os.path.join(self.directory, filename)
+        tmp_path = f"{path}.tmp"
+
+        count = 0
+        oldest = newest = None
+        with opener(tmp_path, 'wt') as f:
+            for record in records:
+                timestamp = parse_timestamp(record[self.time_key])
+                oldest = timestamp if oldest is None or timestamp < oldest else oldest
+                newest = timestamp if newest is None or timestamp > newest else newest
+                f.write(dumps(record) + "\n")
+                count += 1
+
+        if not count:
+            os.remove(tmp_path)
+            return 0
+
+        os.replace(tmp_path, path)
+        manifest = self._load_manifest()
+        manifest.append({
+            "file": filename,
+            "compression": self.compression,
+            "min": oldest.isoformat(),
+            "max": newest.isoformat(),
+            "count": count,
+        })
+        _write_json_atomic(self.manifest_path, manifest)
+        return count
+
+    def unarchived(self, records: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Yield only records not already archived, keyed by their timestamp
+
+        A compaction run that crashed after archiving but before trimming its
+        hot file left those records in both places; this makes the rerun
+        skip them. Archives are only read when a record is not newer than
+        everything archived so far, which normally never happens.
+        """
+        manifest = self._load_manifest()
+        newest = max((parse_timestamp(entry["max"]) for entry in manifest), default=None)
+        archived = None
+        for record in records:
+            if newest is not None and parse_timestamp(record[self.time_key]) <= newest:
+                if archived is None:
+                    archived = {existing[self.time_key] for existing in self.iter_records()}
+                if record[self.time_key] in archived:
+                    continue
+            yield record
+
+    def iter_records(self, start: datetime = None, end: datetime = None) -> Iterator[Dict[str, Any]]:
+        """Yield archived records with timestamps in [start, end), oldest archive first"""
+        entries = sorted(self._load_manifest(), key=lambda entry: entry["min"])
+        for entry in entries:
+            if start is not None and parse_timestamp(entry["max"]) < start:
+                continue
+            if end is not None and parse_timestamp(entry["min"]) >= end:
+                continue
+            with self._open(entry, 'rt') as f:
+                for line in f:
+                    record = loads(line)
+                    timestamp = parse_timestamp(record[self.time_key])
+                    if start is not None and timestamp < start:
+                        continue
+                    if end is not None and timestamp >= end:
+                        continue
+                    yield record
+
+    def tail(self, count: int) -> List[Dict[str, Any]]:
+        """Return the newest ``count`` archived records"""
+        records: List[Dict[str, Any]] = []
+        for entry in sorted(self._load_manifest(), key=lambda entry: entry["max"], reverse=True):
+            if len(records) >= count:
+                break
+            with self._open(entry, 'rt') as f:
+                records = [loads(line) for line in f] + records
+        return records[-count:] if count > 0 else []
+
+    def load_daily(self) -> Dict[str, Any]:
+        """Rolled-up daily aggregates for everything archived so far"""
+        try:
+            with open(self.daily_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def merge_daily(self, daily: Dict[str, Any]) -> None:
+        """Add newly rolled-up daily aggregates to the stored ones"""
+        os.makedirs(self.directory, exist_ok=True)
+        _write_json_atomic(self.daily_path, merge_counts(self.load_daily(), daily))
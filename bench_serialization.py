@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the Focus Flow serialization paths
+
+Compares the legacy path (``.dict()`` + ``json.dump(indent=2, default=str)``)
+with the compact paths in serialization.py at realistic history sizes and
+reports bytes and time per session:
+
+    python bench_serialization.py
+    python bench_serialization.py --sizes 100 1000 10000 --blocks 4
+"""
+
+import argparse
+import json
+import time
+import warnings
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from models import FocusFlowSession, FocusSession, Goal, Reflection
+from serialization import HAS_ORJSON, dumps, session_json, session_record, sessions_json
+
+def make_sessions(count: int, blocks: int) -> List[FocusFlowSession]:
+    """Synthetic history shaped like real FocusLogger sessions"""
+    start = datetime(2024, 1, 1, 9, 0)
+    sessions = []
+    for i in range(count):
+        session_start = start + timedelta(hours=i)
+        focus_sessions = []
+        for b in range(blocks):
+            block_start = session_start + timedelta(minutes=30 * b)
+            block_id = f"session-{i}-{b}"
+            focus_sessions.append(FocusSession(
+                session_id=block_id,
+                start_time=block_start,
+                end_time=block_start + timedelta(minutes=25),
+                duration_minutes=25,
+                goal=Goal(description=f"Write section {b} of the quarterly report", created_at=block_start,
+                          completed=b % 3 != 0),
+                reflection=Reflection(session_id=block_id, goal_achieved=b % 3 != 0,
+                                      distractions="Slack notifications", what_worked="Phone in another room",
+                                      created_at=block_start + timedelta(minutes=26)),
+                completed=True,
+            ))
+        sessions.append(FocusFlowSession(
+            session_id=f"flow-{i}",
+            start_time=session_start,
+            end_time=session_start + timedelta(minutes=30 * blocks),
+            available_time_minutes=30 * blocks,
+            focus_sessions=focus_sessions,
+            total_focus_time=25 * blocks,
+            total_break_time=5 * blocks,
+            completed=True,
+        ))
+    return sessions
+
+def _legacy_file(sessions: List[FocusFlowSession]) -> str:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return json.dumps([s.dict() for s in sessions], indent=2, default=str)
+
+def _compact_file(sessions: List[FocusFlowSession]) -> str:
+    return dumps([session_record(s) for s in sessions])
+
+def _adapter_file(sessions: List[FocusFlowSession]) -> bytes:
+    return sessions_json(sessions)
+
+def _jsonl_file(sessions: List[FocusFlowSession]) -> str:
+    return "".join(session_json(s) + "\n" for s in sessions)
+
+PATHS = [
+    ("legacy .dict() + json indent=2", _legacy_file),
+    (f"model_dump + dumps ({'orjson' if HAS_ORJSON else 'json'})", _compact_file),
+    ("TypeAdapter.dump_json", _adapter_file),
+    ("model_dump_json per line (JSONL)", _jsonl_file),
+]
+
+def _time(fn: Callable, sessions: List[FocusFlowSession], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(sessions)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Focus Flow serialization")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="history sizes (number of flow sessions)")
+    parser.add_argument("--blocks", type=int, default=4, help="focus blocks per flow session")
+    parser.add_argument("--repeat", type=int, default=3, help="best-of repetitions per measurement")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        sessions = make_sessions(size, args.blocks)
+        print(f"\n{size} sessions x {args.blocks} blocks")
+        print(f"{'path':<40} {'bytes/session':>14} {'us/session':>11} {'file MB':>8}")
+        baseline_bytes = baseline_time = None
+        for name, fn in PATHS:
+            output = fn(sessions)
+            size_bytes = len(output.encode() if isinstance(output, str) else output)
+            elapsed = _time(fn, sessions, args.repeat)
+            baseline_bytes = baseline_bytes or size_bytes
+            baseline_time = baseline_time or elapsed
+            print(f"{name:<40} {size_bytes / size:>14.0f} {elapsed / size * 1e6:>11.1f} {size_bytes / 1e6:>8.2f}"
+                  f"  ({size_bytes / baseline_bytes:.0%} size, {elapsed / baseline_time:.0%} time)")
+
+if __name__ == "__main__":
+    main()
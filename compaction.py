@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Compaction job for Focus Flow history files
+
+Rolls records older than the horizon into daily aggregates and moves the raw
+records into compressed archives, leaving only recent data in the hot files.
+Records already archived by an interrupted earlier run are skipped, so the job
+can simply be run again. Run it while the app is idle, e.g. from cron:
+
+    python compaction.py --horizon-days 90
+"""
+
+import argparse
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Any
+
+from config import Config
+from archive import ColdArchive
+from persistence import atomic_write, file_lock
+from serialization import dumps, loads
+from storage import parse_timestamp, session_totals
+
+def _cutoff(horizon_days: int = None) -> datetime:
+    days = Config.COMPACTION_HORIZON_DAYS if horizon_days is None else horizon_days
+    return datetime.now() - timedelta(days=days)
+
+def compact_focus_log(logger, horizon_days: int = None) -> int:
+    """Archive FocusLogger sessions older than the horizon, returning how many moved"""
+    cutoff = _cutoff(horizon_days)
+    daily: Dict[str, Any] = {}
+    logger.flush()
+
+    def tally(sessions):
+        for session in sessions:
+            focus_time, goals, completed = session_totals(session)
+            day = daily.setdefault(parse_timestamp(session["start_time"]).date().isoformat(), {
+                "sessions": 0, "focus_time": 0, "break_time": 0, "goals": 0, "completed_goals": 0
+            })
+            day["sessions"] += 1
+            day["focus_time"] += focus_time
+            day["break_time"] += session.get("total_break_time", 0)
+            day["goals"] += goals
+            day["completed_goals"] += completed
+            yield session
+
+    expired = 0
+
+    def count(sessions):
+        nonlocal expired
+        for session in sessions:
+            expired += 1
+            yield session
+
+    # The archive is durable before anything is removed from the hot log
+    sessions = logger.archive.unarchived(count(logger.storage.iter_sessions(end=cutoff)))
+    moved = logger.archive.archive(tally(sessions))
+    if moved:
+        logger.archive.merge_daily(daily)
+    if expired:
+        logger.storage.delete_before(cutoff)
+    return moved
+
+def compact_user_history(path: str = None, horizon_days: int = None, archive: ColdArchive = None) -> int:
+    """Archive AdaptiveAgent history sessions older than the horizon, returning how many moved
+
+    Runs under the same lock as the agents' history writes. Agents only ever
+    merge their new sessions into the snapshot on disk, so archived sessions
+    are not written back by an agent that still holds them in memory.
+    """
+    path = path or Config.USER_HISTORY_FILE
+    archive = archive or ColdArchive("user_performance", time_key="timestamp")
+    if not os.path.exists(path):
+        return 0
+
+    with file_lock(path):
+        with open(path, "r") as f:
+            history = loads(f.read())
+
+        cutoff = _cutoff(horizon_days)
+        old, recent = [], []
+        for session in history.get("sessions", []):
+            (old if parse_timestamp(session["timestamp"]) < cutoff else recent).append(session)
+        if not old:
+            return 0
+
+        # The task_patterns index already counts archived sessions; only new ones are rolled up
+        fresh = list(archive.unarchived(old))
+        daily: Dict[str, Any] = {}
+        for session in fresh:
+            day = daily.setdefault(parse_timestamp(session["timestamp"]).date().isoformat(), {})
+            totals = day.setdefault(session.get("task_type", "general"), {
+                "sessions": 0, "completed": 0, "duration": 0, "focus_rating": 0, "energy_after": 0
+            })
+            totals["sessions"] += 1
+            totals["completed"] += int(bool(session.get("completed", False)))
+            totals["duration"] += session.get("duration", 25)
+            totals["focus_rating"] += session.get("focus_rating", 3)
+            totals["energy_after"] += session.get("energy_after", 3)
+
+        if fresh:
+            archive.archive(fresh)
+            archive.merge_daily(daily)
+
+        history["sessions"] = recent
+        previous = history.get("compacted_before")
+        if not previous or parse_timestamp(previous) < cutoff:
+            history["compacted_before"] = cutoff.isoformat()
+
+        atomic_write(path, dumps(history))
+    return len(old)
+
+def main():
+    """Compact both the session log and the adaptive agent history"""
+    parser = argparse.ArgumentParser(description="Archive old Focus Flow history")
+    parser.add_argument("--horizon-days", type=int, default=Config.COMPACTION_HORIZON_DAYS,
+                        help="keep this many days of raw records in the hot files")
+    args = parser.parse_args()
+
+    from logger import FocusLogger
+
+    logger = FocusLogger()
+    try:
+        sessions = compact_focus_log(logger, args.horizon_days)
+    finally:
+        logger.close()
+    history = compact_user_history(horizon_days=args.horizon_days)
+    print(f"✅ Archived {sessions} focus sessions and {history} adaptive sessions to {Config.ARCHIVE_DIR}/")
+
+if __name__ == "__main__":
+    main()
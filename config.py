@@ -17,6 +17,74 @@ class Config:
     
     # File paths
     LOG_FILE = "focus_flow_log.json"
+    JOURNAL_FILE = "focus_flow_log.jsonl"
+    SQLITE_FILE = "focus_flow_log.db"
+    SEGMENT_DIR = "focus_flow_segments"
+    
+    # Session storage: "json" (single JSON array), "jsonl" (append-only journal),
+    # "sqlite", or "segmented" (one journal segment per SEGMENT_PERIOD)
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+    SEGMENT_PERIOD = os.getenv("SEGMENT_PERIOD", "month")  # day, week, month or year
+    USER_HISTORY_FILE = "user_performance.json"
+    
+    # Compaction: records older than the horizon move to compressed archives
+    ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+    ARCHIVE_COMPRESSION = os.getenv("ARCHIVE_COMPRESSION", "gzip")  # gzip or lzma
+    COMPACTION_HORIZON_DAYS = int(os.getenv("COMPACTION_HORIZON_DAYS", "90"))
+    
+    # Write-behind persistence: saves are queued for a background writer thread
+    WRITE_BEHIND = os.getenv("WRITE_BEHIND", "true").lower() == "true"
+    WRITE_QUEUE_SIZE = int(os.getenv("WRITE_QUEUE_SIZE", "1000"))
+    
+    # Adaptive history: new sessions are appended to an NDJSON tail, coalesced over
+    # the debounce window, and folded into the snapshot every HISTORY_SNAPSHOT_EVERY
+    # sessions. A window of 0 rewrites the whole snapshot on every save instead.
+    HISTORY_JOURNAL_FILE = "user_performance.jsonl"
+    HISTORY_DEBOUNCE_SECONDS = float(os.getenv("HISTORY_DEBOUNCE_SECONDS", "2.0"))
+    HISTORY_SNAPSHOT_EVERY = int(os.getenv("HISTORY_SNAPSHOT_EVERY", "50"))
+    
+    # LLM response cache: identical prompts are answered from memory or disk
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_FILE = os.getenv("LLM_CACHE_FILE", "llm_cache.db")
+    LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))  # 0 = never expire
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "256"))  # in-memory LRU size
+    
+    # Resilience for AI calls: per-attempt timeout, total deadline, jittered retries
+    # and a circuit breaker that short-circuits to the rule-based fallbacks
+    LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "10"))
+    LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "20"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+    BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+    BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+    
+    # Structured output: recommendations are requested with a JSON schema
+    # (response_format) and validated with pydantic. Endpoints that reject the
+    # parameter get a one-shot JSON prompt instead.
+    STRUCTURED_OUTPUT = os.getenv("STRUCTURED_OUTPUT", "true").lower() == "true"
+    STRUCTURED_MAX_TOKENS = int(os.getenv("STRUCTURED_MAX_TOKENS", "256"))
+    
+    # Shared LLM clients: one keep-alive connection pool per process, optionally
+    # warmed up in the background so the first call skips the TLS handshake
+    LLM_POOL_CONNECTIONS = int(os.getenv("LLM_POOL_CONNECTIONS", "4"))  # hosts kept in the pool
+    LLM_POOL_MAXSIZE = int(os.getenv("LLM_POOL_MAXSIZE", "16"))  # connections per host
+    LLM_WARM_UP = os.getenv("LLM_WARM_UP", "true").lower() == "true"
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))  # in-flight async calls per event loop
+    
+    # Speculative prefetch: the next block's suggestions are requested during the break
+    PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+    PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "2"))
+    
+    # Local duration model: picks focus durations from past outcomes; the LLM is
+    # only asked for the durations when the model's confidence is below the threshold
+    DURATION_CANDIDATES = [15, 20, 25, 30, 35, 40, 45, 50]
+    DURATION_MODEL_MIN_CONFIDENCE = float(os.getenv("DURATION_MODEL_MIN_CONFIDENCE", "0.6"))
+    DURATION_MODEL_RIDGE = float(os.getenv("DURATION_MODEL_RIDGE", "1.0"))
+    DURATION_MODEL_EXPLORATION = float(os.getenv("DURATION_MODEL_EXPLORATION", "0.1"))
+    
+    # Distraction taxonomy: optional JSON rule table {category: {"patterns": [...], "strategy": "..."}}
+    # layered over the built-in categories in distractions.py
+    DISTRACTION_RULES_FILE = os.getenv("DISTRACTION_RULES_FILE", "")
     
     # Agent personality
     AGENT_NAME = "Focus Flow Agent"
@@ -204,6 +204,7 @@ def main():
     # Save demo session
     logger = FocusLogger()
     logger.save_session(session)
+    logger.close()
     
     console.print(Panel(
         "🎉 Demo completed! The session has been saved to focus_flow_log.json\n\n"
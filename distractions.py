@@ -0,0 +1,133 @@
+import json
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import Config
+
+# category -> regex fragments (matched case-insensitively from a word start) and advice.
+# Override or extend with a JSON file of the same shape via DISTRACTION_RULES_FILE.
+DEFAULT_RULES: Dict[str, Dict] = {
+    "phone": {
+        "patterns": [r"phone", r"iphone", r"android", r"text(?:s|ing)?\b", r"call(?:s|ed)?\b", r"notification"],
+        "strategy": "Put phone in another room or use Do Not Disturb",
+    },
+    "email": {
+        "patterns": [r"e-?mail", r"inbox", r"outlook", r"gmail"],
+        "strategy": "Close email and check only during breaks",
+    },
+    "messaging": {
+        "patterns": [r"slack", r"teams\b", r"chat", r"whatsapp", r"discord", r"messag"],
+        "strategy": "Set a status and pause chat notifications until the break",
+    },
+    "social media": {
+        "patterns": [r"social media", r"instagram", r"twitter", r"\bx\.com", r"tiktok", r"facebook", r"reddit", r"linkedin"],
+        "strategy": "Use website blockers or log out of social accounts",
+    },
+    "web browsing": {
+        "patterns": [r"youtube", r"news", r"brows", r"internet", r"web\b", r"online shopping"],
+        "strategy": "Keep only the tabs you need for the task open",
+    },
+    "noise": {
+        "patterns": [r"noise", r"noisy", r"loud", r"music", r"construction", r"traffic"],
+        "strategy": "Use noise-canceling headphones or find a quieter space",
+    },
+    "people": {
+        "patterns": [r"colleague", r"coworker", r"cowork", r"family", r"kids?\b", r"roommate", r"interrupt", r"meeting", r"visitor", r"pet\b", r"dog\b", r"cat\b"],
+        "strategy": "Signal that you're focusing (headphones, closed door) and batch questions for the break",
+    },
+    "fatigue": {
+        "patterns": [r"tired", r"sleepy", r"exhaust", r"fatigue", r"hungry", r"hunger", r"thirst", r"headache"],
+        "strategy": "Eat, hydrate or take a short walk before the next block",
+    },
+    "thoughts": {
+        "patterns": [r"mind wander", r"daydream", r"thinking about", r"worr", r"anxi", r"stress", r"overthink"],
+        "strategy": "Write intrusive thoughts on a notepad and return to them after the session",
+    },
+}
+
+OTHER = "other"
+
+def load_rules(path: str = None) -> Dict[str, Dict]:
+    """Rule table from ``path`` (or DISTRACTION_RULES_FILE) layered over the defaults"""
+    rules = {category: dict(rule) for category, rule in DEFAULT_RULES.items()}
+    path = path if path is not None else Config.DISTRACTION_RULES_FILE
+    if path:
+        try:
+            with open(path, "r") as f:
+                rules.update(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"Error loading distraction rules: {e}")
+    return rules
+
+class DistractionClassifier:
+    """Maps free-text distractions to normalized categories with one compiled regex
+
+    Every category's patterns are joined into a single alternation with one
+    named group per category, so classifying an entry is one regex scan
+    however many rules there are. Results are memoized per distinct
+    (lower-cased) entry, so classifying the whole history costs one scan
+    per unique string and new entries are classified incrementally.
+    """
+
+    def __init__(self, rules: Dict[str, Dict] = None):
+        self.rules = rules if rules is not None else load_rules()
+        self._categories: List[str] = list(self.rules)
+        alternatives = []
+        for index, category in enumerate(self._categories):
+            patterns = "|".join(self.rules[category].get("patterns", []))
+            if patterns:
+                alternatives.append(f"(?P<c{index}>\\b(?:{patterns}))")
+        self._pattern = re.compile("|".join(alternatives), re.IGNORECASE) if alternatives else None
+        self._memo: Dict[str, Tuple[str, ...]] = {}
+        self._lock = threading.Lock()
+
+    def classify(self, distraction: str) -> Tuple[str, ...]:
+        """Categories mentioned in one entry, in order of appearance (``other`` if none)"""
+        key = distraction.strip().lower()
+        if not key:
+            return ()
+        with self._lock:
+            cached = self._memo.get(key)
+        if cached is not None:
+            return cached
+
+        found = []
+        if self._pattern is not None:
+            for match in self._pattern.finditer(key):
+                category = self._categories[int(match.lastgroup[1:])]
+                if category not in found:
+                    found.append(category)
+        result = tuple(found) or (OTHER,)
+        with self._lock:
+            self._memo[key] = result
+        return result
+
+    def categorize(self, distractions: Optional[Iterable[str]]) -> List[str]:
+        """Flattened categories for a session's distraction entries"""
+        categories: List[str] = []
+        for distraction in distractions or []:
+            categories.extend(self.classify(distraction))
+        return categories
+
+    def strategies(self, distractions: Iterable[str]) -> List[str]:
+        """One strategy per distinct category found, in order of first mention"""
+        strategies = []
+        seen = set()
+        for category in self.categorize(distractions):
+            strategy = self.rules.get(category, {}).get("strategy")
+            if strategy and category not in seen:
+                seen.add(category)
+                strategies.append(strategy)
+        return strategies
+
+_classifier: Optional[DistractionClassifier] = None
+_classifier_lock = threading.Lock()
+
+def get_distraction_classifier() -> DistractionClassifier:
+    """Process-wide classifier built from the configured rule table"""
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = DistractionClassifier()
+        return _classifier
@@ -0,0 +1,86 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, Sequence
+
+import numpy as np
+
+from config import Config
+
+@dataclass
+class DurationPrediction:
+    """Duration chosen by the local model for one task context"""
+    focus_duration: int  # minutes
+    expected_outcome: float  # predicted outcome score, 0-1
+    confidence: float  # 0-1, how much evidence backs this arm in this context
+    sessions: int  # sessions observed for the chosen duration, in any context
+
+class DurationModel:
+    """Contextual bandit over candidate focus durations, learned online with NumPy
+
+    Each candidate duration is an arm with its own ridge regression from
+    the task context (difficulty, energy) to an outcome score built from
+    completion, focus rating and energy afterwards. The inverse design
+    matrices are kept up to date with Sherman-Morrison, so ``update`` and
+    ``predict`` are a handful of small array operations and never refit.
+    Confidence is how far the chosen arm's uncertainty in this context has
+    shrunk from its prior, so it stays low until similar sessions exist.
+    """
+
+    FEATURES = 4
+
+    def __init__(self, candidates: Sequence[int] = None, ridge: float = None, exploration: float = None):
+        self.candidates = np.array(candidates or Config.DURATION_CANDIDATES, dtype=np.int32)
+        self.ridge = Config.DURATION_MODEL_RIDGE if ridge is None else ridge
+        self.exploration = Config.DURATION_MODEL_EXPLORATION if exploration is None else exploration
+        arms = len(self.candidates)
+        self._a_inv = np.repeat(np.eye(self.FEATURES)[None] / self.ridge, arms, axis=0)
+        self._b = np.zeros((arms, self.FEATURES))
+        self.counts = np.zeros(arms, dtype=np.int64)
+
+    @classmethod
+    def from_sessions(cls, sessions: Iterable[Dict], **kwargs) -> "DurationModel":
+        """Train from stored AdaptiveAgent session dicts"""
+        model = cls(**kwargs)
+        for session in sessions:
+            model.update(session)
+        return model
+
+    @staticmethod
+    def features(difficulty: int, energy_level: int) -> np.ndarray:
+        """Context vector: bias, scaled difficulty and energy, and their interaction"""
+        d = (difficulty - 1) / 4
+        e = (energy_level - 1) / 4
+        return np.array([1.0, d, e, d * e])
+
+    @staticmethod
+    def outcome(session: Dict) -> float:
+        """Outcome score in [0, 1] for a finished session"""
+        return (0.5 * bool(session.get("completed", False))
+                + 0.3 * (session.get("focus_rating", 3) - 1) / 4
+                + 0.2 * (session.get("energy_after", 3) - 1) / 4)
+
+    def _arm(self, duration: int) -> int:
+        return int(np.abs(self.candidates - duration).argmin())
+
+    def update(self, session: Dict) -> None:
+        """Learn from one finished session"""
+        arm = self._arm(session.get("duration", 25))
+        x = self.features(session.get("difficulty", 3), session.get("energy_before", 3))
+        a_inv_x = self._a_inv[arm] @ x
+        self._a_inv[arm] -= np.outer(a_inv_x, a_inv_x) / (1.0 + x @ a_inv_x)
+        self._b[arm] += self.outcome(session) * x
+        self.counts[arm] += 1
+
+    def predict(self, difficulty: int, energy_level: int) -> DurationPrediction:
+        """Best duration for this context with an exploration bonus for untested arms"""
+        x = self.features(difficulty, energy_level)
+        theta = np.einsum('kij,kj->ki', self._a_inv, self._b)
+        means = theta @ x
+        widths = np.sqrt(np.einsum('i,kij,j->k', x, self._a_inv, x))
+        arm = int(np.argmax(means + self.exploration * widths))
+        prior_width = np.sqrt(x @ x / self.ridge)
+        return DurationPrediction(
+            focus_duration=int(self.candidates[arm]),
+            expected_outcome=float(np.clip(means[arm], 0.0, 1.0)),
+            confidence=float(np.clip(1.0 - widths[arm] / prior_width, 0.0, 1.0)),
+            sessions=int(self.counts[arm]),
+        )
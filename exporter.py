@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Streaming export pipeline for Focus Flow session data
+
+Sessions are pulled from the logger (hot log and archive) one record at a time,
+flattened into one row per focus block, optionally projected onto a subset
+of fields and handed to a format writer, so exports run in bounded memory
+no matter how long the history is.
+
+Usage: python exporter.py --format csv --since 2025-01-01 --fields session_start,goal,goal_achieved
+"""
+
+import argparse
+import csv
+import sys
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Iterable, Iterator, Optional, TextIO
+
+from storage import compute_session_stats, parse_timestamp
+from serialization import dumps
+
+EXPORT_FIELDS = [
+    "session_id",
+    "session_start",
+    "session_end",
+    "available_time_minutes",
+    "total_focus_time",
+    "total_break_time",
+    "block",
+    "block_start",
+    "block_end",
+    "duration_minutes",
+    "completed",
+    "goal",
+    "goal_achieved",
+    "distractions",
+    "what_worked",
+    "what_didnt_work",
+    "next_time_improvements",
+]
+
+EXPORT_FORMATS = {
+    "txt": "Text report",
+    "csv": "CSV (one row per focus block)",
+    "ndjson": "Newline-delimited JSON (one row per focus block)",
+    "parquet": "Parquet (requires pyarrow)",
+}
+
+def iter_rows(sessions: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Flatten session records into one row per focus block"""
+    for session in sessions:
+        base = {
+            "session_id": session.get("session_id"),
+            "session_start": session.get("start_time"),
+            "session_end": session.get("end_time"),
+            "available_time_minutes": session.get("available_time_minutes"),
+            "total_focus_time": session.get("total_focus_time", 0),
+            "total_break_time": session.get("total_break_time", 0),
+        }
+        for i, focus_session in enumerate(session.get("focus_sessions", []), 1):
+            goal = focus_session.get("goal") or {}
+            reflection = focus_session.get("reflection") or {}
+            yield {
+                **base,
+                "block": i,
+                "block_start": focus_session.get("start_time"),
+                "block_end": focus_session.get("end_time"),
+                "duration_minutes": focus_session.get("duration_minutes"),
+                "completed": focus_session.get("completed", False),
+                "goal": goal.get("description"),
+                "goal_achieved": reflection.get("goal_achieved") if reflection else None,
+                "distractions": reflection.get("distractions"),
+                "what_worked": reflection.get("what_worked"),
+                "what_didnt_work": reflection.get("what_didnt_work"),
+                "next_time_improvements": reflection.get("next_time_improvements"),
+            }
+
+def select_fields(rows: Iterable[Dict[str, Any]], fields: Optional[List[str]]) -> Iterator[Dict[str, Any]]:
+    """Project rows onto the requested fields"""
+    if not fields:
+        yield from rows
+        return
+    for row in rows:
+        yield {field: row.get(field) for field in fields}
+
+def write_text_report(f: TextIO, stats: Dict[str, Any], sessions: Iterable[Dict[str, Any]], title: str = "RECENT SESSIONS"):
+    """Write the human-readable summary report"""
+    f.write("=== Focus Flow Agent Session Summary ===\n\n")
+    f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+
+    # Overall stats
+    f.write("📊 OVERALL STATISTICS\n")
+    f.write("=" * 30 + "\n")
+    f.write(f"Total Sessions: {stats['total_sessions']}\n")
+    f.write(f"Total Focus Time: {stats['total_focus_time']} minutes\n")
+    f.write(f"Success Rate: {stats['success_rate']:.1%}\n")
+    f.write(f"Average Session Length: {stats['average_session_length']:.1f} minutes\n\n")
+
+    # Sessions
+    f.write(f"📅 {title}\n")
+    f.write("=" * 30 + "\n")
+
+    for session in sessions:
+        start_time = parse_timestamp(session['start_time'])
+        f.write(f"\nSession: {start_time.strftime('%Y-%m-%d %H:%M')}\n")
+        f.write(f"Duration: {session.get('total_focus_time', 0)} minutes\n")
+
+        for i, focus_session in enumerate(session.get('focus_sessions', []), 1):
+            goal = focus_session.get('goal', {})
+            reflection = focus_session.get('reflection', {})
+
+            f.write(f"  Block {i}: {goal.get('description', 'No goal')}\n")
+            if reflection:
+                achieved = "✅" if reflection.get('goal_achieved') else "❌"
+                f.write(f"    {achieved} Goal achieved: {reflection.get('goal_achieved', False)}\n")
+                if reflection.get('distractions'):
+                    f.write(f"    Distractions: {reflection['distractions']}\n")
+
+def write_csv(f: TextIO, rows: Iterable[Dict[str, Any]], fields: Optional[List[str]] = None) -> int:
+    """Write rows as CSV, returning the number of rows written"""
+    writer = csv.DictWriter(f, fieldnames=fields or EXPORT_FIELDS)
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+def write_ndjson(f: TextIO, rows: Iterable[Dict[str, Any]]) -> int:
+    """Write rows as newline-delimited JSON, returning the number of rows written"""
+    count = 0
+    for row in rows:
+        f.write(dumps(row) + "\n")
+        count += 1
+    return count
+
+def write_parquet(path: str, rows: Iterable[Dict[str, Any]], fields: Optional[List[str]] = None, batch_size: int = 1000) -> int:
+    """Write rows to Parquet in fixed-size batches, returning the number of rows written"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow: pip install pyarrow") from None
+
+    fields = fields or EXPORT_FIELDS
+
+    # Everything is written as strings so the schema never depends on which
+    # optional reflection fields happen to be filled in the first batch
+    schema = pa.schema([(field, pa.string()) for field in fields])
+    count = 0
+    batch: List[Dict[str, Any]] = []
+
+    with pq.ParquetWriter(path, schema) as writer:
+        for row in rows:
+            batch.append({field: None if row.get(field) is None else str(row.get(field)) for field in fields})
+            if len(batch) >= batch_size:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            count += len(batch)
+
+    return count
+
+def default_export_filename(fmt: str) -> str:
+    """Timestamped output filename for an export format"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if fmt == "txt":
+        return f"focus_flow_summary_{timestamp}.txt"
+    return f"focus_flow_export_{timestamp}.{fmt}"
+
+def export_sessions(logger, filename: str = None, fmt: str = "txt", start: datetime = None,
+                    end: datetime = None, fields: Optional[List[str]] = None) -> str:
+    """Stream sessions from ``logger`` into ``filename`` in the given format"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    unknown = [field for field in fields or [] if field not in EXPORT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown export fields: {', '.join(unknown)}")
+
+    filename = filename or default_export_filename(fmt)
+
+    if fmt == "txt":
+        with open(filename, 'w') as f:
+            if start is None and end is None:
+                write_text_report(f, logger.get_session_stats(), logger.tail(5))
+            else:
+                # Two streaming passes keep memory flat: one for the header stats, one for the listing
+                stats = compute_session_stats(logger.iter_sessions(start, end))
+                write_text_report(f, stats, logger.iter_sessions(start, end), title="SESSIONS")
+        return filename
+
+    rows = select_fields(iter_rows(logger.iter_sessions(start, end)), fields)
+    if fmt == "parquet":
+        write_parquet(filename, rows, fields)
+    else:
+        with open(filename, 'w', newline='') as f:
+            if fmt == "csv":
+                write_csv(f, rows, fields)
+            else:
+                write_ndjson(f, rows)
+
+    return filename
+
+def main(argv: List[str] = None):
+    """Scriptable export entry point"""
+    parser = argparse.ArgumentParser(description="Export Focus Flow session data")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="txt", help="output format")
+    parser.add_argument("--output", help="output file (default: timestamped file in the current directory)")
+    parser.add_argument("--since", type=parse_timestamp, help="only sessions starting at or after this ISO date")
+    parser.add_argument("--until", type=parse_timestamp, help="only sessions starting before this ISO date")
+    parser.add_argument("--days", type=int, help="only sessions from the last N days")
+    parser.add_argument("--fields", help=f"comma-separated subset of: {', '.join(EXPORT_FIELDS)}")
+    args = parser.parse_args(argv)
+
+    from logger import FocusLogger
+
+    since = args.since
+    if args.days is not None:
+        since = datetime.now() - timedelta(days=args.days)
+    fields = [field.strip() for field in args.fields.split(",")] if args.fields else None
+
+    logger = FocusLogger()
+    try:
+        filename = export_sessions(logger, args.output, args.format, since, args.until, fields)
+    except (ValueError, RuntimeError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        logger.close()
+    print(f"✅ Exported to {filename}")
+
+if __name__ == "__main__":
+    main()
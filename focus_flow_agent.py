@@ -1,9 +1,11 @@
 import uuid
-from datetime import datetime
-from typing import Optional
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
 from rich.console import Console
+from rich.live import Live
 from rich.panel import Panel
-from rich.prompt import Prompt, Confirm
+from rich.prompt import Prompt, Confirm, IntPrompt
 from rich.table import Table
 
 from config import Config
@@ -11,6 +13,10 @@ from models import FocusFlowSession, FocusSession, Goal, Reflection
 from nemotron_agent import NemotronAgent
 from timer import FocusTimer
 from logger import FocusLogger
+from exporter import EXPORT_FORMATS, export_sessions
+from llm_cache import get_response_cache
+from resilience import breaker_states
+from prefetch import Prefetcher
 
 console = Console()
 
@@ -21,6 +27,7 @@ class FocusFlowAgent:
         self.nemotron = NemotronAgent()
         self.timer = FocusTimer()
         self.logger = FocusLogger()
+        self.prefetcher = Prefetcher()
         self.current_session: Optional[FocusFlowSession] = None
         
     def start_session(self, available_time_minutes: int) -> bool:
@@ -47,7 +54,10 @@ class FocusFlowAgent:
             border_style="green"
         ))
         
-        return self._run_focus_blocks(max_pomodoros)
+        try:
+            return self._run_focus_blocks(max_pomodoros)
+        finally:
+            self.prefetcher.cancel_all()
     
     def _run_focus_blocks(self, max_blocks: int) -> bool:
         """Run the focus blocks for the session"""
@@ -60,19 +70,17 @@ class FocusFlowAgent:
         while block_number <= max_blocks and self._has_time_remaining():
             console.print(f"\n[bold blue]📋 Block {block_number}/{max_blocks}[/bold blue]")
             
-            # Get adaptation suggestion
-            adaptation = self.nemotron.suggest_adaptation(previous_sessions, "")
-            duration = adaptation.get("duration", Config.DEFAULT_FOCUS_DURATION)
-            
-            if adaptation.get("suggestion"):
-                console.print(Panel(
-                    adaptation["suggestion"],
-                    title="💡 Adaptation Suggestion",
-                    border_style="blue"
-                ))
+            # Duration, advice and goal prompt come from one planning call (usually prefetched)
+            plan = self._stream_panel(
+                "💡 Adaptation Suggestion", "blue",
+                lambda on_token: self.nemotron.plan_block(block_number, previous_sessions, on_token=on_token),
+                lambda result: result.get("suggestion"),
+                prefetched=self.prefetcher.take("plan", self._plan_key(block_number, previous_sessions))
+            )
+            duration = plan.get("duration", Config.DEFAULT_FOCUS_DURATION)
             
             # Set goal for this block
-            goal_description = self._get_goal_for_block(block_number, previous_sessions)
+            goal_description = self._get_goal_for_block(plan["goal_prompt"])
             if not goal_description:
                 console.print("[yellow]Session cancelled by user[/yellow]")
                 return False
@@ -92,6 +100,11 @@ class FocusFlowAgent:
             console.print(f"[cyan]Duration: {duration} minutes[/cyan]\n")
             
             if Confirm.ask("Ready to start the focus session?"):
+                # The reflection prompt only needs the goal and duration: generate it during the block
+                self.prefetcher.submit(
+                    "reflection", self._reflection_key(focus_session),
+                    self.nemotron.reflect_on_session, goal, duration
+                )
                 self.timer.countdown_display(3, "Starting focus session in")
                 session_completed = self.timer.start_timer(duration, "Focus")
                 
@@ -110,8 +123,9 @@ class FocusFlowAgent:
                 # Add to previous sessions for adaptation
                 previous_sessions.append(focus_session)
                 
-                # Take a break (except after the last block)
+                # Take a break (except after the last block), preparing the next block meanwhile
                 if block_number < max_blocks and self._has_time_remaining():
+                    self._prefetch_block(block_number + 1, previous_sessions)
                     self._take_break()
                 
                 block_number += 1
@@ -131,35 +145,51 @@ class FocusFlowAgent:
         
         return True
     
-    def _get_goal_for_block(self, block_number: int, previous_sessions: list) -> Optional[str]:
-        """Get goal for the current block"""
-        # Get previous goals for context
-        previous_goals = [s.goal for s in previous_sessions] if previous_sessions else None
-        
-        # Get suggestion from Nemotron
-        suggestion = self.nemotron.suggest_goal(block_number, previous_goals)
+    @staticmethod
+    def _plan_key(block_number: int, previous_sessions: list) -> tuple:
+        """Everything ``plan_block`` depends on"""
+        return block_number, tuple(
+            (s.session_id, s.goal.description, bool(s.reflection and s.reflection.goal_achieved))
+            for s in previous_sessions
+        )
+    
+    @staticmethod
+    def _reflection_key(focus_session: FocusSession) -> tuple:
+        """Everything ``reflect_on_session`` depends on"""
+        return focus_session.goal.description, focus_session.duration_minutes
+    
+    def _prefetch_block(self, block_number: int, previous_sessions: list):
+        """Start planning the next block in the background
         
-        console.print(Panel(
-            suggestion,
-            title="🤖 Goal Setting",
-            border_style="cyan"
-        ))
+        Snapshots the inputs, so sessions appended later cannot change what
+        a running prefetch asks for; ``take`` ignores it if the keys differ.
+        """
+        previous_sessions = list(previous_sessions)
+        self.prefetcher.submit(
+            "plan", self._plan_key(block_number, previous_sessions),
+            self.nemotron.plan_block, block_number, previous_sessions
+        )
+    
+    def _get_goal_for_block(self, goal_prompt: str) -> Optional[str]:
+        """Get goal for the current block"""
+        console.print(Panel(goal_prompt, title="🤖 Goal Setting", border_style="cyan"))
         
         goal = Prompt.ask("What's your goal for this block")
         return goal.strip() if goal else None
     
     def _reflect_on_session(self, focus_session: FocusSession) -> Reflection:
         """Guide reflection on the completed session"""
-        reflection_data = self.nemotron.reflect_on_session(
-            focus_session.goal, 
-            focus_session.duration_minutes
+        result = self._stream_panel(
+            "🤔 Session Reflection", "yellow",
+            lambda on_token: self.nemotron.reflect_on_session(
+                focus_session.goal,
+                focus_session.duration_minutes,
+                on_token=on_token
+            ),
+            lambda result: result["reflection_prompt"],
+            prefetched=self.prefetcher.take("reflection", self._reflection_key(focus_session))
         )
-        
-        console.print(Panel(
-            reflection_data["reflection_prompt"],
-            title="🤔 Session Reflection",
-            border_style="yellow"
-        ))
+        focus_session.reflection_prompt = result["reflection_prompt"]
         
         # Get user input
         goal_achieved = Confirm.ask("Did you achieve your goal?")
@@ -177,6 +207,43 @@ class FocusFlowAgent:
             next_time_improvements=improvements if improvements else None
         )
     
+    def _stream_panel(self, title: str, border_style: str,
+                      request: Callable[[Callable[[str], None]], Any],
+                      final_text: Callable[[Any], Optional[str]],
+                      prefetched: Optional[Future] = None) -> Any:
+        """Render a Panel that fills in as the AI response streams, returning the request's result
+        
+        ``request`` is called with a token callback; ``final_text`` picks the
+        text to show once it returns (which may be a fallback if nothing
+        streamed). A ``prefetched`` future for the same request is used
+        instead when given, usually already finished.
+        """
+        streamed = ""
+        with Live(Panel("[dim]…[/dim]", title=title, border_style=border_style),
+                  console=console, refresh_per_second=12) as live:
+            def on_token(chunk: str):
+                nonlocal streamed
+                streamed += chunk
+                live.update(Panel(streamed, title=title, border_style=border_style))
+            
+            result = None
+            if prefetched is not None:
+                try:
+                    result = prefetched.result()
+                except Exception:
+                    result = None
+            if result is None:
+                result = request(on_token)
+            text = final_text(result)
+            if text:
+                live.update(Panel(text, title=title, border_style=border_style))
+        return result
+    
+    def close(self):
+        """Drop pending prefetches and close the session log"""
+        self.prefetcher.shutdown()
+        self.logger.close()
+    
     def _take_break(self):
         """Take a break between focus sessions"""
         console.print(Panel(
@@ -241,9 +308,26 @@ class FocusFlowAgent:
         table.add_row("Average Session Length", f"{stats['average_session_length']:.1f} minutes")
         table.add_row("Goals Completed", f"{stats['completed_goals']}/{stats['total_goals']}")
         
+        cache = get_response_cache()
+        if cache is not None:
+            cache_stats = cache.stats()
+            table.add_row("AI Cache Hit Rate", f"{cache_stats['hit_rate']:.1%} ({cache_stats['hits']} hits, {cache_stats['misses']} misses)")
+        for breaker in breaker_states():
+            table.add_row("AI Service", f"{breaker['state']} ({breaker['total_failures']} failures, {breaker['short_circuits']} short-circuited)")
+        
         console.print(table)
     
     def export_data(self):
         """Export session data"""
-        filename = self.logger.export_summary()
-        console.print(f"[green]Session summary exported to: {filename}[/green]") 
\ No newline at end of file
+        for fmt, description in EXPORT_FORMATS.items():
+            console.print(f"  [cyan]{fmt}[/cyan] - {description}")
+        fmt = Prompt.ask("Export format", choices=list(EXPORT_FORMATS), default="txt")
+        days = IntPrompt.ask("Only include the last N days (0 for all)", default=0)
+        start = datetime.now() - timedelta(days=days) if days > 0 else None
+        
+        try:
+            filename = export_sessions(self.logger, fmt=fmt, start=start)
+        except RuntimeError as e:
+            console.print(f"[red]{e}[/red]")
+            return
+        console.print(f"[green]Session data exported to: {filename}[/green]") 
\ No newline at end of file
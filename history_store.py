@@ -0,0 +1,167 @@
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, List, Dict, Iterable
+
+import numpy as np
+
+class ColumnarHistory:
+    """Column-oriented copy of AdaptiveAgent session history
+
+    Each numeric field lives in its own NumPy array (row ``i`` of every
+    column is session ``i`` of ``user_history["sessions"]``) and task types
+    are stored as integer category codes, so analytics become vectorized
+    masks and reductions instead of Python loops over dicts. Arrays grow by
+    doubling, so ``append`` is amortized O(1).
+    """
+
+    COLUMNS = {
+        "timestamp": np.float64,      # epoch seconds
+        "difficulty": np.int8,
+        "energy_before": np.int8,
+        "energy_after": np.int8,
+        "focus_rating": np.int8,
+        "duration": np.int32,
+        "completed": np.bool_,
+        "distraction_count": np.int32,
+        "task_type": np.int32,        # code into task_types
+    }
+
+    def __init__(self, capacity: int = 64, classify: Callable[[List[str]], List[str]] = None):
+        self._size = 0
+        self._classify = classify
+        self._data = {name: np.zeros(capacity, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+        self.task_types: List[str] = []
+        self._task_type_codes: Dict[str, int] = {}
+        self.distractions: List[List[str]] = []
+        self.is_sorted = True  # timestamps in ascending order, so windows can bisect
+        self._windows: List["RollingWindow"] = []
+
+    @classmethod
+    def from_sessions(cls, sessions: Iterable[Dict], classify: Callable[[List[str]], List[str]] = None) -> "ColumnarHistory":
+        """Build the columns from stored session dicts
+        
+        ``classify`` maps a session's raw distraction entries to the labels
+        windows count (e.g. normalized categories); raw strings otherwise.
+        """
+        sessions = list(sessions)
+        history = cls(capacity=max(64, len(sessions)), classify=classify)
+        for session in sessions:
+            history.append(session)
+        return history
+
+    def __len__(self) -> int:
+        return self._size
+
+    def column(self, name: str) -> np.ndarray:
+        """View of one column trimmed to the filled rows"""
+        return self._data[name][:self._size]
+
+    def _encode_task_type(self, task_type: str) -> int:
+        code = self._task_type_codes.get(task_type)
+        if code is None:
+            code = len(self.task_types)
+            self.task_types.append(task_type)
+            self._task_type_codes[task_type] = code
+        return code
+
+    def append(self, session: Dict) -> None:
+        """Append one session in place, growing the arrays when full"""
+        if self._size == len(self._data["timestamp"]):
+            for name, column in self._data.items():
+                grown = np.zeros(max(64, len(column) * 2), dtype=column.dtype)
+                grown[:self._size] = column[:self._size]
+                self._data[name] = grown
+
+        row = self._size
+        data = self._data
+        timestamp = datetime.fromisoformat(session["timestamp"]).timestamp()
+        if row and timestamp < data["timestamp"][row - 1]:
+            self.is_sorted = False
+        data["timestamp"][row] = timestamp
+        data["difficulty"][row] = session.get("difficulty", 3)
+        data["energy_before"][row] = session.get("energy_before", 3)
+        data["energy_after"][row] = session.get("energy_after", 3)
+        data["focus_rating"][row] = session.get("focus_rating", 3)
+        data["duration"][row] = session.get("duration", 25)
+        data["completed"][row] = bool(session.get("completed", False))
+        data["distraction_count"][row] = len(session.get("distractions") or [])
+        data["task_type"][row] = self._encode_task_type(session.get("task_type", "general"))
+        raw_distractions = list(session.get("distractions") or [])
+        self.distractions.append(self._classify(raw_distractions) if self._classify else raw_distractions)
+        self._size += 1
+        for window in self._windows:
+            window.add(row)
+
+    def window(self, seconds: float) -> "RollingWindow":
+        """Rolling aggregates over the last ``seconds``, kept current by ``append``"""
+        window = RollingWindow(self, seconds)
+        self._windows.append(window)
+        return window
+
+
+class RollingWindow:
+    """Running totals over the sessions of a trailing time window
+
+    New sessions are added as they are appended to the history and old
+    ones are subtracted as they age out, so reading the totals is
+    amortized O(1) instead of a scan over the whole history. Falls back to
+    a masked recomputation if the history's timestamps are out of order.
+    """
+
+    def __init__(self, history: ColumnarHistory, seconds: float):
+        self.history = history
+        self.seconds = seconds
+        self._start = 0
+        self._end = 0
+        self._reset()
+        for row in range(len(history)):
+            self.add(row)
+
+    def _reset(self) -> None:
+        self.sessions = 0
+        self.completed = 0
+        self.focus_rating = 0
+        self.duration = 0
+        self.distraction_count = 0
+        self.low_energy = 0
+        self.distractions: Counter = Counter()
+
+    def _apply(self, row: int, sign: int) -> None:
+        data = self.history._data
+        self.sessions += sign
+        self.completed += sign * int(data["completed"][row])
+        self.focus_rating += sign * int(data["focus_rating"][row])
+        self.duration += sign * int(data["duration"][row])
+        self.distraction_count += sign * int(data["distraction_count"][row])
+        self.low_energy += sign * int(data["energy_after"][row] <= 2)
+        for distraction in self.history.distractions[row]:
+            self.distractions[distraction] += sign
+            if self.distractions[distraction] <= 0:
+                del self.distractions[distraction]
+
+    def add(self, row: int) -> None:
+        """Count a newly appended row"""
+        self._apply(row, 1)
+        self._end = row + 1
+
+    def totals(self, now: datetime = None) -> Dict[str, Any]:
+        """Aggregates for sessions recorded after ``now - seconds``"""
+        cutoff = (now or datetime.now()).timestamp() - self.seconds
+        timestamps = self.history.column("timestamp")
+        if self.history.is_sorted:
+            while self._start < self._end and timestamps[self._start] <= cutoff:
+                self._apply(self._start, -1)
+                self._start += 1
+        else:
+            self._reset()
+            for row in np.flatnonzero(timestamps[:self._end] > cutoff):
+                self._apply(int(row), 1)
+        return {
+            "sessions": self.sessions,
+            "completed": self.completed,
+            "focus_rating": self.focus_rating,
+            "duration": self.duration,
+            "distraction_count": self.distraction_count,
+            "low_energy": self.low_energy,
+            "distractions": Counter(self.distractions),
+        }
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from config import Config
+
+def cache_key(model: str, params: Dict[str, Any], messages: List[Dict[str, Any]]) -> str:
+    """Canonical SHA-256 of a chat request
+
+    Keys are sorted and separators fixed so the same request always hashes
+    the same, whichever JSON library the rest of the app is using.
+    """
+    canonical = json.dumps(
+        {"model": model, "params": params, "messages": messages},
+        sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+class ResponseCache:
+    """LLM response cache: an in-memory LRU with TTL in front of SQLite
+
+    Lookups try the LRU first, then the on-disk table (promoting hits into
+    the LRU). Entries older than the TTL are treated as misses in both
+    tiers and removed from disk lazily.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS llm_cache (
+        key TEXT PRIMARY KEY,
+        response TEXT NOT NULL,
+        created_at REAL NOT NULL
+    )
+    """
+
+    def __init__(self, path: str = None, max_entries: int = None, ttl_seconds: float = None):
+        self.path = path or Config.LLM_CACHE_FILE
+        self.max_entries = Config.LLM_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.ttl_seconds = Config.LLM_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(self.SCHEMA)
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, response: str, created_at: float) -> None:
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response for ``key``, or None on a miss"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[1]):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                if not self._expired(row[1]):
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[0]
+                with self._conn:
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, response: str) -> None:
+        """Store a response in both tiers"""
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, response, created_at)
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?)", (key, response, created_at)
+                )
+
+    def prune(self) -> int:
+        """Delete expired entries from disk, returning how many were removed"""
+        if self.ttl_seconds <= 0:
+            return 0
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            )
+            return cursor.rowcount
+
+    def clear(self) -> None:
+        """Drop every cached response and reset the counters"""
+        with self._lock:
+            self._memory.clear()
+            with self._conn:
+                self._conn.execute("DELETE FROM llm_cache")
+            self.hits = self.misses = self.disk_hits = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "hit_rate": self.hits / lookups if lookups else 0,
+                "memory_entries": len(self._memory),
+            }
+
+    def close(self) -> None:
+        """Close the on-disk store"""
+        with self._lock:
+            self._conn.close()
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Process-wide response cache shared by every agent, or None when disabled"""
+    global _response_cache
+    if not Config.LLM_CACHE_ENABLED:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+        return _response_cache
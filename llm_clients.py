@@ -0,0 +1,174 @@
+import asyncio
+import threading
+import weakref
+from typing import Dict, Optional, Tuple
+
+import openai
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+
+CHAT_COMPLETIONS_PATH = "/chat/completions"
+
+def api_base_url(url: str = None) -> str:
+    """OpenAI-style base URL for ``url`` (default ``NEMOTRON_API_URL``), given with or without /chat/completions"""
+    url = (url or Config.NEMOTRON_API_URL).rstrip("/")
+    if url.endswith(CHAT_COMPLETIONS_PATH):
+        url = url[:-len(CHAT_COMPLETIONS_PATH)]
+    return url
+
+def chat_completions_url(url: str = None) -> str:
+    """Full chat completions endpoint for ``url`` (default ``NEMOTRON_API_URL``), for raw HTTP calls"""
+    return api_base_url(url) + CHAT_COMPLETIONS_PATH
+
+def _pooled_http_client(asynchronous: bool = False):
+    """httpx client for the OpenAI SDK with the configured pool limits, or None for the SDK default"""
+    limits = {
+        "max_connections": Config.LLM_POOL_MAXSIZE,
+        "max_keepalive_connections": Config.LLM_POOL_MAXSIZE,
+    }
+    try:
+        import httpx
+        factory = openai.DefaultAsyncHttpxClient if asynchronous else openai.DefaultHttpxClient
+        return factory(limits=httpx.Limits(**limits))
+    except ImportError:
+        pass
+    try:
+        # Newer SDKs ship on httpx2
+        import httpx2
+        factory = openai.DefaultAsyncHttpx2Client if asynchronous else openai.DefaultHttpx2Client
+        return factory(limits=httpx2.Limits(**limits))
+    except (ImportError, AttributeError):
+        return None
+
+class ClientRegistry:
+    """Process-wide LLM clients with keep-alive connection pools
+
+    Every agent instance (one per CLI run, one per Streamlit browser
+    session) shares the same ``requests.Session`` and the same OpenAI
+    client per endpoint, so DNS, TCP and TLS setup is paid once per pooled
+    connection instead of once per call. Both are safe to share across
+    threads for the plain request/response calls the agents make.
+
+    Async clients and concurrency limits are kept per event loop, since
+    an asyncio connection pool cannot outlive or cross its loop.
+    """
+
+    def __init__(self, pool_connections: int = None, pool_maxsize: int = None):
+        self.pool_connections = pool_connections or Config.LLM_POOL_CONNECTIONS
+        self.pool_maxsize = pool_maxsize or Config.LLM_POOL_MAXSIZE
+        self._lock = threading.Lock()
+        self._session: Optional[requests.Session] = None
+        self._openai: Dict[Tuple[str, str], openai.OpenAI] = {}
+        self._warm_up_thread: Optional[threading.Thread] = None
+        self._async_openai: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict]" = weakref.WeakKeyDictionary()
+        self._limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+    def http_session(self) -> requests.Session:
+        """Shared pooled session for raw HTTP calls"""
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    def openai_client(self, base_url: str, api_key: str) -> openai.OpenAI:
+        """Shared OpenAI-compatible client for one endpoint and key"""
+        base_url = api_base_url(base_url)
+        key = (base_url, api_key)
+        with self._lock:
+            client = self._openai.get(key)
+            if client is None:
+                # Retries and timeouts are handled by call_with_resilience, not the client
+                client = openai.OpenAI(
+                    base_url=base_url,
+                    api_key=api_key,
+                    max_retries=0,
+                    timeout=Config.LLM_TIMEOUT_SECONDS,
+                    http_client=_pooled_http_client()
+                )
+                self._openai[key] = client
+            return client
+
+    def async_openai_client(self, base_url: str, api_key: str) -> openai.AsyncOpenAI:
+        """Async OpenAI-compatible client for one endpoint and key on the running loop"""
+        loop = asyncio.get_running_loop()
+        base_url = api_base_url(base_url)
+        key = (base_url, api_key)
+        with self._lock:
+            clients = self._async_openai.setdefault(loop, {})
+            client = clients.get(key)
+            if client is None:
+                client = openai.AsyncOpenAI(
+                    base_url=base_url,
+                    api_key=api_key,
+                    max_retries=0,
+                    timeout=Config.LLM_TIMEOUT_SECONDS,
+                    http_client=_pooled_http_client(asynchronous=True)
+                )
+                clients[key] = client
+            return client
+
+    def async_limiter(self) -> asyncio.Semaphore:
+        """Semaphore capping in-flight LLM calls on the running loop at LLM_MAX_CONCURRENCY"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            limiter = self._limiters.get(loop)
+            if limiter is None:
+                limiter = self._limiters[loop] = asyncio.Semaphore(Config.LLM_MAX_CONCURRENCY)
+            return limiter
+
+    def warm_up(self, background: bool = True) -> None:
+        """Open pooled connections to the configured endpoint ahead of the first real call
+
+        Runs once per process; failures are ignored since this is only an
+        optimization and the real call will report any problem.
+        """
+        if not Config.NEMOTRON_API_KEY or Config.NEMOTRON_API_KEY == "your_nvidia_api_key_here":
+            return
+        with self._lock:
+            if self._warm_up_thread is not None:
+                return
+            self._warm_up_thread = threading.Thread(target=self._warm_up, name="llm-warm-up", daemon=True)
+        if background:
+            self._warm_up_thread.start()
+        else:
+            self._warm_up_thread.run()
+
+    def _warm_up(self) -> None:
+        try:
+            self.http_session().head(api_base_url(), timeout=Config.LLM_TIMEOUT_SECONDS)
+        except requests.RequestException:
+            pass
+        try:
+            client = self.openai_client(api_base_url(), Config.NEMOTRON_API_KEY)
+            client.models.list(timeout=Config.LLM_TIMEOUT_SECONDS)
+        except openai.OpenAIError:
+            pass
+
+    def close(self) -> None:
+        """Close every pooled connection"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+            for client in self._openai.values():
+                client.close()
+            self._openai.clear()
+
+_registry: Optional[ClientRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_client_registry() -> ClientRegistry:
+    """Process-wide client registry, warming up connections when it is first created"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ClientRegistry()
+            if Config.LLM_WARM_UP:
+                _registry.warm_up()
+        return _registry
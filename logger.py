@@ -1,135 +1,164 @@
-import json
 import os
+import sys
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
 from config import Config
 from models import FocusFlowSession, FocusSession, Goal, Reflection
+from storage import SessionStorage, create_storage, read_session_file, build_stats
+from archive import ColdArchive, merge_counts
+from exporter import export_sessions
+from persistence import WriteBehindError, get_write_queue
+from serialization import session_record
+
+def default_log_file(log_format: str) -> str:
+    """Default session log path for a storage format"""
+    return {
+        "jsonl": Config.JOURNAL_FILE,
+        "sqlite": Config.SQLITE_FILE,
+        "segmented": Config.SEGMENT_DIR,
+    }.get(log_format, Config.LOG_FILE)
 
 class FocusLogger:
     """Logger for saving focus session data and reflections"""
     
-    def __init__(self, log_file: str = None):
-        self.log_file = log_file or Config.LOG_FILE
+    def __init__(self, log_file: str = None, log_format: str = None, storage: SessionStorage = None,
+                 write_behind: bool = None):
+        self.log_format = log_format or Config.LOG_FORMAT
+        self.write_behind = Config.WRITE_BEHIND if write_behind is None else write_behind
+        self.log_file = log_file or default_log_file(self.log_format)
+        self.storage = storage or create_storage(self.log_format, self.log_file)
+        archive_name = os.path.splitext(os.path.basename(self.log_file.rstrip(os.sep)))[0]
+        self.archive = ColdArchive(archive_name, time_key="start_time")
+    
         
     def save_session(self, session: FocusFlowSession) -> bool:
-        """Save a complete focus flow session"""
+        """Save a complete focus flow session
+        
+        With write-behind enabled the record is handed to the background
+        writer and this returns immediately; pending saves are flushed
+        before any read and at process exit.
+        """
         try:
-            # Load existing sessions
-            sessions = self.load_all_sessions()
-            
-            # Add new session
-            sessions.append(session.dict())
-            
-            # Save back to file
-            with open(self.log_file, 'w') as f:
-                json.dump(sessions, f, indent=2, default=str)
-                
+            record = session_record(session)
+            if self.write_behind:
+                get_write_queue().submit(self._commit, record)
+            else:
+                self.storage.append(record)
             return True
         except Exception as e:
             print(f"Error saving session: {e}")
             return False
     
+    def _commit(self, records: List[Dict[str, Any]]):
+        """Group commit for this logger's queued saves"""
+        self.storage.append_many(records)
+    
+    def flush(self):
+        """Block until queued saves have been written
+        
+        Raises ``WriteBehindError`` if this logger's saves still cannot be
+        written; failures of other writers sharing the queue are theirs.
+        """
+        if self.write_behind:
+            get_write_queue().flush(commits=[self._commit])
+    
+    def _flush_for_read(self):
+        """Flush before a read, reporting a failed write instead of failing the read
+        
+        Whatever is already on disk is still served.
+        """
+        try:
+            self.flush()
+        except WriteBehindError as e:
+            print(f"Error writing data: {e}")
+    
+    def close(self):
+        """Write pending saves and close the storage engine"""
+        self._flush_for_read()
+        self.storage.close()
+    
     def load_all_sessions(self) -> List[Dict[str, Any]]:
         """Load all saved sessions"""
         try:
-            if os.path.exists(self.log_file):
-                with open(self.log_file, 'r') as f:
-                    return json.load(f)
-            return []
+            return list(self.iter_sessions())
         except Exception as e:
             print(f"Error loading sessions: {e}")
             return []
     
+    def iter_sessions(self, start: datetime = None, end: datetime = None) -> Iterator[Dict[str, Any]]:
+        """Stream sessions in [start, end) from the archive and the hot log, oldest first
+        
+        The archive manifest prunes by time range, so recent-only queries
+        never open a compressed archive.
+        """
+        self._flush_for_read()
+        yield from self.archive.iter_records(start, end)
+        yield from self.storage.iter_sessions(start, end)
+    
+    def tail(self, count: int) -> List[Dict[str, Any]]:
+        """Return the last ``count`` sessions, reaching into the archive only if needed"""
+        self._flush_for_read()
+        sessions = self.storage.tail(count)
+        if len(sessions) < count:
+            sessions = self.archive.tail(count - len(sessions)) + sessions
+        return sessions
+    
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Look up one session by id in the hot log, then the archive"""
+        self._flush_for_read()
+        session = self.storage.get(session_id)
+        if session is None:
+            session = next((s for s in self.archive.iter_records() if s.get('session_id') == session_id), None)
+        return session
+    
+    def migrate_legacy_log(self, source_file: str = None) -> int:
+        """One-shot migration of a JSON array log into this logger's storage
+        
+        Returns the number of sessions migrated. The source file is renamed
+        with a ``.migrated`` suffix so the migration is never applied twice.
+        """
+        source_file = source_file or Config.LOG_FILE
+        self.flush()
+        if not os.path.exists(source_file) or os.path.abspath(source_file) == os.path.abspath(self.log_file):
+            return 0
+        
+        legacy_sessions = read_session_file(source_file)
+        self.storage.import_sessions(legacy_sessions)
+        os.replace(source_file, f"{source_file}.migrated")
+        
+        return len(legacy_sessions)
+    
     def get_recent_sessions(self, days: int = 7) -> List[Dict[str, Any]]:
         """Get sessions from the last N days"""
-        sessions = self.load_all_sessions()
         cutoff_date = datetime.now() - timedelta(days=days)
-        
-        recent_sessions = []
-        for session in sessions:
-            session_date = datetime.fromisoformat(session['start_time'].replace('Z', '+00:00'))
-            if session_date >= cutoff_date:
-                recent_sessions.append(session)
-                
-        return recent_sessions
+        return list(self.iter_sessions(start=cutoff_date))
     
     def get_session_stats(self) -> Dict[str, Any]:
         """Get statistics from all sessions"""
-        sessions = self.load_all_sessions()
-        
-        if not sessions:
-            return {
-                "total_sessions": 0,
-                "total_focus_time": 0,
-                "success_rate": 0,
-                "average_session_length": 0
-            }
-        
-        total_sessions = len(sessions)
-        total_focus_time = sum(s.get('total_focus_time', 0) for s in sessions)
+        self._flush_for_read()
+        stats = self.storage.session_stats()
+        archived = {}
+        for day in self.archive.load_daily().values():
+            merge_counts(archived, day)
+        if not archived:
+            return stats
         
-        # Calculate success rate
-        completed_goals = 0
-        total_goals = 0
-        
-        for session in sessions:
-            for focus_session in session.get('focus_sessions', []):
-                if focus_session.get('reflection'):
-                    total_goals += 1
-                    if focus_session['reflection'].get('goal_achieved', False):
-                        completed_goals += 1
-        
-        success_rate = completed_goals / total_goals if total_goals > 0 else 0
-        avg_session_length = total_focus_time / total_sessions if total_sessions > 0 else 0
-        
-        return {
-            "total_sessions": total_sessions,
-            "total_focus_time": total_focus_time,
-            "success_rate": success_rate,
-            "average_session_length": avg_session_length,
-            "total_goals": total_goals,
-            "completed_goals": completed_goals
-        }
+        return build_stats(
+            stats["total_sessions"] + archived.get("sessions", 0),
+            stats["total_focus_time"] + archived.get("focus_time", 0),
+            stats["total_goals"] + archived.get("goals", 0),
+            stats["completed_goals"] + archived.get("completed_goals", 0)
+        )
     
     def export_summary(self, filename: str = None) -> str:
         """Export a summary of all sessions"""
-        if not filename:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"focus_flow_summary_{timestamp}.txt"
-        
-        stats = self.get_session_stats()
-        sessions = self.load_all_sessions()
-        
-        with open(filename, 'w') as f:
-            f.write("=== Focus Flow Agent Session Summary ===\n\n")
-            f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            
-            # Overall stats
-            f.write("📊 OVERALL STATISTICS\n")
-            f.write("=" * 30 + "\n")
-            f.write(f"Total Sessions: {stats['total_sessions']}\n")
-            f.write(f"Total Focus Time: {stats['total_focus_time']} minutes\n")
-            f.write(f"Success Rate: {stats['success_rate']:.1%}\n")
-            f.write(f"Average Session Length: {stats['average_session_length']:.1f} minutes\n\n")
-            
-            # Recent sessions
-            f.write("📅 RECENT SESSIONS\n")
-            f.write("=" * 30 + "\n")
-            
-            for session in sessions[-5:]:  # Last 5 sessions
-                start_time = datetime.fromisoformat(session['start_time'].replace('Z', '+00:00'))
-                f.write(f"\nSession: {start_time.strftime('%Y-%m-%d %H:%M')}\n")
-                f.write(f"Duration: {session.get('total_focus_time', 0)} minutes\n")
-                
-                for i, focus_session in enumerate(session.get('focus_sessions', []), 1):
-                    goal = focus_session.get('goal', {})
-                    reflection = focus_session.get('reflection', {})
-                    
-                    f.write(f"  Block {i}: {goal.get('description', 'No goal')}\n")
-                    if reflection:
-                        achieved = "✅" if reflection.get('goal_achieved') else "❌"
-                        f.write(f"    {achieved} Goal achieved: {reflection.get('goal_achieved', False)}\n")
-                        if reflection.get('distractions'):
-                            f.write(f"    Distractions: {reflection['distractions']}\n")
-        
-        return filename 
\ No newline at end of file
+        return export_sessions(self, filename, "txt")
+
+if __name__ == "__main__":
+    # Usage: python logger.py [jsonl|sqlite|segmented]
+    target = FocusLogger(log_format=sys.argv[1] if len(sys.argv) > 1 else "jsonl")
+    try:
+        migrated = target.migrate_legacy_log()
+    finally:
+        target.close()
+    print(f"Migrated {migrated} sessions to {target.log_file}")
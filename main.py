@@ -80,7 +80,10 @@ def start_focus_session():
     available_time = get_available_time()
     
     agent = FocusFlowAgent()
-    success = agent.start_session(available_time)
+    try:
+        success = agent.start_session(available_time)
+    finally:
+        agent.close()
     
     if success:
         console.print("\n[bold green]🎉 Session completed successfully![/bold green]")
@@ -90,12 +93,18 @@ def start_focus_session():
 def view_statistics():
     """View user statistics"""
     agent = FocusFlowAgent()
-    agent.show_stats()
+    try:
+        agent.show_stats()
+    finally:
+        agent.close()
 
 def export_data():
     """Export user data"""
     agent = FocusFlowAgent()
-    agent.export_data()
+    try:
+        agent.export_data()
+    finally:
+        agent.close()
 
 def show_about():
     """Show information about the Focus Flow Agent"""
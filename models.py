@@ -27,8 +27,16 @@ class FocusSession(BaseModel):
     duration_minutes: int
     goal: Goal
     reflection: Optional[Reflection] = None
+    # Generated in the background while the block runs; shown only, never persisted
+    reflection_prompt: Optional[str] = Field(default=None, exclude=True)
     completed: bool = False
 
+class BlockPlan(BaseModel):
+    """Duration, coaching advice and goal prompt for the next focus block"""
+    duration: int = Field(ge=15, le=60)  # minutes
+    suggestion: str
+    goal_prompt: str
+
 class FocusFlowSession(BaseModel):
     """Represents a complete focus flow session with multiple blocks"""
     session_id: str
@@ -1,50 +1,153 @@
 import requests
 import json
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, Iterator
 from config import Config
-from models import Goal, Reflection
+from pydantic import ValidationError
+from models import BlockPlan, Goal, Reflection
+from llm_cache import cache_key, get_response_cache
+from streaming import JsonStringField, collect_stream, extract_json, iter_sse_content, stream_text
+from resilience import CircuitOpenError, acall_with_resilience, call_with_resilience, get_breaker
+from llm_clients import api_base_url, chat_completions_url, get_client_registry
 
 class NemotronAgent:
     """Interface with Nemotron API for intelligent goal-setting and reflection"""
     
+    DEFAULT_GOAL_PROMPT = "What would you like to accomplish in this focus session?"
+    
     def __init__(self):
         self.api_key = Config.NEMOTRON_API_KEY
-        self.api_url = Config.NEMOTRON_API_URL
-        
-    def _make_request(self, messages: list) -> Optional[str]:
-        """Make a request to Nemotron API"""
-        if not self.api_key:
-            return None
-            
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "model": "nemotron-3-8b-chat-4k",
+        # Raw HTTP calls post to the full endpoint, the async OpenAI client takes the base URL
+        self.api_url = chat_completions_url()
+        self.base_url = api_base_url()
+        self.model = "nemotron-3-8b-chat-4k"
+        # One breaker per model: failures of this agent's model must not block AdaptiveAgent's
+        self.breaker = get_breaker(f"nemotron:{self.model}")
+        self.session = get_client_registry().http_session()
+    
+    def _request_data(self, messages: list) -> Dict[str, Any]:
+        return {
+            "model": self.model,
             "messages": messages,
             "max_tokens": 500,
             "temperature": 0.7
         }
+    
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+    
+    def _post(self, data: Dict[str, Any], timeout: float, stream: bool = False) -> requests.Response:
+        response = self.session.post(self.api_url, headers=self._headers(), json=data, timeout=timeout, stream=stream)
+        response.raise_for_status()
+        return response
+    
+    def _cache_key(self, data: Dict[str, Any]) -> str:
+        return cache_key(data["model"], {"max_tokens": data["max_tokens"], "temperature": data["temperature"]}, data["messages"])
+    
+    def _make_request(self, messages: list, use_cache: bool = True) -> Optional[str]:
+        """Make a request to Nemotron API
+        
+        Identical requests are answered from the shared response cache
+        unless ``use_cache`` is False.
+        """
+        if not self.api_key:
+            return None
+        
+        data = self._request_data(messages)
+        cache = get_response_cache() if use_cache else None
+        if cache is not None:
+            key = self._cache_key(data)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
         
         try:
-            response = requests.post(self.api_url, headers=headers, json=data)
-            response.raise_for_status()
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
+            result = call_with_resilience(lambda timeout: self._post(data, timeout).json(), self.breaker)
+            content = result["choices"][0]["message"]["content"]
+        except CircuitOpenError:
+            # Service is known to be down: go straight to the caller's fallback
+            return None
         except Exception as e:
             # Don't expose API details in error messages
             print(f"Error calling AI service: {type(e).__name__}")
             return None
+        
+        if cache is not None and content:
+            cache.put(key, content)
+        return content
     
-    def suggest_goal(self, session_number: int, previous_goals: list = None) -> str:
-        """Suggest a goal for the current focus session"""
+    def stream_request(self, messages: list, use_cache: bool = True) -> Iterator[str]:
+        """Stream a request to Nemotron API, yielding visible text chunks as they arrive
+        
+        ``<think>`` sections are filtered out. Yields nothing when the API
+        is not configured or the request fails.
+        """
+        if not self.api_key:
+            return
+        
+        data = self._request_data(messages)
+        cache = get_response_cache() if use_cache else None
+        
+        def open_stream():
+            # Retries only cover opening the stream; the read timeout also bounds stalls between chunks
+            response = call_with_resilience(
+                lambda timeout: self._post({**data, "stream": True}, timeout, stream=True), self.breaker
+            )
+            with response:
+                yield from iter_sse_content(response.iter_lines(decode_unicode=True))
+        
+        yield from stream_text(open_stream, cache, self._cache_key(data) if cache is not None else None)
+    
+    def _complete(self, messages: list, on_token: Callable[[str], None] = None) -> Optional[str]:
+        """Full response text, streamed through ``on_token`` when one is given"""
+        if on_token is None:
+            return self._make_request(messages)
+        return collect_stream(self.stream_request(messages), on_token)
+    
+    async def _make_request_async(self, messages: list, use_cache: bool = True) -> Optional[str]:
+        """Async ``_make_request`` on the shared AsyncOpenAI client
+        
+        At most LLM_MAX_CONCURRENCY calls are in flight per event loop.
+        Cancelling the calling task cancels the HTTP request.
+        """
+        if not self.api_key:
+            return None
+        
+        data = self._request_data(messages)
+        cache = get_response_cache() if use_cache else None
+        if cache is not None:
+            key = self._cache_key(data)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        
+        registry = get_client_registry()
+        client = registry.async_openai_client(self.base_url, self.api_key)
+        try:
+            async with registry.async_limiter():
+                completion = await acall_with_resilience(
+                    lambda timeout: client.chat.completions.create(timeout=timeout, **data), self.breaker
+                )
+            content = completion.choices[0].message.content
+        except CircuitOpenError:
+            return None
+        except Exception as e:
+            # Don't expose API details in error messages
+            print(f"Error calling AI service: {type(e).__name__}")
+            return None
+        
+        if cache is not None and content:
+            cache.put(key, content)
+        return content
+    
+    def _goal_messages(self, session_number: int, previous_goals: list = None) -> list:
         context = f"This is focus session #{session_number}."
         if previous_goals:
             context += f" Previous goals were: {', '.join([g.description for g in previous_goals])}"
         
-        messages = [
+        return [
             {
                 "role": "system",
                 "content": """You are a helpful productivity coach. Help users set specific, achievable goals for their 25-minute focus sessions. 
@@ -55,13 +158,23 @@ class NemotronAgent:
                 "content": f"{context} What would you like to accomplish in this focus session? Please be specific and realistic for a 25-minute block."
             }
         ]
+    
+    def suggest_goal(self, session_number: int, previous_goals: list = None,
+                     on_token: Callable[[str], None] = None) -> str:
+        """Suggest a goal for the current focus session
         
-        response = self._make_request(messages)
-        return response or "What would you like to accomplish in this focus session?"
+        Pass ``on_token`` to receive the suggestion incrementally as it streams.
+        """
+        response = self._complete(self._goal_messages(session_number, previous_goals), on_token)
+        return response or self.DEFAULT_GOAL_PROMPT
     
-    def reflect_on_session(self, goal: Goal, session_duration: int) -> Dict[str, str]:
-        """Guide reflection on the completed session"""
-        messages = [
+    async def suggest_goal_async(self, session_number: int, previous_goals: list = None) -> str:
+        """Async ``suggest_goal``"""
+        response = await self._make_request_async(self._goal_messages(session_number, previous_goals))
+        return response or self.DEFAULT_GOAL_PROMPT
+    
+    def _reflection_messages(self, goal: Goal, session_duration: int) -> list:
+        return [
             {
                 "role": "system",
                 "content": """You are a supportive productivity coach. Help users reflect on their focus session. 
@@ -80,8 +193,9 @@ class NemotronAgent:
                 Please share your thoughts:"""
             }
         ]
-        
-        response = self._make_request(messages)
+    
+    @staticmethod
+    def _reflection_result(response: Optional[str]) -> Dict[str, str]:
         return {
             "reflection_prompt": response or "How did your focus session go?",
             "goal_achieved": False,  # Will be updated based on user input
@@ -91,17 +205,31 @@ class NemotronAgent:
             "next_time_improvements": ""
         }
     
-    def suggest_adaptation(self, previous_sessions: list, current_goal: str) -> Dict[str, Any]:
-        """Suggest adaptations based on previous sessions"""
-        if not previous_sessions:
-            return {"duration": 25, "suggestion": "Let's start with a standard 25-minute session!"}
+    def reflect_on_session(self, goal: Goal, session_duration: int,
+                           on_token: Callable[[str], None] = None) -> Dict[str, str]:
+        """Guide reflection on the completed session
         
-        # Analyze previous sessions
+        Pass ``on_token`` to receive the reflection prompt incrementally as it streams.
+        """
+        response = self._complete(self._reflection_messages(goal, session_duration), on_token)
+        return self._reflection_result(response)
+    
+    async def reflect_on_session_async(self, goal: Goal, session_duration: int) -> Dict[str, str]:
+        """Async ``reflect_on_session``"""
+        response = await self._make_request_async(self._reflection_messages(goal, session_duration))
+        return self._reflection_result(response)
+    
+    @staticmethod
+    def _session_stats(previous_sessions: list) -> tuple:
+        """Completed goals, total sessions and success rate"""
         completed_goals = sum(1 for s in previous_sessions if s.reflection and s.reflection.goal_achieved)
         total_sessions = len(previous_sessions)
         success_rate = completed_goals / total_sessions if total_sessions > 0 else 0
-        
-        messages = [
+        return completed_goals, total_sessions, success_rate
+    
+    def _adaptation_messages(self, previous_sessions: list, current_goal: str) -> list:
+        completed_goals, total_sessions, success_rate = self._session_stats(previous_sessions)
+        return [
             {
                 "role": "system",
                 "content": """You are an adaptive productivity coach. Based on previous session performance, 
@@ -120,8 +248,9 @@ class NemotronAgent:
                 - Specific strategies"""
             }
         ]
-        
-        response = self._make_request(messages)
+    
+    def _adaptation_result(self, previous_sessions: list, response: Optional[str]) -> Dict[str, Any]:
+        _, total_sessions, success_rate = self._session_stats(previous_sessions)
         
         # Default adaptation logic
         if success_rate < 0.5:
@@ -135,4 +264,95 @@ class NemotronAgent:
             "duration": duration,
             "suggestion": response or suggestion,
             "success_rate": success_rate
-        } 
\ No newline at end of file
+        }
+    
+    def suggest_adaptation(self, previous_sessions: list, current_goal: str,
+                           on_token: Callable[[str], None] = None) -> Dict[str, Any]:
+        """Suggest adaptations based on previous sessions
+        
+        Pass ``on_token`` to receive the suggestion incrementally as it streams.
+        """
+        if not previous_sessions:
+            return {"duration": 25, "suggestion": "Let's start with a standard 25-minute session!"}
+        
+        response = self._complete(self._adaptation_messages(previous_sessions, current_goal), on_token)
+        return self._adaptation_result(previous_sessions, response)
+    
+    async def suggest_adaptation_async(self, previous_sessions: list, current_goal: str) -> Dict[str, Any]:
+        """Async ``suggest_adaptation``"""
+        if not previous_sessions:
+            return {"duration": 25, "suggestion": "Let's start with a standard 25-minute session!"}
+        
+        response = await self._make_request_async(self._adaptation_messages(previous_sessions, current_goal))
+        return self._adaptation_result(previous_sessions, response)
+    
+    def _block_plan_messages(self, block_number: int, previous_sessions: list, current_goal: str) -> list:
+        context = f"This is focus session #{block_number}."
+        if previous_sessions:
+            completed_goals, total_sessions, success_rate = self._session_stats(previous_sessions)
+            context += (f" Previous sessions: {total_sessions} total, {completed_goals} goals achieved"
+                        f" ({success_rate:.1%} success rate)."
+                        f" Previous goals were: {', '.join(s.goal.description for s in previous_sessions)}.")
+        if current_goal:
+            context += f" Current goal: {current_goal}."
+        
+        return [
+            {
+                "role": "system",
+                "content": """You are an adaptive productivity coach planning the user's next focus block.
+                Choose a focus duration (15-60 minutes; shorter if recent goals were missed), give one or two sentences of practical advice,
+                and ask the user one question that helps them set a specific, achievable goal for the block.
+                Reply with only a JSON object:
+                {"duration": 25, "suggestion": "advice", "goal_prompt": "question"}"""
+            },
+            {
+                "role": "user",
+                "content": context
+            }
+        ]
+    
+    def _block_plan_result(self, previous_sessions: list, response: Optional[str]) -> Dict[str, Any]:
+        """Validated plan, or the rule-based adaptation and default goal prompt"""
+        if previous_sessions:
+            rules = self._adaptation_result(previous_sessions, None)
+        else:
+            rules = {"duration": 25, "suggestion": "Let's start with a standard 25-minute session!", "success_rate": 0}
+        
+        value = extract_json(response) if response else None
+        try:
+            plan = BlockPlan.model_validate(value) if value is not None else None
+        except ValidationError:
+            plan = None
+        if plan is None:
+            return {**rules, "goal_prompt": self.DEFAULT_GOAL_PROMPT}
+        return {**plan.model_dump(), "success_rate": rules["success_rate"]}
+    
+    def plan_block(self, block_number: int, previous_sessions: list = None, current_goal: str = "",
+                   on_token: Callable[[str], None] = None) -> Dict[str, Any]:
+        """Plan a block in one round trip: duration, adaptation advice and a goal prompt
+        
+        Replaces a ``suggest_adaptation`` plus ``suggest_goal`` pair. Falls
+        back to the rule-based duration and advice and the default goal
+        prompt when the service is unavailable or the reply is not a valid plan.
+        Pass ``on_token`` to receive the plan's ``suggestion`` incrementally
+        as the JSON reply streams.
+        """
+        previous_sessions = previous_sessions or []
+        messages = self._block_plan_messages(block_number, previous_sessions, current_goal)
+        if on_token is None:
+            response = self._make_request(messages)
+        else:
+            suggestion = JsonStringField("suggestion")
+            def forward(chunk: str):
+                text = suggestion.feed(chunk)
+                if text:
+                    on_token(text)
+            response = collect_stream(self.stream_request(messages), forward)
+        return self._block_plan_result(previous_sessions, response)
+    
+    async def plan_block_async(self, block_number: int, previous_sessions: list = None,
+                               current_goal: str = "") -> Dict[str, Any]:
+        """Async ``plan_block``"""
+        previous_sessions = previous_sessions or []
+        response = await self._make_request_async(self._block_plan_messages(block_number, previous_sessions, current_goal))
+        return self._block_plan_result(previous_sessions, response)
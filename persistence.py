@@ -0,0 +1,259 @@
+import atexit
+import os
+import queue
+import stat
+import tempfile
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows: the lock only covers threads of this process
+    fcntl = None
+
+# Read once at import: os.umask can only be read by setting it, which is not thread-safe
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def atomic_write(path: str, data: str) -> None:
+    """Replace ``path`` with ``data`` so readers never see a partially written file
+
+    The file keeps its existing permissions; a new one gets the usual
+    ``0o666`` minus the umask rather than ``mkstemp``'s private ``0o600``.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+_path_locks: Dict[str, threading.Lock] = {}
+_path_locks_guard = threading.Lock()
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """Exclusive lock for read-modify-write cycles on ``path``
+
+    Serialises every thread of this process and, where ``fcntl`` is
+    available, every other process locking the same path, through an
+    advisory lock on ``<path>.lock``. Not reentrant.
+    """
+    key = os.path.abspath(path)
+    with _path_locks_guard:
+        lock = _path_locks.setdefault(key, threading.Lock())
+    with lock:
+        if fcntl is None:
+            yield
+            return
+        with open(key + ".lock", "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+CommitFn = Callable[[List[Any]], None]
+
+class WriteBehindError(RuntimeError):
+    """Raised by ``flush`` when queued writes still cannot be committed"""
+
+class WriteBehindQueue:
+    """Single background writer thread with a bounded queue and group commit
+
+    Callers hand over ``(commit, item)`` pairs and return immediately. The
+    writer drains everything pending, groups the items by commit function
+    and calls each commit function once with all of its items, so a burst
+    of saves becomes one disk write per file. ``flush`` blocks until
+    everything submitted so far is on disk and runs automatically at exit.
+
+    A batch whose commit fails is kept and retried with the next batch;
+    ``flush`` retries it once more and raises ``WriteBehindError`` if it
+    still fails, so a save that was accepted is never silently dropped.
+    """
+
+    _STOP = object()
+
+    def __init__(self, max_pending: int = None):
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending or Config.WRITE_QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._closed = False
+        self._commit_lock = threading.Lock()
+        self._failed: Dict[CommitFn, List[Any]] = {}
+        self._errors: Dict[CommitFn, Exception] = {}
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, commit: CommitFn, item: Any) -> None:
+        """Queue ``item`` for ``commit``; blocks only when the queue is full"""
+        if self._closed:
+            commit([item])
+            return
+        self._queue.put((commit, item))
+
+    def flush(self, timeout: Optional[float] = None, commits: Iterable[CommitFn] = None) -> None:
+        """Wait until every submitted item has been committed
+        
+        Raises ``WriteBehindError`` if earlier commits failed and still fail
+        when retried now; the items stay queued for the next attempt. Pass
+        ``commits`` to only report failures of those commit functions, so
+        one writer is not blamed for another's.
+        """
+        if timeout is None:
+            self._queue.join()
+        else:
+            with self._queue.all_tasks_done:
+                self._queue.all_tasks_done.wait_for(lambda: not self._queue.unfinished_tasks, timeout)
+        with self._commit_lock:
+            self._commit_groups({})
+            failed = list(self._failed) if commits is None else [c for c in commits if c in self._failed]
+            if failed:
+                pending = sum(len(self._failed[commit]) for commit in failed)
+                raise WriteBehindError(f"{pending} queued writes could not be committed: {self._errors[failed[-1]]}")
+
+    def _commit_groups(self, groups: Dict[CommitFn, List[Any]]) -> None:
+        """Commit previously failed items first, then ``groups``, keeping whatever fails"""
+        failed, self._failed = self._failed, {}
+        for commit, items in groups.items():
+            failed.setdefault(commit, []).extend(items)
+        for commit, items in failed.items():
+            try:
+                commit(items)
+                self._errors.pop(commit, None)
+            except Exception as e:
+                print(f"Error writing data (will retry): {e}")
+                self._failed[commit] = items
+                self._errors[commit] = e
+
+    def close(self) -> None:
+        """Flush pending writes and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put((None, self._STOP))
+        self._thread.join()
+        try:
+            self.flush()
+        except WriteBehindError as e:
+            print(f"Error writing data: {e}")
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # Group commit: one call per commit function, in first-seen order
+            groups = {}
+            stop = False
+            for commit, item in batch:
+                if item is self._STOP:
+                    stop = True
+                    continue
+                groups.setdefault(commit, []).append(item)
+
+            with self._commit_lock:
+                self._commit_groups(groups)
+
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+class DebouncedWriter:
+    """Coalesces submitted items and commits them at most once per window
+
+    The first ``submit`` after a commit starts a timer; everything
+    submitted before it fires is handed to ``commit`` as one batch. The
+    timer thread is a daemon and every live writer is flushed by a single
+    ``atexit`` hook, so pending items are written deterministically when
+    the process exits instead of whenever a stray timer happens to fire.
+    The hook only holds writers weakly, so a writer (and whatever its
+    commit function belongs to) is freed as soon as its owner is.
+
+    If a commit fails the items go back to the front of the pending list:
+    a timer-driven flush reports the error and tries again after another
+    window, while an explicit ``flush`` raises ``WriteBehindError``.
+    """
+
+    def __init__(self, commit: CommitFn, window: float):
+        self._commit = commit
+        self._window = window
+        self._pending: List[Any] = []
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        _debounced_writers.add(self)
+
+    def submit(self, item: Any) -> None:
+        """Queue ``item`` for the next commit, starting the window if needed"""
+        with self._lock:
+            self._pending.append(item)
+            if self._timer is None:
+                self._timer = threading.Timer(self._window, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        """Commit everything pending now"""
+        with self._commit_lock:
+            with self._lock:
+                items, self._pending = self._pending, []
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not items:
+                return
+            try:
+                self._commit(items)
+            except Exception as e:
+                with self._lock:
+                    self._pending[:0] = items
+                raise WriteBehindError(f"{len(items)} pending writes could not be committed: {e}") from e
+
+    def _flush_on_timer(self) -> None:
+        try:
+            self.flush()
+        except WriteBehindError as e:
+            print(f"Error writing data (will retry): {e}")
+            with self._lock:
+                if self._timer is None:
+                    self._timer = threading.Timer(self._window, self._flush_on_timer)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+_debounced_writers: "weakref.WeakSet[DebouncedWriter]" = weakref.WeakSet()
+
+@atexit.register
+def _flush_debounced_writers() -> None:
+    for writer in list(_debounced_writers):
+        writer._flush_on_timer()
+
+_write_queue: Optional[WriteBehindQueue] = None
+_write_queue_lock = threading.Lock()
+
+def get_write_queue() -> WriteBehindQueue:
+    """Process-wide write-behind queue shared by every logger and agent"""
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is None:
+            _write_queue = WriteBehindQueue()
+        return _write_queue
@@ -0,0 +1,66 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from config import Config
+
+class Prefetcher:
+    """Speculative background calls, keyed by the inputs they were started with
+
+    ``submit`` starts a call on a worker thread as soon as its inputs are
+    known; ``take`` hands back the future when the result is needed, but
+    only if it was started with the same inputs. A prefetch whose inputs
+    changed is cancelled if it has not started yet, or its result is
+    simply ignored. Each ``name`` holds at most one prefetch at a time.
+    """
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or Config.PREFETCH_WORKERS
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[str, Tuple[Hashable, Future]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def submit(self, name: str, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Optional[Future]:
+        """Start ``fn(*args, **kwargs)`` in the background unless the same prefetch is already running"""
+        if not Config.PREFETCH_ENABLED:
+            return None
+        with self._lock:
+            entry = self._pending.get(name)
+            if entry is not None:
+                if entry[0] == key:
+                    return entry[1]
+                entry[1].cancel()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="prefetch")
+            future = self._executor.submit(fn, *args, **kwargs)
+            self._pending[name] = (key, future)
+            return future
+
+    def take(self, name: str, key: Hashable) -> Optional[Future]:
+        """Prefetched future for ``name`` if it was started with ``key``, else None"""
+        with self._lock:
+            entry = self._pending.pop(name, None)
+            if entry is not None and entry[0] == key and not entry[1].cancelled():
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                entry[1].cancel()
+            self.misses += 1
+            return None
+
+    def cancel_all(self) -> None:
+        """Drop every pending prefetch (running calls finish in the background and are ignored)"""
+        with self._lock:
+            for _, future in self._pending.values():
+                future.cancel()
+            self._pending.clear()
+
+    def shutdown(self) -> None:
+        """Cancel pending prefetches and stop the worker threads"""
+        self.cancel_all()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,204 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+import openai
+import requests
+
+from config import Config
+
+T = TypeVar("T")
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a service whose circuit breaker is open"""
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one remote service
+
+    Closed: calls go through. After ``failure_threshold`` consecutive
+    retryable failures (see ``is_retryable``) the breaker opens and
+    every call is refused immediately. Once ``reset_timeout`` seconds
+    have passed it goes half-open and lets a single trial call through:
+    success closes it again, failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = None, reset_timeout: float = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or Config.BREAKER_FAILURE_THRESHOLD
+        self.reset_timeout = Config.BREAKER_RESET_SECONDS if reset_timeout is None else reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self.total_failures = 0
+        self.short_circuits = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go through now (counts a short circuit if not)"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.short_circuits += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self.total_failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def record_cancelled(self) -> None:
+        """A cancelled or rejected call says nothing about the service's health: free the half-open trial slot"""
+        with self._lock:
+            self._trial_in_flight = False
+    
+    def stats(self) -> Dict[str, Any]:
+        """Breaker state for monitoring"""
+        with self._lock:
+            state = self._current_state()
+            retry_in = None
+            if state == self.OPEN:
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+            return {
+                "name": self.name,
+                "state": state,
+                "consecutive_failures": self._failures,
+                "total_failures": self.total_failures,
+                "short_circuits": self.short_circuits,
+                "retry_in_seconds": retry_in,
+            }
+
+def is_retryable(error: Exception) -> bool:
+    """Timeouts, connection failures, rate limits and 5xx responses are worth retrying"""
+    if isinstance(error, (requests.Timeout, requests.ConnectionError,
+                          openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+    else:
+        status = getattr(error, "status_code", None)
+    return status is not None and (status == 429 or status >= 500)
+
+def call_with_resilience(attempt: Callable[[float], T], breaker: CircuitBreaker,
+                         deadline: float = None, max_retries: int = None, base_delay: float = None) -> T:
+    """Run ``attempt`` under a breaker, a total deadline and jittered retries
+
+    ``attempt`` is called with the timeout (seconds) it may use, which never
+    exceeds the per-call timeout or the time left before the deadline. Only
+    retryable errors are retried, with full-jitter exponential backoff, and
+    only they count against the breaker: a 4xx rejection means the service
+    is up. Raises ``CircuitOpenError`` without calling anything while the breaker
+    is open, and re-raises the last error once retries or time run out.
+    """
+    deadline = Config.LLM_DEADLINE_SECONDS if deadline is None else deadline
+    max_retries = Config.LLM_MAX_RETRIES if max_retries is None else max_retries
+    base_delay = Config.LLM_RETRY_BASE_DELAY if base_delay is None else base_delay
+    expires_at = time.monotonic() + deadline
+
+    for retry in range(max_retries + 1):
+        if not breaker.allow():
+            raise CircuitOpenError(f"{breaker.name} circuit is open")
+        remaining = expires_at - time.monotonic()
+        try:
+            result = attempt(max(0.1, min(Config.LLM_TIMEOUT_SECONDS, remaining)))
+        except Exception as e:
+            if not is_retryable(e):
+                breaker.record_cancelled()
+                raise
+            breaker.record_failure()
+            remaining = expires_at - time.monotonic()
+            if retry == max_retries or remaining <= 0:
+                raise
+            time.sleep(min(remaining, random.uniform(0, base_delay * 2 ** retry)))
+            continue
+        except BaseException:
+            # KeyboardInterrupt and friends: never leave the half-open trial slot taken
+            breaker.record_cancelled()
+            raise
+        breaker.record_success()
+        return result
+
+async def acall_with_resilience(attempt: Callable[[float], Awaitable[T]], breaker: CircuitBreaker,
+                                deadline: float = None, max_retries: int = None, base_delay: float = None) -> T:
+    """Async ``call_with_resilience``: same breaker, deadline and retry policy
+
+    Backoff sleeps on the event loop instead of blocking a thread. If the
+    calling task is cancelled mid-attempt the cancellation propagates
+    untouched and is not counted as a service failure.
+    """
+    deadline = Config.LLM_DEADLINE_SECONDS if deadline is None else deadline
+    max_retries = Config.LLM_MAX_RETRIES if max_retries is None else max_retries
+    base_delay = Config.LLM_RETRY_BASE_DELAY if base_delay is None else base_delay
+    loop = asyncio.get_running_loop()
+    expires_at = loop.time() + deadline
+
+    for retry in range(max_retries + 1):
+        if not breaker.allow():
+            raise CircuitOpenError(f"{breaker.name} circuit is open")
+        remaining = expires_at - loop.time()
+        try:
+            result = await attempt(max(0.1, min(Config.LLM_TIMEOUT_SECONDS, remaining)))
+        except Exception as e:
+            if not is_retryable(e):
+                breaker.record_cancelled()
+                raise
+            breaker.record_failure()
+            remaining = expires_at - loop.time()
+            if retry == max_retries or remaining <= 0:
+                raise
+            await asyncio.sleep(min(remaining, random.uniform(0, base_delay * 2 ** retry)))
+            continue
+        except BaseException:
+            # Cancellation included (it is not an Exception)
+            breaker.record_cancelled()
+            raise
+        breaker.record_success()
+        return result
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Process-wide breaker for a named service"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+def breaker_states() -> List[Dict[str, Any]]:
+    """Current state of every breaker, for dashboards and the CLI"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [breaker.stats() for breaker in breakers]
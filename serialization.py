@@ -0,0 +1,55 @@
+import json
+from datetime import date, datetime
+from typing import Any, Dict, List
+
+from pydantic import BaseModel, TypeAdapter
+
+from models import FocusFlowSession
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib path produces the same output
+    orjson = None
+
+HAS_ORJSON = orjson is not None
+
+# Built once: validating/serializing through a TypeAdapter reuses the compiled core schema
+FLOW_SESSIONS_ADAPTER = TypeAdapter(List[FocusFlowSession])
+
+def _default(value: Any) -> Any:
+    """Fallback for types the stdlib encoder does not know"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if hasattr(value, "item"):  # NumPy scalars
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(obj: Any) -> str:
+    """Serialize to compact JSON, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(obj, separators=(',', ':'), default=_default)
+
+def loads(data: Any) -> Any:
+    """Parse JSON text or bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def session_record(session: BaseModel) -> Dict[str, Any]:
+    """JSON-ready dict for a model (datetimes as ISO strings)"""
+    return session.model_dump(mode="json")
+
+def session_json(session: BaseModel) -> str:
+    """Compact JSON for a model, serialized directly by pydantic-core"""
+    return session.model_dump_json()
+
+def sessions_json(sessions: List[FocusFlowSession]) -> bytes:
+    """Compact JSON array for a list of flow sessions"""
+    return FLOW_SESSIONS_ADAPTER.dump_json(sessions)
+
+def parse_sessions(data: Any) -> List[FocusFlowSession]:
+    """Validate a JSON array of flow sessions back into models"""
+    return FLOW_SESSIONS_ADAPTER.validate_json(data)
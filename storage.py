@@ -0,0 +1,1008 @@
+import bisect
+from abc import ABC, abstractmethod
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+from datetime import datetime
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from config import Config
+from persistence import atomic_write
+from serialization import dumps, loads
+
+def parse_timestamp(value: Any) -> datetime:
+    """Parse a stored ISO timestamp (with or without a trailing Z)"""
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+
+def iter_session_file(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream sessions from either a JSON array file or a JSONL journal
+
+    Journals are read line by line; legacy JSON arrays have to be parsed
+    as a whole.
+    """
+    with open(path, 'r') as f:
+        head = f.read(1)
+        while head and head.isspace():
+            head = f.read(1)
+        if not head:
+            return
+
+        f.seek(0)
+        if head == '[':
+            yield from loads(f.read())
+            return
+
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield loads(line)
+            except json.JSONDecodeError:
+                # A torn final write should not hide the rest of the journal
+                print(f"Skipping unreadable journal line {line_number} in {path}")
+
+def read_session_file(path: str) -> List[Dict[str, Any]]:
+    """Read sessions from either a JSON array file or a JSONL journal"""
+    return list(iter_session_file(path))
+
+def session_totals(session: Dict[str, Any]) -> Tuple[int, int, int]:
+    """Return (focus time, reflected goals, achieved goals) for one session record"""
+    total_goals = 0
+    completed_goals = 0
+    for focus_session in session.get('focus_sessions', []):
+        if focus_session.get('reflection'):
+            total_goals += 1
+            if focus_session['reflection'].get('goal_achieved', False):
+                completed_goals += 1
+    return session.get('total_focus_time', 0), total_goals, completed_goals
+
+def compute_session_stats(sessions: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Compute overall statistics with a single pass over session records"""
+    total_sessions = 0
+    total_focus_time = 0
+    completed_goals = 0
+    total_goals = 0
+
+    for session in sessions:
+        focus_time, goals, completed = session_totals(session)
+        total_sessions += 1
+        total_focus_time += focus_time
+        total_goals += goals
+        completed_goals += completed
+
+    return build_stats(total_sessions, total_focus_time, total_goals, completed_goals)
+
+def build_stats(total_sessions: int, total_focus_time: int, total_goals: int, completed_goals: int) -> Dict[str, Any]:
+    """Shape raw totals into the statistics dict shown by the CLI"""
+    if not total_sessions:
+        return {
+            "total_sessions": 0,
+            "total_focus_time": 0,
+            "success_rate": 0,
+            "average_session_length": 0,
+            "total_goals": 0,
+            "completed_goals": 0
+        }
+
+    return {
+        "total_sessions": total_sessions,
+        "total_focus_time": total_focus_time,
+        "success_rate": completed_goals / total_goals if total_goals > 0 else 0,
+        "average_session_length": total_focus_time / total_sessions,
+        "total_goals": total_goals,
+        "completed_goals": completed_goals
+    }
+
+def file_fingerprint(path: str) -> list:
+    """Size and modification time of a file, or an empty marker if it is missing"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return [0, 0]
+    return [stat.st_size, stat.st_mtime_ns]
+
+def _in_range(session: Dict[str, Any], start: Optional[datetime], end: Optional[datetime]) -> bool:
+    """Check whether a session record starts inside [start, end)"""
+    if start is None and end is None:
+        return True
+    session_date = parse_timestamp(session['start_time'])
+    if start is not None and session_date < start:
+        return False
+    if end is not None and session_date >= end:
+        return False
+    return True
+
+class SessionStorage(ABC):
+    """Base storage engine behind FocusLogger
+
+    Engines have to implement ``append``, ``iter_sessions`` and
+    ``delete_before``; the remaining queries fall back to a scan and can
+    be overridden with something faster.
+    """
+
+    @abstractmethod
+    def append(self, record: Dict[str, Any]) -> None:
+        """Persist one flow session record"""
+
+    def append_many(self, records: List[Dict[str, Any]]) -> None:
+        """Persist a batch of records, ideally as a single write"""
+        for record in records:
+            self.append(record)
+
+    @abstractmethod
+    def iter_sessions(self, start: datetime = None, end: datetime = None) -> Iterator[Dict[str, Any]]:
+        """Yield session records whose start time falls in [start, end)"""
+
+    def load_all(self) -> List[Dict[str, Any]]:
+        """Load every stored session record"""
+        return list(self.iter_sessions())
+
+    def tail(self, count: int) -> List[Dict[str, Any]]:
+        """Return the last ``count`` stored sessions"""
+        return self.load_all()[-count:] if count > 0 else []
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return the stored session with this id, or None"""
+        found = None
+        for session in self.iter_sessions():
+            if session.get('session_id') == session_id:
+                found = session
+        return found
+
+    def session_stats(self) -> Dict[str, Any]:
+        """Compute overall statistics"""
+        return compute_session_stats(self.iter_sessions())
+
+    def fingerprint(self) -> Optional[list]:
+        """Cheap marker that changes whenever the stored data changes
+
+        Used to detect when derived data such as materialized aggregates is
+        stale. ``None`` means the engine cannot tell.
+        """
+        return None
+
+    def import_sessions(self, records: List[Dict[str, Any]]) -> None:
+        """Bulk-load records that predate everything already stored"""
+        for record in records:
+            self.append(record)
+
+    @abstractmethod
+    def delete_before(self, cutoff: datetime) -> None:
+        """Drop every session that started before ``cutoff``"""
+
+    def close(self) -> None:
+        """Release any open handles (file engines hold none between calls)"""
+
+class StatsAggregates:
+    """Materialized totals behind ``session_stats`` for a file-backed log
+
+    The totals live in a small JSON sidecar next to the log together with
+    the log's fingerprint at the time they were written. A missing sidecar,
+    or a log changed behind our back, is detected on read and rebuilt.
+    """
+
+    FIELDS = ("total_sessions", "total_focus_time", "total_goals", "completed_goals")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._totals: Optional[Dict[str, int]] = None
+        self._fingerprint: Optional[list] = None
+        self._loaded = False
+
+    def _load(self) -> None:
+        self._loaded = True
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            self._totals = {field: int(data[field]) for field in self.FIELDS}
+            self._fingerprint = data["fingerprint"]
+        except (OSError, ValueError, KeyError, TypeError):
+            self._totals = None
+            self._fingerprint = None
+
+    def _save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({**self._totals, "fingerprint": self._fingerprint}, f)
+        os.replace(tmp_path, self.path)
+
+    def is_fresh(self, fingerprint: list) -> bool:
+        """Whether the stored totals describe the log with this fingerprint"""
+        if not self._loaded:
+            self._load()
+        return self._totals is not None and self._fingerprint == fingerprint
+
+    def add(self, records: List[Dict[str, Any]], fingerprint: list) -> None:
+        """Fold newly appended sessions into the totals"""
+        for record in records:
+            focus_time, goals, completed = session_totals(record)
+            self._totals["total_sessions"] += 1
+            self._totals["total_focus_time"] += focus_time
+            self._totals["total_goals"] += goals
+            self._totals["completed_goals"] += completed
+        self._fingerprint = fingerprint
+        self._save()
+
+    def rebuild(self, sessions: Iterable[Dict[str, Any]], fingerprint: list) -> None:
+        """Recompute the totals from a full scan of the log"""
+        self._totals = dict.fromkeys(self.FIELDS, 0)
+        for session in sessions:
+            focus_time, goals, completed = session_totals(session)
+            self._totals["total_sessions"] += 1
+            self._totals["total_focus_time"] += focus_time
+            self._totals["total_goals"] += goals
+            self._totals["completed_goals"] += completed
+        self._fingerprint = fingerprint
+        self._loaded = True
+        self._save()
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistics dict built from the stored totals"""
+        return build_stats(**self._totals)
+
+class FileSessionStorage(SessionStorage):
+    """Shared behaviour for engines that keep the whole log in one file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.aggregates = StatsAggregates(f"{path}.stats.json")
+
+    @abstractmethod
+    def _write(self, records: List[Dict[str, Any]]) -> None:
+        """Append records to the log file"""
+
+    def append(self, record: Dict[str, Any]) -> None:
+        self.append_many([record])
+
+    def append_many(self, records: List[Dict[str, Any]]) -> None:
+        # Only fold the records in when the totals matched the log before the
+        # write; otherwise leave them stale for session_stats to rebuild.
+        fresh = self.aggregates.is_fresh(self.fingerprint())
+        self._write(records)
+        if fresh:
+            self.aggregates.add(records, self.fingerprint())
+
+    def session_stats(self) -> Dict[str, Any]:
+        fingerprint = self.fingerprint()
+        if not self.aggregates.is_fresh(fingerprint):
+            self.aggregates.rebuild(self.iter_sessions(), fingerprint)
+        return self.aggregates.stats()
+
+    def fingerprint(self) -> Optional[list]:
+        return file_fingerprint(self.path)
+
+class JsonArrayStorage(FileSessionStorage):
+    """Original storage: the whole history as one JSON array, rewritten on every save
+
+    Range reads use a start-time index (sorted times plus the array
+    position of each) cached against the file's fingerprint, so repeated
+    queries bisect instead of parsing every record's timestamp.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._start_index: Optional[Tuple[list, List[datetime], List[int]]] = None
+
+    def _load(self) -> List[Dict[str, Any]]:
+        return read_session_file(self.path) if os.path.exists(self.path) else []
+
+    def _write(self, records: List[Dict[str, Any]]) -> None:
+        sessions = self._load()
+        sessions.extend(records)
+        atomic_write(self.path, dumps(sessions))
+
+    def iter_sessions(self, start: datetime = None, end: datetime = None) -> Iterator[Dict[str, Any]]:
+        # Fingerprint before reading: a write in between only makes the index look stale
+        fingerprint = self.fingerprint()
+        sessions = self._load()
+        if start is None and end is None:
+            yield from sessions
+            return
+
+        index = self._start_index
+        if index is None or index[0] != fingerprint or len(index[2]) != len(sessions):
+            times = [parse_timestamp(session['start_time']) for session in sessions]
+            order = sorted(range(len(sessions)), key=times.__getitem__)
+            index = self._start_index = (fingerprint, [times[i] for i in order], order)
+
+        _, sorted_times, order = index
+        lo = 0 if start is None else bisect.bisect_left(sorted_times, start)
+        hi = len(order) if end is None else bisect.bisect_left(sorted_times, end)
+        # Keep file order, like a full scan would
+        for position in sorted(order[lo:hi]):
+            yield sessions[position]
+
+    def import_sessions(self, records: List[Dict[str, Any]]) -> None:
+        atomic_write(self.path, dumps(records + self._load()))
+
+    def delete_before(self, cutoff: datetime) -> None:
+        kept = list(self.iter_sessions(start=cutoff))
+        atomic_write(self.path, dumps(kept))
+
+class JournalIndex:
+    """Fixed-width offset index kept next to a JSONL journal
+
+    Every journal record gets one ``ENTRY``: its byte offset and length,
+    its start time as epoch seconds and its session id (first 64 bytes).
+    Entries are appended together with the records, so the newest ``k``
+    records are found by reading the last ``k`` entries, and records are
+    decoded straight from an ``mmap`` of the journal without reading the
+    rest of it. An index that falls behind the journal (a journal written
+    before the index existed, or a crash between the two appends) is
+    caught up on the next read.
+    """
+
+    ENTRY = struct.Struct("<QId64s")
+
+    def __init__(self, path: str, journal_path: str):
+        self.path = path
+        self.journal_path = journal_path
+        self._entries: Optional[List[tuple]] = None
+        self._ids: Optional[Dict[bytes, int]] = None
+        self._sorted = False
+
+    @classmethod
+    def pack(cls, offset: int, length: int, record: Dict[str, Any]) -> bytes:
+        """Index entry for one record written at ``offset``"""
+        start = parse_timestamp(record['start_time']).timestamp()
+        return cls.ENTRY.pack(offset, length, start, str(record.get('session_id', '')).encode()[:64])
+
+    def _count(self) -> int:
+        try:
+            return os.path.getsize(self.path) // self.ENTRY.size
+        except FileNotFoundError:
+            return 0
+
+    def _read_entries(self, first: int, count: int = None) -> List[tuple]:
+        size = self.ENTRY.size
+        with open(self.path, 'rb') as f:
+            f.seek(first * size)
+            data = f.read(-1 if count is None else count * size)
+        return list(self.ENTRY.iter_unpack(data[:len(data) - len(data) % size]))
+
+    def _scan(self, offset: int) -> bytes:
+        """Index entries for every readable journal record from ``offset`` on"""
+        entries = []
+        with open(self.journal_path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if line.strip():
+                    try:
+                        entries.append(self.pack(offset, len(line), loads(line)))
+                    except (ValueError, KeyError):
+                        pass
+                offset += len(line)
+        return b"".join(entries)
+
+    def _reset(self) -> None:
+        self._entries = None
+        self._ids = None
+
+    def append(self, entries: bytes) -> None:
+        """Add entries for records just appended to the journal"""
+        with open(self.path, 'ab') as f:
+            f.write(entries)
+        if self._entries is not None:
+            added = list(self.ENTRY.iter_unpack(entries))
+            self._sorted = self._sorted and all(
+                a[2] <= b[2] for a, b in zip(self._entries[-1:] + added, added)
+            )
+            if self._ids is not None:
+                for position, entry in enumerate(added, len(self._entries)):
+                    self._ids[entry[3].rstrip(b"\0")] = position
+            self._entries.extend(added)
+
+    def rebuild(self) -> None:
+        """Rewrite the whole index from the journal"""
+        entries = self._scan(0) if os.path.exists(self.journal_path) else b""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(entries)
+        os.replace(tmp_path, self.path)
+        self._reset()
+
+    def sync(self) -> None:
+        """Bring the index up to date with the journal"""
+        if os.path.exists(self.path) and os.path.getsize(self.path) % self.ENTRY.size:
+            self.rebuild()  # torn index write
+            return
+
+        journal_size = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+        count = self._count()
+        if count:
+            offset, length = self._read_entries(count - 1, 1)[0][:2]
+            covered = offset + length
+        else:
+            covered = 0
+        if covered > journal_size:
+            self.rebuild()
+        elif covered < journal_size:
+            entries = self._scan(covered)
+            if entries:
+                self.append(entries)
+
+    def entries(self) -> List[tuple]:
+        """Every index entry, loaded once and kept current by ``append``"""
+        if self._entries is None:
+            self._entries = self._read_entries(0) if os.path.exists(self.path) else []
+            self._sorted = all(a[2] <= b[2] for a, b in zip(self._entries, self._entries[1:]))
+        return self._entries
+
+    def read(self, entries: List[tuple]) -> List[Dict[str, Any]]:
+        """Decode the records behind ``entries`` from an mmap of the journal"""
+        if not entries:
+            return []
+        with open(self.journal_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            return [loads(view[offset:offset + length]) for offset, length, _, _ in entries]
+
+    def tail(self, count: int) -> List[Dict[str, Any]]:
+        """Last ``count`` records, reading only the end of the index"""
+        self.sync()
+        return self.read(self._read_entries(max(0, self._count() - count), count))
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Most recently written record with this session id, or None"""
+        self.sync()
+        entries = self.entries()
+        if self._ids is None:
+            self._ids = {entry[3].rstrip(b"\0"): position for position, entry in enumerate(entries)}
+        position = self._ids.get(session_id.encode()[:64])
+        if position is None:
+            return None
+        record = self.read([entries[position]])[0]
+        return record if record.get('session_id') == session_id else None
+
+    def offset_of(self, start: datetime) -> Optional[int]:
+        """Journal offset of the first record starting at or after ``start``
+
+        Only answers when the index is in start-time order (the normal case
+        for an append-only journal); returns None otherwise.
+        """
+        self.sync()
+        entries = self.entries()
+        if not self._sorted:
+            return None
+        position = bisect.bisect_left(entries, start.timestamp(), key=lambda entry: entry[2])
+        return entries[position][0] if position < len(entries) else os.path.getsize(self.journal_path)
+
+class JournalStorage(FileSessionStorage):
+    """Append-only JSONL journal: one compact record per line, one write per save
+
+    A ``JournalIndex`` in ``<path>.idx`` makes ``tail``, ``get`` and
+    windowed reads O(k) in the number of records returned.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.index = JournalIndex(f"{path}.idx", path)
+
+    def _write(self, records: List[Dict[str, Any]]) -> None:
+        self.index.sync()
+        lines = [(dumps(record) + "\n").encode() for record in records]
+        entries = []
+        with open(self.path, 'ab') as f:
+            offset = f.tell()
+            for record, line in zip(records, lines):
+                entries.append(JournalIndex.pack(offset, len(line), record))
+                offset += len(line)
+            f.write(b"".join(lines))
+        self.index.append(b"".join(entries))
+
+    def iter_sessions(self, start: datetime = None, end: datetime = None) -> Iterator[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return
+        offset = self.index.offset_of(start) if start is not None else None
+        if offset is None:
+            sessions = iter_session_file(self.path)
+        else:
+            sessions = self._iter_from(offset)
+        for session in sessions:
+            if _in_range(session, start, end):
+                yield session
+
+    def _iter_from(self, offset: int) -> Iterator[Dict[str, Any]]:
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if line.strip():
+                    try:
+                        yield loads(line)
+                    except json.JSONDecodeError:
+                        print(f"Skipping unreadable journal record at byte {offset} in {self.path}")
+                offset += len(line)
+
+    def tail(self, count: int) -> List[Dict[str, Any]]:
+        if count <= 0 or not os.path.exists(self.path):
+            return []
+        return self.index.tail(count)
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return None
+        return self.index.get(session_id)
+
+    def _rewrite(self, records: Iterable[Dict[str, Any]]) -> None:
+        # Write to a temporary file first so a crash never leaves a half-written journal.
+        # The old index is dropped first: if we crash before the new one is written
+        # the next read rebuilds it instead of trusting stale offsets.
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            for record in records:
+                f.write(dumps(record) + "\n")
+        if os.path.exists(self.index.path):
+            os.remove(self.index.path)
+        os.replace(tmp_path, self.path)
+        self.index.rebuild()
+
+    def import_sessions(self, records: List[Dict[str, Any]]) -> None:
+        self._rewrite(records + list(self.iter_sessions()))
+
+    def delete_before(self, cutoff: datetime) -> None:
+        if os.path.exists(self.path):
+            self._rewrite(self.iter_sessions(start=cutoff))
+
+class SegmentedStorage(FileSessionStorage):
+    """Time-partitioned JSONL journal with one segment file per period
+
+    ``path`` is a directory. Each segment ``<period>.jsonl`` has a
+    ``<period>.manifest.json`` next to it holding the min/max ``start_time``
+    and record count, so time-range reads only open overlapping segments
+    and writes only ever touch the segment for the record's period.
+    """
+
+    PERIOD_FORMATS = {
+        "day": "%Y-%m-%d",
+        "week": "%G-W%V",
+        "month": "%Y-%m",
+        "year": "%Y",
+    }
+
+    def __init__(self, path: str, period: str = None):
+        super().__init__(path)
+        self.period = period or Config.SEGMENT_PERIOD
+        if self.period not in self.PERIOD_FORMATS:
+            raise ValueError(f"Unknown segment period: {self.period}")
+
+    def _segment_name(self, start_time: datetime) -> str:
+        return start_time.strftime(self.PERIOD_FORMATS[self.period])
+
+    def _segment_path(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.jsonl")
+
+    def _manifest_path(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.manifest.json")
+
+    def _segment_names(self) -> List[str]:
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(entry[:-len(".jsonl")] for entry in os.listdir(self.path) if entry.endswith(".jsonl"))
+
+    def _write_manifest(self, name: str, manifest: Dict[str, Any]) -> None:
+        tmp_path = f"{self._manifest_path(name)}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._manifest_path(name))
+
+    def _rebuild_manifest(self, name: str) -> Dict[str, Any]:
+        """Recompute a segment's manifest from its records"""
+        starts = [parse_timestamp(s['start_time']) for s in iter_session_file(self._segment_path(name))]
+        manifest = {
+            "min_start": min(starts).isoformat() if starts else None,
+            "max_start": max(starts).isoformat() if starts else None,
+            "count": len(starts),
+            "size": os.path.getsize(self._segment_path(name)),
+        }
+        self._write_manifest(name, manifest)
+        return manifest
+
+    def _manifest(self, name: str) -> Dict[str, Any]:
+        """Load a segment's manifest, rebuilding it if it is missing or out of date"""
+        try:
+            with open(self._manifest_path(name), 'r') as f:
+                manifest = json.load(f)
+            if manifest.get("size") == os.path.getsize(self._segment_path(name)):
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return self._rebuild_manifest(name)
+
+    def _overlapping_segments(self, start: Optional[datetime], end: Optional[datetime]) -> List[str]:
+        """Segment names whose [min_start, max_start] overlaps [start, end), oldest first"""
+        selected = []
+        for name in self._segment_names():
+            manifest = self._manifest(name)
+            if not manifest["count"]:
+                continue
+            if start is not None and parse_timestamp(manifest["max_start"]) < start:
+                continue
+            if end is not None and parse_timestamp(manifest["min_start"]) >= end:
+                continue
+            selected.append((manifest["min_start"], name))
+        return [name for _, name in sorted(selected)]
+
+    def _write(self, records: List[Dict[str, Any]]) -> None:
+        by_segment: Dict[str, List[Dict[str, Any]]] = {}
+        for record in records:
+            by_segment.setdefault(self._segment_name(parse_timestamp(record['start_time'])), []).append(record)
+        os.makedirs(self.path, exist_ok=True)
+
+        for name, segment_records in by_segment.items():
+            segment_path = self._segment_path(name)
+            manifest = self._manifest(name) if os.path.exists(segment_path) else {
+                "min_start": None, "max_start": None, "count": 0, "size": 0
+            }
+            with open(segment_path, 'a') as f:
+                f.write("".join(dumps(r) + "\n" for r in segment_records))
+
+            for record in segment_records:
+                start_time = parse_timestamp(record['start_time'])
+                if manifest["min_start"] is None or start_time < parse_timestamp(manifest["min_start"]):
+                    manifest["min_start"] = start_time.isoformat()
+                if manifest["max_start"] is None or start_time > parse_timestamp(manifest["max_start"]):
+                    manifest["max_start"] = start_time.isoformat()
+            manifest["count"] += len(segment_records)
+            manifest["size"] = os.path.getsize(segment_path)
+            self._write_manifest(name, manifest)
+
+    def iter_sessions(self, start: datetime = None, end: datetime = None) -> Iterator[Dict[str, Any]]:
+        for name in self._overlapping_segments(start, end):
+            for session in iter_session_file(self._segment_path(name)):
+                if _in_range(session, start, end):
+                    yield session
+
+    def tail(self, count: int) -> List[Dict[str, Any]]:
+        if count <= 0:
+            return []
+        sessions: List[Dict[str, Any]] = []
+        for name in reversed(self._overlapping_segments(None, None)):
+            sessions = read_session_file(self._segment_path(name)) + sessions
+            if len(sessions) >= count:
+                break
+        return sessions[-count:]
+
+    def import_sessions(self, records: List[Dict[str, Any]]) -> None:
+        by_segment: Dict[str, List[Dict[str, Any]]] = {}
+        for record in records:
+            by_segment.setdefault(self._segment_name(parse_timestamp(record['start_time'])), []).append(record)
+
+        os.makedirs(self.path, exist_ok=True)
+        for name, segment_records in by_segment.items():
+            segment_path = self._segment_path(name)
+            existing = read_session_file(segment_path) if os.path.exists(segment_path) else []
+            tmp_path = f"{segment_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                for record in segment_records + existing:
+                    f.write(dumps(record) + "\n")
+            os.replace(tmp_path, segment_path)
+            self._rebuild_manifest(name)
+
+    def delete_before(self, cutoff: datetime) -> None:
+        for name in self._segment_names():
+            manifest = self._manifest(name)
+            if manifest["count"] and parse_timestamp(manifest["min_start"]) >= cutoff:
+                continue
+
+            segment_path = self._segment_path(name)
+            if not manifest["count"] or parse_timestamp(manifest["max_start"]) < cutoff:
+                # Whole segment is older than the cutoff
+                os.remove(segment_path)
+                os.remove(self._manifest_path(name))
+                continue
+
+            kept = [s for s in iter_session_file(segment_path) if _in_range(s, cutoff, None)]
+            tmp_path = f"{segment_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                for record in kept:
+                    f.write(dumps(record) + "\n")
+            os.replace(tmp_path, segment_path)
+            self._rebuild_manifest(name)
+
+    def fingerprint(self) -> Optional[list]:
+        return [[name] + file_fingerprint(self._segment_path(name)) for name in self._segment_names()]
+
+class SQLiteStorage(SessionStorage):
+    """Normalized SQLite storage (WAL mode) with indexed time-range queries"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS flow_sessions (
+        session_id TEXT PRIMARY KEY,
+        start_time TEXT NOT NULL,
+        end_time TEXT,
+        available_time_minutes INTEGER NOT NULL DEFAULT 0,
+        total_focus_time INTEGER NOT NULL DEFAULT 0,
+        total_break_time INTEGER NOT NULL DEFAULT 0,
+        completed INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_flow_sessions_start_time ON flow_sessions(start_time);
+
+    CREATE TABLE IF NOT EXISTS focus_blocks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        flow_session_id TEXT NOT NULL REFERENCES flow_sessions(session_id) ON DELETE CASCADE,
+        position INTEGER NOT NULL,
+        session_id TEXT NOT NULL,
+        start_time TEXT NOT NULL,
+        end_time TEXT,
+        duration_minutes INTEGER NOT NULL,
+        completed INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_focus_blocks_flow ON focus_blocks(flow_session_id, position);
+
+    CREATE TABLE IF NOT EXISTS goals (
+        block_id INTEGER PRIMARY KEY REFERENCES focus_blocks(id) ON DELETE CASCADE,
+        description TEXT NOT NULL,
+        created_at TEXT,
+        completed INTEGER NOT NULL DEFAULT 0,
+        notes TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS reflections (
+        block_id INTEGER PRIMARY KEY REFERENCES focus_blocks(id) ON DELETE CASCADE,
+        session_id TEXT NOT NULL,
+        goal_achieved INTEGER NOT NULL,
+        distractions TEXT,
+        what_worked TEXT,
+        what_didnt_work TEXT,
+        next_time_improvements TEXT,
+        created_at TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_reflections_goal_achieved ON reflections(goal_achieved);
+
+    CREATE TABLE IF NOT EXISTS session_aggregates (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total_sessions INTEGER NOT NULL,
+        total_focus_time INTEGER NOT NULL,
+        total_goals INTEGER NOT NULL,
+        completed_goals INTEGER NOT NULL
+    );
+    """
+
+    # Rebuilds the aggregates row from the normalized tables, only when it is missing
+    BACKFILL_AGGREGATES = """
+    INSERT OR IGNORE INTO session_aggregates
+    SELECT 1,
+           (SELECT COUNT(*) FROM flow_sessions),
+           (SELECT COALESCE(SUM(total_focus_time), 0) FROM flow_sessions),
+           (SELECT COUNT(*) FROM reflections),
+           (SELECT COALESCE(SUM(goal_achieved), 0) FROM reflections)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(self.SCHEMA)
+        with self._conn:
+            self._conn.execute(self.BACKFILL_AGGREGATES)
+
+    @staticmethod
+    def _iso(value: Any) -> Optional[str]:
+        return parse_timestamp(value).isoformat() if value else None
+
+    def _stored_totals(self, session_id: str) -> Tuple[int, int, int, int]:
+        """Aggregate contribution of an already stored session (zeros if absent)"""
+        conn = self._conn
+        row = conn.execute(
+            "SELECT total_focus_time FROM flow_sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return 0, 0, 0, 0
+        goals, completed = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(r.goal_achieved), 0) FROM focus_blocks b "
+            "JOIN reflections r ON r.block_id = b.id WHERE b.flow_session_id = ?",
+            (session_id,)
+        ).fetchone()
+        return 1, row[0], goals, completed
+
+    def _insert(self, record: Dict[str, Any]) -> None:
+        conn = self._conn
+        session_id = record['session_id']
+        old_sessions, old_focus_time, old_goals, old_completed = self._stored_totals(session_id)
+        focus_time, goals, completed = session_totals(record)
+        conn.execute(
+            "UPDATE session_aggregates SET total_sessions = total_sessions + ?, "
+            "total_focus_time = total_focus_time + ?, total_goals = total_goals + ?, "
+            "completed_goals = completed_goals + ? WHERE id = 1",
+            (1 - old_sessions, focus_time - old_focus_time, goals - old_goals, completed - old_completed)
+        )
+        conn.execute("DELETE FROM focus_blocks WHERE flow_session_id = ?", (session_id,))
+        conn.execute("DELETE FROM flow_sessions WHERE session_id = ?", (session_id,))
+        conn.execute(
+            "INSERT INTO flow_sessions VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                session_id,
+                self._iso(record['start_time']),
+                self._iso(record.get('end_time')),
+                record.get('available_time_minutes', 0),
+                record.get('total_focus_time', 0),
+                record.get('total_break_time', 0),
+                int(bool(record.get('completed', False)))
+            )
+        )
+
+        for position, block in enumerate(record.get('focus_sessions', []), 1):
+            cursor = conn.execute(
+                "INSERT INTO focus_blocks (flow_session_id, position, session_id, start_time, end_time, duration_minutes, completed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    session_id,
+                    position,
+                    block['session_id'],
+                    self._iso(block['start_time']),
+                    self._iso(block.get('end_time')),
+                    block['duration_minutes'],
+                    int(bool(block.get('completed', False)))
+                )
+            )
+            block_id = cursor.lastrowid
+
+            goal = block.get('goal') or {}
+            conn.execute(
+                "INSERT INTO goals VALUES (?, ?, ?, ?, ?)",
+                (
+                    block_id,
+                    goal.get('description', ''),
+                    self._iso(goal.get('created_at')),
+                    int(bool(goal.get('completed', False))),
+                    goal.get('notes')
+                )
+            )
+
+            reflection = block.get('reflection')
+            if reflection:
+                conn.execute(
+                    "INSERT INTO reflections VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        block_id,
+                        reflection['session_id'],
+                        int(bool(reflection.get('goal_achieved', False))),
+                        reflection.get('distractions'),
+                        reflection.get('what_worked'),
+                        reflection.get('what_didnt_work'),
+                        reflection.get('next_time_improvements'),
+                        self._iso(reflection.get('created_at'))
+                    )
+                )
+
+    def append(self, record: Dict[str, Any]) -> None:
+        self.append_many([record])
+
+    def append_many(self, records: List[Dict[str, Any]]) -> None:
+        with self._lock, self._conn:
+            for record in records:
+                self._insert(record)
+
+    def import_sessions(self, records: List[Dict[str, Any]]) -> None:
+        self.append_many(records)
+
+    def _fetch_rows(self, cursor: sqlite3.Cursor, batch_size: int = 500) -> Iterator[tuple]:
+        """Fetch a query result in batches so large ranges stream in bounded memory"""
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield from rows
+
+    def _query_sessions(self, where: str = "", params: tuple = (), latest: int = None) -> Iterator[Dict[str, Any]]:
+        """Stream flow sessions with their blocks, grouping consecutive join rows"""
+        if latest is not None:
+            selection = f"SELECT * FROM flow_sessions {where} ORDER BY start_time DESC, session_id DESC LIMIT ?"
+            params = params + (latest,)
+        else:
+            selection = f"SELECT * FROM flow_sessions {where}"
+        query = f"""
+            SELECT f.session_id, f.start_time, f.end_time, f.available_time_minutes,
+                   f.total_focus_time, f.total_break_time, f.completed,
+                   b.session_id, b.start_time, b.end_time, b.duration_minutes, b.completed,
+                   g.description, g.created_at, g.completed, g.notes,
+                   r.session_id, r.goal_achieved, r.distractions, r.what_worked,
+                   r.what_didnt_work, r.next_time_improvements, r.created_at
+            FROM ({selection}) AS f
+            LEFT JOIN focus_blocks b ON b.flow_session_id = f.session_id
+            LEFT JOIN goals g ON g.block_id = b.id
+            LEFT JOIN reflections r ON r.block_id = b.id
+            ORDER BY f.start_time, f.session_id, b.position
+        """
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+        current = None
+        for row in self._fetch_rows(cursor):
+            if current is None or current['session_id'] != row[0]:
+                if current is not None:
+                    yield current
+                current = {
+                    "session_id": row[0],
+                    "start_time": row[1],
+                    "end_time": row[2],
+                    "available_time_minutes": row[3],
+                    "focus_sessions": [],
+                    "total_focus_time": row[4],
+                    "total_break_time": row[5],
+                    "completed": bool(row[6])
+                }
+            if row[7] is None:
+                continue
+            current['focus_sessions'].append({
+                "session_id": row[7],
+                "start_time": row[8],
+                "end_time": row[9],
+                "duration_minutes": row[10],
+                "goal": {
+                    "description": row[12],
+                    "created_at": row[13],
+                    "completed": bool(row[14]),
+                    "notes": row[15]
+                },
+                "reflection": None if row[16] is None else {
+                    "session_id": row[16],
+                    "goal_achieved": bool(row[17]),
+                    "distractions": row[18],
+                    "what_worked": row[19],
+                    "what_didnt_work": row[20],
+                    "next_time_improvements": row[21],
+                    "created_at": row[22]
+                },
+                "completed": bool(row[11])
+            })
+        if current is not None:
+            yield current
+
+    def iter_sessions(self, start: datetime = None, end: datetime = None) -> Iterator[Dict[str, Any]]:
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("start_time >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            clauses.append("start_time < ?")
+            params.append(end.isoformat())
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._query_sessions(where, tuple(params))
+
+    def tail(self, count: int) -> List[Dict[str, Any]]:
+        if count <= 0:
+            return []
+        return list(self._query_sessions(latest=count))
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return next(self._query_sessions("WHERE session_id = ?", (session_id,)), None)
+
+    def delete_before(self, cutoff: datetime) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM flow_sessions WHERE start_time < ?", (cutoff.isoformat(),))
+            self._conn.execute("DELETE FROM session_aggregates")
+            self._conn.execute(self.BACKFILL_AGGREGATES)
+
+    def session_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT total_sessions, total_focus_time, total_goals, completed_goals "
+                "FROM session_aggregates WHERE id = 1"
+            ).fetchone()
+        return build_stats(*row)
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+STORAGE_ENGINES = {
+    "json": JsonArrayStorage,
+    "jsonl": JournalStorage,
+    "sqlite": SQLiteStorage,
+    "segmented": SegmentedStorage,
+}
+
+def create_storage(log_format: str, path: str) -> SessionStorage:
+    """Create the storage engine registered for ``log_format``"""
+    try:
+        return STORAGE_ENGINES[log_format](path)
+    except KeyError:
+        raise ValueError(f"Unknown log format: {log_format}") from None
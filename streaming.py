@@ -0,0 +1,287 @@
+import json
+import re
+from typing import Callable, Iterable, Iterator, Optional
+
+from resilience import CircuitOpenError
+from serialization import loads
+
+class StreamInterrupted(Exception):
+    """A stream failed after part of the response had already been yielded"""
+
+class ThinkFilter:
+    """Drops ``<think>...</think>`` sections from text that arrives in chunks
+
+    Reasoning models open with a think block that should never reach the
+    UI. Tags may be split across chunks, so a possible partial tag at the
+    end of a chunk is held back until the next one arrives. Leading
+    whitespace before the first visible text is dropped as well.
+    """
+
+    OPEN = "<think>"
+    CLOSE = "</think>"
+
+    def __init__(self):
+        self._buffer = ""
+        self._thinking = False
+        self._started = False
+
+    @staticmethod
+    def _partial_tag(text: str, tag: str) -> int:
+        """Length of the longest suffix of ``text`` that is a prefix of ``tag``"""
+        for size in range(min(len(tag) - 1, len(text)), 0, -1):
+            if text.endswith(tag[:size]):
+                return size
+        return 0
+
+    def _emit(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        return text
+
+    def feed(self, chunk: str) -> str:
+        """Visible text contributed by ``chunk``"""
+        self._buffer += chunk
+        visible = []
+        while True:
+            tag = self.CLOSE if self._thinking else self.OPEN
+            index = self._buffer.find(tag)
+            if index >= 0:
+                if not self._thinking:
+                    visible.append(self._emit(self._buffer[:index]))
+                self._buffer = self._buffer[index + len(tag):]
+                self._thinking = not self._thinking
+                continue
+
+            keep = self._partial_tag(self._buffer, tag)
+            if not self._thinking:
+                visible.append(self._emit(self._buffer[:len(self._buffer) - keep]))
+            self._buffer = self._buffer[len(self._buffer) - keep:]
+            return "".join(visible)
+
+    def flush(self) -> str:
+        """Whatever visible text was held back at the end of the stream"""
+        rest = "" if self._thinking else self._emit(self._buffer)
+        self._buffer = ""
+        return rest
+
+def strip_think(text: str) -> str:
+    """Remove think sections from a complete response"""
+    think = ThinkFilter()
+    return think.feed(text) + think.flush()
+
+class JsonObjectExtractor:
+    """Finds the first complete top-level JSON object in text arriving in chunks
+
+    Think sections are skipped, then characters are scanned once while
+    tracking brace depth and whether we are inside a string (and escaped),
+    so braces in prose or in string values never confuse it. Only the
+    candidate object is buffered. ``accept`` can reject well-formed objects
+    that are not the one we are waiting for; scanning then continues.
+    """
+
+    def __init__(self, accept: Callable[[dict], bool] = None):
+        self._think = ThinkFilter()
+        self._accept = accept
+        self._buffer: list = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.result: Optional[dict] = None
+
+    def feed(self, chunk: str) -> Optional[dict]:
+        """Feed raw text; returns the object once it is complete"""
+        if self.result is None:
+            self._scan(self._think.feed(chunk))
+        return self.result
+
+    def close(self) -> Optional[dict]:
+        """Signal the end of the text"""
+        if self.result is None:
+            self._scan(self._think.flush())
+        return self.result
+
+    def _scan(self, text: str) -> None:
+        for char in text:
+            if self._depth == 0:
+                if char == "{":
+                    self._buffer = [char]
+                    self._depth = 1
+                continue
+
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._complete("".join(self._buffer)):
+                    return
+
+    def _complete(self, candidate: str) -> bool:
+        try:
+            value = loads(candidate)
+        except ValueError:
+            return False
+        if isinstance(value, dict) and (self._accept is None or self._accept(value)):
+            self.result = value
+            return True
+        return False
+
+class JsonStringField:
+    """Streams the value of one string field out of a JSON object arriving in chunks
+
+    Lets a caller show, say, the ``suggestion`` of a JSON reply while it is
+    still being generated. ``feed`` returns the newly decoded characters of
+    the field's value; an escape sequence split across chunks is held back
+    until it is complete. The full text still has to be parsed and
+    validated once the stream ends.
+    """
+
+    def __init__(self, name: str):
+        self._key = re.compile(r'"%s"\s*:\s*"' % re.escape(name))
+        self._text = ""
+        self._position: Optional[int] = None
+        self._done = False
+
+    def feed(self, chunk: str) -> str:
+        """Characters of the field's value contributed by ``chunk``"""
+        self._text += chunk
+        if self._done:
+            return ""
+        if self._position is None:
+            match = self._key.search(self._text)
+            if match is None:
+                return ""
+            self._position = match.end()
+
+        text, index, decoded = self._text, self._position, []
+        while index < len(text):
+            char = text[index]
+            if char == '"':
+                self._done = True
+                break
+            if char == "\\":
+                end = index + (6 if text[index + 1:index + 2] == "u" else 2)
+                if end > len(text):
+                    break
+                # The stdlib parser tolerates a lone surrogate from a split pair
+                decoded.append(json.loads(f'"{text[index:end]}"'))
+                index = end
+                continue
+            decoded.append(char)
+            index += 1
+        self._position = index
+        return "".join(decoded)
+
+def extract_json(text: str, accept: Callable[[dict], bool] = None) -> Optional[dict]:
+    """First acceptable JSON object in a complete response, or None"""
+    extractor = JsonObjectExtractor(accept)
+    return extractor.feed(text) or extractor.close()
+
+def extract_first_json(chunks: Iterator[str], accept: Callable[[dict], bool] = None) -> Optional[dict]:
+    """Consume a raw stream only until its first acceptable JSON object is complete
+
+    The stream is closed as soon as the object is found, so the request is
+    cancelled and the remaining tokens are never generated or paid for.
+    """
+    extractor = JsonObjectExtractor(accept)
+    try:
+        for chunk in chunks:
+            if extractor.feed(chunk) is not None:
+                return extractor.result
+        return extractor.close()
+    except StreamInterrupted:
+        return None
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+def iter_sse_content(lines: Iterable[str]) -> Iterator[str]:
+    """Content deltas from an OpenAI-compatible server-sent event stream"""
+    for line in lines:
+        if not line or not line.startswith("data:"):
+            continue
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            return
+        choices = loads(payload).get("choices") or []
+        if choices:
+            content = (choices[0].get("delta") or {}).get("content")
+            if content:
+                yield content
+
+def stream_text(open_stream: Callable[[], Iterable[str]], cache=None, key: str = None) -> Iterator[str]:
+    """Yield the visible text of a streamed completion as it arrives
+
+    ``open_stream`` starts the request and yields raw content deltas. A
+    cached response is replayed as a single chunk instead; a completed
+    stream is stored in ``cache`` (raw, like the non-streaming path) so
+    either path can answer the other's prompts.
+
+    A failure before any text was yielded simply ends the stream. A
+    failure part-way through raises ``StreamInterrupted``, so the text
+    so far is never mistaken for the whole response.
+    """
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            visible = strip_think(cached)
+            if visible:
+                yield visible
+            return
+
+    think = ThinkFilter()
+    raw = []
+    started = False
+    deltas = open_stream()
+    try:
+        for delta in deltas:
+            raw.append(delta)
+            visible = think.feed(delta)
+            if visible:
+                started = True
+                yield visible
+    except CircuitOpenError:
+        return
+    except Exception as e:
+        # Don't expose API details in error messages
+        print(f"Error calling AI service: {type(e).__name__}")
+        if started:
+            raise StreamInterrupted(type(e).__name__) from e
+        return
+    finally:
+        # Closing the raw stream early (consumer stopped) cancels the HTTP request
+        close = getattr(deltas, "close", None)
+        if close is not None:
+            close()
+
+    rest = think.flush()
+    if rest:
+        yield rest
+    if cache is not None and raw:
+        cache.put(key, "".join(raw))
+
+def collect_stream(chunks: Iterable[str], on_token: Callable[[str], None]) -> Optional[str]:
+    """Forward each chunk to ``on_token`` and return the full text
+
+    Returns None if nothing arrived or the stream was interrupted, so
+    callers use their fallback instead of a truncated response.
+    """
+    parts = []
+    try:
+        for chunk in chunks:
+            parts.append(chunk)
+            on_token(chunk)
+    except StreamInterrupted:
+        return None
+    return "".join(parts) or None
@@ -1,5 +1,4 @@
 import streamlit as st
-import json
 import time
 import datetime
 from datetime import datetime, timedelta
@@ -8,6 +7,10 @@ import plotly.express as px
 import plotly.graph_objects as go
 from pathlib import Path
 from adaptive_agent import AdaptiveAgent, TaskContext, PerformanceData, SessionRecommendation
+from nemotron_agent import NemotronAgent
+from models import Goal
+from prefetch import Prefetcher
+from serialization import dumps, loads
 
 # Page configuration
 st.set_page_config(
@@ -261,19 +264,29 @@ if 'reflection_mode' not in st.session_state:
     st.session_state.reflection_mode = False
 if 'adaptive_agent' not in st.session_state:
     st.session_state.adaptive_agent = AdaptiveAgent()
+if 'nemotron_agent' not in st.session_state:
+    st.session_state.nemotron_agent = NemotronAgent()
+if 'prefetcher' not in st.session_state:
+    st.session_state.prefetcher = Prefetcher()
+if 'reflection_future' not in st.session_state:
+    st.session_state.reflection_future = None
+if 'reflection_prompt' not in st.session_state:
+    st.session_state.reflection_prompt = None
+if 'coach_advice' not in st.session_state:
+    st.session_state.coach_advice = None
 
 def load_session_log():
     """Load existing session data from JSON file"""
     log_file = Path("session_log.json")
     if log_file.exists():
         with open(log_file, 'r') as f:
-            return json.load(f)
+            return loads(f.read())
     return {}
 
 def save_session_log(data):
     """Save session data to JSON file"""
     with open("session_log.json", 'w') as f:
-        json.dump(data, f, indent=2, default=str)
+        f.write(dumps(data))
 
 def format_time(seconds):
     """Format seconds into MM:SS"""
@@ -289,15 +302,61 @@ def add_user_message(message):
     """Add a user message to chat history"""
     st.session_state.chat_history.append({"role": "user", "message": message})
 
+def bot_message_html(message):
+    """Chat bubble markup for a bot message"""
+    return f"""
+            <div class="chat-message bot-message">
+                🤖 {message}
+            </div>
+            """
+
+def stream_bot_message(placeholder):
+    """Token callback that grows a bot chat bubble in ``placeholder`` as text streams in"""
+    streamed = []
+    def on_token(chunk):
+        streamed.append(chunk)
+        placeholder.markdown(bot_message_html("".join(streamed)), unsafe_allow_html=True)
+    return on_token
+
+def start_focus_timer(task=None):
+    """Start the focus timer, generating the reflection prompt in the background meanwhile"""
+    goal = Goal(description=task or st.session_state.task_context.get('task', 'Focus Session'))
+    duration = st.session_state.session_duration
+    st.session_state.reflection_prompt = None
+    st.session_state.reflection_future = st.session_state.prefetcher.submit(
+        "reflection", (goal.description, duration),
+        st.session_state.nemotron_agent.reflect_on_session, goal, duration
+    )
+    st.session_state.timer_running = True
+    st.session_state.timer_start_time = datetime.now()
+
+def get_reflection_prompt():
+    """The precomputed reflection prompt once it is ready (never waits for it)"""
+    future = st.session_state.reflection_future
+    if st.session_state.reflection_prompt is None and future is not None and future.done():
+        try:
+            st.session_state.reflection_prompt = future.result()["reflection_prompt"]
+        except Exception:
+            st.session_state.reflection_future = None
+    return st.session_state.reflection_prompt
+
+@st.fragment(run_every=1)
+def reflection_prompt_panel():
+    """Reflection prompt bubble, re-checked every second until the background call finishes
+    
+    Runs as a fragment so the polling never reruns (or resets) the reflection form.
+    """
+    reflection_prompt = get_reflection_prompt()
+    if reflection_prompt:
+        st.markdown(bot_message_html(reflection_prompt), unsafe_allow_html=True)
+    elif st.session_state.reflection_future is not None:
+        st.caption("Preparing a reflection question...")
+
 def show_chat_history():
     """Display the chat history"""
     for msg in st.session_state.chat_history:
         if msg["role"] == "bot":
-            st.markdown(f"""
-            <div class="chat-message bot-message">
-                🤖 {msg["message"]}
-            </div>
-            """, unsafe_allow_html=True)
+            st.markdown(bot_message_html(msg["message"]), unsafe_allow_html=True)
         else:
             st.markdown(f"""
             <div class="chat-message user-message">
@@ -398,10 +457,10 @@ def chatbot_interface():
             if st.button("Start Session", key="focus_continue"):
                 add_user_message(focus_options[focus])
                 st.session_state.task_context['focus'] = focus
+                st.session_state.coach_advice = None
                 generate_recommendation()
                 # Automatically start the timer
-                st.session_state.timer_running = True
-                st.session_state.timer_start_time = datetime.now()
+                start_focus_timer()
                 st.rerun()
     
     st.markdown('</div>', unsafe_allow_html=True)
@@ -453,6 +512,10 @@ def timer_interface():
     </div>
     """, unsafe_allow_html=True)
     
+    # Coach's advice from the last reflection, if this block was started from one
+    if st.session_state.coach_advice:
+        st.markdown(bot_message_html(st.session_state.coach_advice), unsafe_allow_html=True)
+    
     if remaining > 0:
         # Timer display
         st.markdown(f"""
@@ -516,6 +579,9 @@ def reflection_interface():
     </div>
     """, unsafe_allow_html=True)
     
+    # Generated while the timer ran, so it is usually ready by now
+    reflection_prompt_panel()
+    
     # Reflection questions
     with st.container():
         completed = st.radio(
@@ -556,21 +622,27 @@ def reflection_interface():
             energy_level=st.session_state.task_context.get('focus', 3)
         )
         
-        # Get AI adaptation in background
-        adaptation = st.session_state.adaptive_agent.adapt_after_session(performance, task_context)
+        # Get AI adaptation, streaming the coach's advice while it is generated
+        advice = st.empty()
+        adaptation = st.session_state.adaptive_agent.adapt_after_session(
+            performance, task_context, on_token=stream_bot_message(advice)
+        )
         
         # Update session parameters based on AI recommendation
         st.session_state.session_duration = adaptation['next_session_duration']
+        next_task = st.session_state.task_context.get('task')
         
-        # Reset for next session but keep the adapted parameters
+        # Reset for next session but keep the adapted parameters, and the
+        # advice that just streamed so it stays on screen after the rerun
         st.session_state.chat_history = []
         st.session_state.current_question = 0
         st.session_state.task_context = {}
         st.session_state.reflection_mode = False
+        st.session_state.coach_advice = adaptation['suggestions']
+        add_bot_message(adaptation['suggestions'])
         
         # Automatically start the next timer with AI-determined parameters
-        st.session_state.timer_running = True
-        st.session_state.timer_start_time = datetime.now()
+        start_focus_timer(next_task)
         st.rerun()
     
     # Alternative options
@@ -583,6 +655,7 @@ def reflection_interface():
             st.session_state.task_context = {}
             st.session_state.session_recommendation = None
             st.session_state.reflection_mode = False
+            st.session_state.coach_advice = None
             st.rerun()
     
     with col2:
@@ -86,6 +86,1126 @@ def test_agent_creation():
         print(f"❌ Agent creation failed: {e}")
         return False
 
+def test_journal_logger():
+    """Test the append-only journal and migration from the JSON array log"""
+    try:
+        import os
+        import tempfile
+        from logger import FocusLogger
+        from models import FocusFlowSession
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            legacy_file = os.path.join(tmp_dir, "log.json")
+            journal_file = os.path.join(tmp_dir, "log.jsonl")
+            
+            legacy = FocusLogger(log_file=legacy_file, log_format="json")
+            legacy.save_session(FocusFlowSession(
+                session_id="legacy", start_time=datetime.now(), available_time_minutes=60
+            ))
+
+            # Range reads on the JSON array bisect a cached start-time index
+            import storage
+            from datetime import timedelta
+            array = storage.JsonArrayStorage(os.path.join(tmp_dir, "array.json"))
+            array.append_many([
+                {"session_id": "b", "start_time": (datetime.now() - timedelta(days=1)).isoformat()},
+                {"session_id": "a", "start_time": (datetime.now() - timedelta(days=30)).isoformat()},
+            ])
+            week_ago = datetime.now() - timedelta(days=7)
+            assert [s["session_id"] for s in array.iter_sessions(start=week_ago)] == ["b"]
+            parse, parsed = storage.parse_timestamp, []
+            storage.parse_timestamp = lambda value: parsed.append(value) or parse(value)
+            try:
+                assert [s["session_id"] for s in array.iter_sessions(end=week_ago)] == ["a"]
+                assert not parsed
+            finally:
+                storage.parse_timestamp = parse
+
+            journal = FocusLogger(log_file=journal_file, log_format="jsonl")
+            journal.save_session(FocusFlowSession(
+                session_id="journal", start_time=datetime.now(), available_time_minutes=30
+            ))
+            
+            assert journal.migrate_legacy_log(legacy_file) == 1
+            assert not os.path.exists(legacy_file)
+            assert [s["session_id"] for s in journal.load_all_sessions()] == ["legacy", "journal"]
+            
+            # Materialized stats are rebuilt after the migration rewrote the journal
+            assert journal.get_session_stats()["total_sessions"] == 2
+            journal.save_session(FocusFlowSession(
+                session_id="later", start_time=datetime.now(), available_time_minutes=30, total_focus_time=25
+            ))
+            journal.flush()
+            assert os.path.exists(journal_file + ".stats.json")
+            stats = journal.get_session_stats()
+            assert stats["total_sessions"] == 3 and stats["total_focus_time"] == 25
+        
+        print("✅ Session journal works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Journal test failed: {e}")
+        return False
+
+def test_sqlite_storage():
+    """Test the SQLite storage engine round-trips sessions and stats"""
+    try:
+        import os
+        import tempfile
+        from datetime import timedelta
+        from logger import FocusLogger
+        from models import FocusFlowSession, FocusSession, Goal, Reflection
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            logger = FocusLogger(log_file=os.path.join(tmp_dir, "log.db"), log_format="sqlite")
+            
+            for days_ago, achieved in [(30, False), (1, True)]:
+                start = datetime.now() - timedelta(days=days_ago)
+                session = FocusFlowSession(
+                    session_id=f"flow_{days_ago}",
+                    start_time=start,
+                    available_time_minutes=60,
+                    total_focus_time=25
+                )
+                session.focus_sessions.append(FocusSession(
+                    session_id=f"flow_{days_ago}_block_1",
+                    start_time=start,
+                    duration_minutes=25,
+                    goal=Goal(description="Write tests"),
+                    reflection=Reflection(session_id=f"flow_{days_ago}_block_1", goal_achieved=achieved)
+                ))
+                assert logger.save_session(session)
+            
+            recent = logger.get_recent_sessions(days=7)
+            assert [s["session_id"] for s in recent] == ["flow_1"]
+            assert recent[0]["focus_sessions"][0]["goal"]["description"] == "Write tests"
+            
+            stats = logger.get_session_stats()
+            assert stats["total_sessions"] == 2
+            assert stats["total_focus_time"] == 50
+            assert stats["completed_goals"] == 1 and stats["total_goals"] == 2
+            
+            assert [s["session_id"] for s in logger.storage.tail(1)] == ["flow_1"]
+            logger.close()
+            
+            # Engines must implement the abstract operations
+            from storage import SessionStorage
+            class Incomplete(SessionStorage):
+                def append(self, record):
+                    pass
+            try:
+                Incomplete()
+                raise AssertionError("incomplete engine was instantiable")
+            except TypeError:
+                pass
+        
+        print("✅ SQLite storage works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ SQLite storage test failed: {e}")
+        return False
+
+def test_segmented_storage():
+    """Test time-partitioned segments and manifest-based pruning"""
+    try:
+        import os
+        import tempfile
+        from datetime import timedelta
+        from logger import FocusLogger
+        from models import FocusFlowSession
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            logger = FocusLogger(log_file=os.path.join(tmp_dir, "segments"), log_format="segmented")
+            
+            for days_ago in [400, 90, 0]:
+                logger.save_session(FocusFlowSession(
+                    session_id=f"flow_{days_ago}",
+                    start_time=datetime.now() - timedelta(days=days_ago),
+                    available_time_minutes=60,
+                    total_focus_time=25
+                ))
+            
+            logger.flush()
+            assert len(logger.storage._segment_names()) == 3
+            week_ago = datetime.now() - timedelta(days=7)
+            assert len(logger.storage._overlapping_segments(week_ago, None)) == 1
+            assert [s["session_id"] for s in logger.get_recent_sessions(days=7)] == ["flow_0"]
+            assert [s["session_id"] for s in logger.storage.tail(2)] == ["flow_90", "flow_0"]
+            assert logger.get_session_stats()["total_sessions"] == 3
+        
+        print("✅ Segmented storage works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Segmented storage test failed: {e}")
+        return False
+
+def test_export_pipeline():
+    """Test streaming CSV/NDJSON export with date and field filters"""
+    try:
+        import csv
+        import json
+        import os
+        import tempfile
+        from datetime import timedelta
+        from logger import FocusLogger
+        from exporter import export_sessions
+        from models import FocusFlowSession, FocusSession, Goal, Reflection
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            logger = FocusLogger(log_file=os.path.join(tmp_dir, "log.jsonl"), log_format="jsonl")
+            for days_ago in [30, 1]:
+                start = datetime.now() - timedelta(days=days_ago)
+                session = FocusFlowSession(session_id=f"flow_{days_ago}", start_time=start, available_time_minutes=60)
+                for block in (1, 2):
+                    session.focus_sessions.append(FocusSession(
+                        session_id=f"flow_{days_ago}_block_{block}",
+                        start_time=start,
+                        duration_minutes=25,
+                        goal=Goal(description=f"Goal {block}"),
+                        reflection=Reflection(session_id=f"flow_{days_ago}_block_{block}", goal_achieved=block == 1)
+                    ))
+                logger.save_session(session)
+            
+            week_ago = datetime.now() - timedelta(days=7)
+            csv_file = export_sessions(logger, os.path.join(tmp_dir, "out.csv"), "csv", start=week_ago,
+                                       fields=["session_id", "goal", "goal_achieved"])
+            with open(csv_file) as f:
+                rows = list(csv.DictReader(f))
+            assert [r["goal"] for r in rows] == ["Goal 1", "Goal 2"]
+            assert set(rows[0]) == {"session_id", "goal", "goal_achieved"}
+            
+            ndjson_file = export_sessions(logger, os.path.join(tmp_dir, "out.ndjson"), "ndjson")
+            with open(ndjson_file) as f:
+                assert len([json.loads(line) for line in f]) == 4
+            
+            summary = logger.export_summary(os.path.join(tmp_dir, "summary.txt"))
+            with open(summary) as f:
+                assert "Total Sessions: 2" in f.read()
+        
+        print("✅ Export pipeline works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Export pipeline test failed: {e}")
+        return False
+
+def test_compaction():
+    """Test archiving old sessions while reads still span both tiers"""
+    try:
+        import json
+        import os
+        import tempfile
+        from datetime import timedelta
+        from logger import FocusLogger
+        from archive import ColdArchive
+        from compaction import compact_focus_log, compact_user_history
+        from models import FocusFlowSession
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            logger = FocusLogger(log_file=os.path.join(tmp_dir, "log.jsonl"), log_format="jsonl")
+            logger.archive = ColdArchive("log", time_key="start_time", directory=tmp_dir, compression="lzma")
+            for days_ago in [200, 100, 1]:
+                logger.save_session(FocusFlowSession(
+                    session_id=f"flow_{days_ago}",
+                    start_time=datetime.now() - timedelta(days=days_ago),
+                    available_time_minutes=60,
+                    total_focus_time=25
+                ))
+            
+            assert compact_focus_log(logger, horizon_days=30) == 2
+            assert [s["session_id"] for s in logger.storage.load_all()] == ["flow_1"]
+            assert [s["session_id"] for s in logger.load_all_sessions()] == ["flow_200", "flow_100", "flow_1"]
+            assert [s["session_id"] for s in logger.get_recent_sessions(days=7)] == ["flow_1"]
+            assert [s["session_id"] for s in logger.tail(2)] == ["flow_100", "flow_1"]
+            assert logger.get_session_stats()["total_focus_time"] == 75
+            
+            history_file = os.path.join(tmp_dir, "user_performance.json")
+            old = (datetime.now() - timedelta(days=60)).isoformat()
+            with open(history_file, "w") as f:
+                json.dump({"sessions": [
+                    {"timestamp": old, "task_type": "coding", "completed": True, "duration": 30},
+                    {"timestamp": datetime.now().isoformat(), "task_type": "coding", "completed": False, "duration": 20}
+                ]}, f)
+            history_archive = ColdArchive("user_performance", time_key="timestamp", directory=tmp_dir)
+            assert compact_user_history(history_file, horizon_days=30, archive=history_archive) == 1
+            with open(history_file) as f:
+                history = json.load(f)
+            assert len(history["sessions"]) == 1 and history["compacted_before"]
+            assert history_archive.load_daily()[old[:10]]["coding"]["duration"] == 30
+
+            # A rerun after a crash before the snapshot rewrite does not archive twice
+            with open(history_file, "w") as f:
+                json.dump({"sessions": [{"timestamp": old, "task_type": "coding", "completed": True, "duration": 30}]}, f)
+            assert compact_user_history(history_file, horizon_days=30, archive=history_archive) == 1
+            assert len(list(history_archive.iter_records())) == 1
+            assert history_archive.load_daily()[old[:10]]["coding"]["duration"] == 30
+            logger.save_session(FocusFlowSession(
+                session_id="flow_200",
+                start_time=datetime.fromisoformat(next(logger.archive.iter_records())["start_time"]),
+                available_time_minutes=60,
+                total_focus_time=25
+            ))
+            assert compact_focus_log(logger, horizon_days=30) == 0
+            assert len(list(logger.archive.iter_records())) == 2
+            assert [s["session_id"] for s in logger.storage.load_all()] == ["flow_1"]
+        
+        print("✅ Compaction works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Compaction test failed: {e}")
+        return False
+
+def test_write_behind_queue():
+    """Test group commit and flush of the write-behind queue"""
+    try:
+        import time
+        from persistence import WriteBehindQueue
+        
+        batches = []
+        def commit(items):
+            time.sleep(0.05)  # Slow disk: later submissions pile up behind this one
+            batches.append(items)
+        
+        writer = WriteBehindQueue(max_pending=100)
+        for i in range(20):
+            writer.submit(commit, i)
+        writer.flush()
+        
+        assert [item for batch in batches for item in batch] == list(range(20))
+        assert len(batches) < 20
+        
+        # A failed commit is kept, surfaced by flush, and retried until it succeeds
+        from persistence import WriteBehindError
+        disk_full = [True]
+        saved = []
+        def flaky(items):
+            if disk_full[0]:
+                raise OSError("No space left on device")
+            saved.extend(items)
+        writer.submit(flaky, "a")
+        try:
+            writer.flush()
+            raise AssertionError("failed commit was not reported")
+        except WriteBehindError:
+            pass
+        writer.flush(commits=[commit])  # Other writers are not blamed for it
+        disk_full[0] = False
+        writer.submit(flaky, "b")
+        writer.flush()
+        assert saved == ["a", "b"]
+        writer.close()
+        
+        # Atomic rewrites keep the file's permissions
+        import os
+        import stat
+        import tempfile
+        from persistence import atomic_write
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "shared.json")
+            atomic_write(path, "[]")
+            umask = os.umask(0)
+            os.umask(umask)
+            assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~umask
+            os.chmod(path, 0o640)
+            atomic_write(path, "[1]")
+            assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+        
+        print("✅ Write-behind queue works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Write-behind queue test failed: {e}")
+        return False
+
+def test_columnar_history():
+    """Test the columnar history store grows in place and answers masks"""
+    try:
+        from datetime import timedelta
+        from history_store import ColumnarHistory
+        
+        history = ColumnarHistory(capacity=2)
+        for days_ago, task_type in [(10, "coding"), (3, "writing"), (1, "coding")]:
+            history.append({
+                "timestamp": (datetime.now() - timedelta(days=days_ago)).isoformat(),
+                "task_type": task_type,
+                "completed": task_type == "coding",
+                "duration": 30,
+                "distractions": ["phone"]
+            })
+        
+        assert len(history) == 3
+        assert history.task_types == ["coding", "writing"]
+        coding = history.column("task_type") == history.task_types.index("coding")
+        assert int(coding.sum()) == 2 and bool(history.column("completed")[coding].all())
+        recent = history.column("timestamp") > (datetime.now() - timedelta(days=7)).timestamp()
+        assert int(recent.sum()) == 2
+        assert int(history.column("distraction_count").sum()) == 3
+        
+        print("✅ Columnar history works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Columnar history test failed: {e}")
+        return False
+
+def test_serialization():
+    """Test the compact serialization path round-trips flow sessions"""
+    try:
+        from models import FocusFlowSession, FocusSession, Goal
+        from serialization import dumps, loads, session_record, sessions_json, parse_sessions
+        
+        block = FocusSession(
+            session_id="block-1",
+            start_time=datetime.now(),
+            duration_minutes=25,
+            goal=Goal(description="Serialize")
+        )
+        flow = FocusFlowSession(
+            session_id="flow-1",
+            start_time=datetime.now(),
+            available_time_minutes=60,
+            focus_sessions=[block]
+        )
+        
+        record = session_record(flow)
+        assert isinstance(record["start_time"], str)
+        text = dumps(record)
+        assert "\n" not in text and ": " not in text
+        assert loads(text) == record
+        assert parse_sessions(sessions_json([flow]))[0] == flow
+        
+        print("✅ Serialization works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Serialization test failed: {e}")
+        return False
+
+def test_journal_index():
+    """Test the journal offset index serves tail, lookups and windows"""
+    try:
+        import os
+        import tempfile
+        from datetime import timedelta
+        from storage import JournalStorage
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "log.jsonl")
+            storage = JournalStorage(path)
+            base = datetime.now() - timedelta(days=10)
+            for i in range(10):
+                storage.append({"session_id": f"flow-{i}", "start_time": (base + timedelta(days=i)).isoformat(),
+                                "total_focus_time": i, "focus_sessions": []})
+            
+            assert [s["session_id"] for s in storage.tail(3)] == ["flow-7", "flow-8", "flow-9"]
+            assert storage.get("flow-4")["total_focus_time"] == 4
+            assert storage.get("missing") is None
+            recent = list(storage.iter_sessions(start=base + timedelta(days=7, hours=-1)))
+            assert [s["session_id"] for s in recent] == ["flow-7", "flow-8", "flow-9"]
+            
+            # A lost index is rebuilt from the journal on the next read
+            os.remove(storage.index.path)
+            fresh = JournalStorage(path)
+            assert fresh.get("flow-2")["session_id"] == "flow-2"
+            assert len(fresh.tail(20)) == 10
+            
+            fresh.delete_before(base + timedelta(days=5))
+            assert fresh.get("flow-2") is None and len(fresh.tail(20)) == 5
+        
+        print("✅ Journal index works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Journal index test failed: {e}")
+        return False
+
+def test_pattern_index():
+    """Test the per-task-type aggregate index is rebuilt and kept current"""
+    try:
+        import json
+        import os
+        import tempfile
+        from config import Config
+        from adaptive_agent import AdaptiveAgent, TaskContext, PerformanceData
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            history_file = os.path.join(tmp_dir, "user_performance.json")
+            with open(history_file, "w") as f:
+                json.dump({"sessions": [
+                    {"timestamp": datetime.now().isoformat(), "task_type": "coding", "difficulty": 4,
+                     "energy_before": 2, "completed": True, "duration": 30},
+                    {"timestamp": datetime.now().isoformat(), "task_type": "coding", "difficulty": 2,
+                     "energy_before": 5, "completed": False, "duration": 20}
+                ]}, f)
+            
+            saved = (Config.USER_HISTORY_FILE, Config.ARCHIVE_DIR, Config.WRITE_BEHIND, Config.HISTORY_DEBOUNCE_SECONDS)
+            Config.USER_HISTORY_FILE, Config.ARCHIVE_DIR, Config.WRITE_BEHIND = history_file, tmp_dir, False
+            Config.HISTORY_DEBOUNCE_SECONDS = 0
+            try:
+                agent = AdaptiveAgent()
+                agent.client = None
+                
+                coding = agent.user_history["task_patterns"]["coding"]
+                assert coding["totals"]["sessions"] == 2 and coding["difficulty"]["4"]["completed"] == 1
+                assert agent.user_history["success_rates"]["coding"]["energy"] == {"low": 1.0, "high": 0.0}
+                
+                agent.adapt_after_session(
+                    PerformanceData(task_completed=True, focus_rating=4, energy_after=3,
+                                    distractions=[], what_worked="", session_duration=40),
+                    TaskContext(task_name="Refactor", difficulty=4, energy_level=3, task_type="coding")
+                )
+            finally:
+                (Config.USER_HISTORY_FILE, Config.ARCHIVE_DIR, Config.WRITE_BEHIND,
+                 Config.HISTORY_DEBOUNCE_SECONDS) = saved
+            
+            assert agent.user_history["success_rates"]["coding"]["difficulty"]["4"] == 1.0
+            summary = agent._get_performance_summary("coding", difficulty=4, energy_level=3)
+            assert "Total sessions: 3" in summary and "At difficulty 4/5: 100.0% success" in summary
+            assert agent._get_performance_summary("reading") == "No data for reading tasks"
+            with open(history_file) as f:
+                assert json.load(f)["task_patterns"]["coding"]["totals"]["sessions"] == 3
+        
+        print("✅ Pattern index works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Pattern index test failed: {e}")
+        return False
+
+def test_debounced_history():
+    """Test debounced history saves coalesce into an NDJSON tail and fold on load"""
+    try:
+        import json
+        import os
+        import tempfile
+        from config import Config
+        from adaptive_agent import AdaptiveAgent, TaskContext, PerformanceData
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            history_file = os.path.join(tmp_dir, "user_performance.json")
+            journal_file = os.path.join(tmp_dir, "user_performance.jsonl")
+            names = ("USER_HISTORY_FILE", "HISTORY_JOURNAL_FILE", "ARCHIVE_DIR",
+                     "HISTORY_DEBOUNCE_SECONDS", "HISTORY_SNAPSHOT_EVERY")
+            saved = {name: getattr(Config, name) for name in names}
+            for name, value in zip(names, (history_file, journal_file, tmp_dir, 60, 3)):
+                setattr(Config, name, value)
+            try:
+                agent = AdaptiveAgent()
+                agent.client = None
+                task = TaskContext(task_name="Draft", difficulty=3, energy_level=3, task_type="writing")
+                for completed in (True, False):
+                    agent.adapt_after_session(
+                        PerformanceData(task_completed=completed, focus_rating=3, energy_after=3,
+                                        distractions=[], what_worked="", session_duration=25), task)
+                
+                # Both saves are still inside the debounce window
+                assert not os.path.exists(journal_file) and not os.path.exists(history_file)
+                agent.flush()
+                with open(journal_file) as f:
+                    assert len(f.readlines()) == 2
+                
+                reloaded = AdaptiveAgent()
+                assert len(reloaded.user_history["sessions"]) == 2
+                assert reloaded.user_history["task_patterns"]["writing"]["totals"]["completed"] == 1
+                
+                # The third tail record triggers a snapshot and truncates the tail
+                agent.adapt_after_session(
+                    PerformanceData(task_completed=True, focus_rating=3, energy_after=3,
+                                    distractions=[], what_worked="", session_duration=25), task)
+                agent.flush()
+                assert not os.path.exists(journal_file)
+                with open(history_file) as f:
+                    assert len(json.load(f)["sessions"]) == 3
+                assert len(AdaptiveAgent().user_history["sessions"]) == 3
+
+                # Two agents sharing the files: a fold by one keeps the other's sessions
+                other = AdaptiveAgent()
+                other.client = None
+                for session_agent in (agent, other, other):
+                    session_agent.adapt_after_session(
+                        PerformanceData(task_completed=True, focus_rating=3, energy_after=3,
+                                        distractions=[], what_worked="", session_duration=25), task)
+                    session_agent.flush()
+                assert not os.path.exists(journal_file)
+                reloaded = AdaptiveAgent()
+                assert len(reloaded.user_history["sessions"]) == 6
+                assert reloaded.user_history["task_patterns"]["writing"]["totals"]["sessions"] == 6
+
+                # Out-of-order commits: an older session folded after a newer one survives
+                Config.HISTORY_SNAPSHOT_EVERY = 1
+                early, late = AdaptiveAgent(), AdaptiveAgent()
+                early.client = late.client = None
+                for session_agent in (early, late):
+                    session_agent.adapt_after_session(
+                        PerformanceData(task_completed=True, focus_rating=3, energy_after=3,
+                                        distractions=[], what_worked="", session_duration=25), task)
+                late.flush()
+                early.flush()
+                assert not os.path.exists(journal_file)
+                assert len(AdaptiveAgent().user_history["sessions"]) == 8
+                del early, late
+
+                # Pending-write registration does not keep an agent alive
+                import gc
+                import weakref
+                ref = weakref.ref(other)
+                del other, session_agent
+                gc.collect()
+                assert ref() is None
+            finally:
+                for name, value in saved.items():
+                    setattr(Config, name, value)
+        
+        print("✅ Debounced history works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Debounced history test failed: {e}")
+        return False
+
+def test_response_cache():
+    """Test the LLM response cache tiers, TTL and counters"""
+    try:
+        import os
+        import tempfile
+        from llm_cache import ResponseCache, cache_key
+        
+        messages = [{"role": "user", "content": "Suggest a goal"}]
+        key = cache_key("model", {"temperature": 0.7, "max_tokens": 500}, messages)
+        assert key == cache_key("model", {"max_tokens": 500, "temperature": 0.7}, messages)
+        assert key != cache_key("model", {"temperature": 0.2, "max_tokens": 500}, messages)
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "cache.db")
+            cache = ResponseCache(path, max_entries=1, ttl_seconds=3600)
+            assert cache.get(key) is None
+            cache.put(key, "Write the intro")
+            cache.put("other", "Evicts the first key from memory")
+            assert cache.get(key) == "Write the intro"
+            assert cache.stats()["disk_hits"] == 1
+            cache.close()
+            
+            # A fresh process sees the disk tier; expired entries are misses
+            reopened = ResponseCache(path, ttl_seconds=3600)
+            assert reopened.get(key) == "Write the intro"
+            reopened.ttl_seconds = 1e-9
+            assert reopened.get("other") is None
+            stats = reopened.stats()
+            assert stats["hits"] == 1 and stats["misses"] == 1
+            reopened.close()
+        
+        print("✅ Response cache works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Response cache test failed: {e}")
+        return False
+
+def test_streaming():
+    """Test think-filtering and caching of streamed responses"""
+    try:
+        import os
+        import tempfile
+        from llm_cache import ResponseCache
+        from streaming import ThinkFilter, collect_stream, iter_sse_content, stream_text, strip_think
+        
+        think = ThinkFilter()
+        chunks = ["<thi", "nk>plan the", " answer</th", "ink>\n\nFocus on ", "the <b>intro</b>"]
+        assert "".join(think.feed(c) for c in chunks) + think.flush() == "Focus on the <b>intro</b>"
+        assert strip_think("No reasoning here") == "No reasoning here"
+        
+        lines = ['data: {"choices":[{"delta":{"content":"Hel"}}]}', "",
+                 'data: {"choices":[{"delta":{"content":"lo"}}]}', "data: [DONE]"]
+        assert list(iter_sse_content(lines)) == ["Hel", "lo"]
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = ResponseCache(os.path.join(tmp_dir, "cache.db"))
+            calls = []
+            def open_stream():
+                calls.append(1)
+                yield from ["<think>x</think>", "Write ", "tests"]
+            assert list(stream_text(open_stream, cache, "k")) == ["Write ", "tests"]
+            assert cache.get("k") == "<think>x</think>Write tests"
+            assert list(stream_text(open_stream, cache, "k")) == ["Write tests"] and len(calls) == 1
+            
+            # A stream that dies part-way is not passed off as the full response
+            def broken_stream():
+                yield "Take a "
+                raise ConnectionError("reset")
+            shown = []
+            assert collect_stream(stream_text(broken_stream, cache, "broken"), shown.append) is None
+            assert shown == ["Take a "] and cache.get("broken") is None
+            cache.close()
+        
+        print("✅ Streaming works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Streaming test failed: {e}")
+        return False
+
+def test_json_extractor():
+    """Test incremental JSON extraction from streamed output"""
+    try:
+        from streaming import JsonObjectExtractor, extract_first_json, extract_json
+        
+        text = '<think>{"draft": 1}</think>Sure! {"note": "use {braces}"} {"focus_duration": 25, "tip": "a \\"quote\\" }"} trailing'
+        wanted = lambda value: "focus_duration" in value
+        assert extract_json(text, wanted) == {"focus_duration": 25, "tip": 'a "quote" }'}
+        assert extract_json(text) == {"note": "use {braces}"}
+        assert extract_json("no json here") is None
+        
+        extractor = JsonObjectExtractor()
+        assert extractor.feed('{"a": {"b"') is None
+        assert extractor.feed(': 1}}') == {"a": {"b": 1}}
+        
+        # The stream is closed as soon as the object completes
+        consumed = []
+        def chunks():
+            for chunk in ['{"focus_', 'duration": 50}', " and then", " much more"]:
+                consumed.append(chunk)
+                yield chunk
+        assert extract_first_json(chunks(), wanted) == {"focus_duration": 50}
+        assert len(consumed) == 2
+        
+        print("✅ JSON extraction works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ JSON extraction test failed: {e}")
+        return False
+
+def test_structured_output():
+    """Test schema-constrained recommendations, the prompt fallback and validation"""
+    from config import Config
+    from adaptive_agent import AdaptiveAgent
+    original_cache = Config.LLM_CACHE_ENABLED
+    try:
+        from types import SimpleNamespace
+        from adaptive_agent import RECOMMENDATION_SCHEMA
+        
+        Config.LLM_CACHE_ENABLED = False
+        reply = '{"focus_duration": 30, "break_duration": 5, "reasoning": "Fresh", "confidence": 0.7, "suggested_approach": "Outline first"}'
+        requests_seen = []
+        def create(**kwargs):
+            requests_seen.append(kwargs)
+            if kwargs["stream"]:
+                return (SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=part))])
+                        for part in (reply[:20], reply[20:]))
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+        
+        agent = AdaptiveAgent()
+        agent.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        recommendation = agent._request_recommendation("Task: Essay", "No history")
+        assert recommendation.focus_duration == 30 and recommendation.suggested_approach == "Outline first"
+        schema_request = requests_seen[-1]
+        assert schema_request["response_format"]["json_schema"]["schema"] is RECOMMENDATION_SCHEMA
+        assert schema_request["max_tokens"] == Config.STRUCTURED_MAX_TOKENS
+        
+        # Only a 400 about response_format turns schema mode off
+        try:
+            import httpx
+        except ImportError:
+            import httpx2 as httpx  # newer SDKs ship on httpx2
+        from openai import BadRequestError
+        def reject(message):
+            response = httpx.Response(400, request=httpx.Request("POST", "https://example.com"))
+            def create(**kwargs):
+                raise BadRequestError(message, response=response, body={"message": message})
+            return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        client = agent.client
+        agent.client = reject("Prompt exceeds the context window")
+        assert agent._request_recommendation("Task: Essay", "No history") is None
+        assert AdaptiveAgent._json_schema_supported
+        agent.client = reject("response_format json_schema is not supported by this model")
+        agent._request_recommendation("Task: Essay", "No history")
+        assert not AdaptiveAgent._json_schema_supported
+        agent.client = client
+        
+        # Endpoints without response_format get the one-shot prompt, streamed
+        recommendation = agent._request_recommendation("Task: Essay", "No history")
+        assert recommendation.focus_duration == 30
+        assert requests_seen[-1]["stream"] and "response_format" not in requests_seen[-1]
+        
+        # Out-of-range values are rejected instead of silently used
+        assert agent._parse_recommendation(reply.replace("30", "120")) is None
+        
+        print("✅ Structured output works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Structured output test failed: {e}")
+        return False
+    finally:
+        Config.LLM_CACHE_ENABLED = original_cache
+        AdaptiveAgent._json_schema_supported = True
+
+def test_client_registry():
+    """Test agents share pooled LLM clients"""
+    from config import Config
+    original = (Config.NEMOTRON_API_KEY, Config.LLM_WARM_UP)
+    try:
+        from llm_clients import ClientRegistry, get_client_registry
+        from adaptive_agent import AdaptiveAgent
+        from nemotron_agent import NemotronAgent
+        
+        registry = ClientRegistry(pool_connections=2, pool_maxsize=5)
+        session = registry.http_session()
+        assert registry.http_session() is session
+        assert session.get_adapter("https://example.com")._pool_maxsize == 5
+        client = registry.openai_client("https://example.com/v1", "key")
+        assert registry.openai_client("https://example.com/v1", "key") is client
+        assert registry.openai_client("https://example.com/v1", "other") is not client
+        assert registry.openai_client("https://example.com/v1/chat/completions", "key") is client
+        registry.close()
+        
+        # NEMOTRON_API_URL may be the base URL or the full endpoint
+        from llm_clients import api_base_url, chat_completions_url
+        for url in ("https://example.com/v1", "https://example.com/v1/", "https://example.com/v1/chat/completions"):
+            assert api_base_url(url) == "https://example.com/v1"
+            assert chat_completions_url(url) == "https://example.com/v1/chat/completions"
+        
+        Config.NEMOTRON_API_KEY, Config.LLM_WARM_UP = "test-key", False
+        first, second = AdaptiveAgent(), AdaptiveAgent()
+        assert first.client is not None and first.client is second.client
+        assert NemotronAgent().session is NemotronAgent().session is get_client_registry().http_session()
+        assert NemotronAgent().breaker is not first.breaker  # different models, independent breakers
+        
+        print("✅ Client registry works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Client registry test failed: {e}")
+        return False
+    finally:
+        Config.NEMOTRON_API_KEY, Config.LLM_WARM_UP = original
+
+def test_async_agents():
+    """Test async agent calls respect the concurrency limit and cancellation"""
+    import asyncio
+    from config import Config
+    from llm_clients import get_client_registry
+    registry = get_client_registry()
+    original = (Config.LLM_CACHE_ENABLED, Config.LLM_MAX_CONCURRENCY)
+    try:
+        from types import SimpleNamespace
+        from nemotron_agent import NemotronAgent
+        from adaptive_agent import AdaptiveAgent, TaskContext
+        
+        Config.LLM_CACHE_ENABLED, Config.LLM_MAX_CONCURRENCY = False, 2
+        in_flight = [0, 0]  # current, peak
+        async def create(**kwargs):
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+            try:
+                await asyncio.sleep(kwargs["messages"][-1]["content"].count("#99") * 10 or 0.01)
+            finally:
+                in_flight[0] -= 1
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Ship the intro"))])
+        fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        registry.async_openai_client = lambda base_url, api_key: fake
+        
+        agent = NemotronAgent()
+        agent.api_key = "test-key"
+        async def scenario():
+            goals = await asyncio.gather(*(agent.suggest_goal_async(number) for number in range(6)))
+            assert goals == ["Ship the intro"] * 6 and in_flight[1] == 2
+            
+            slow = asyncio.create_task(agent.suggest_goal_async(99))
+            await asyncio.sleep(0.01)
+            slow.cancel()
+            try:
+                await slow
+                raise AssertionError("call was not cancelled")
+            except asyncio.CancelledError:
+                pass
+            assert in_flight[0] == 0 and agent.breaker.state == "closed"
+            
+            # Without a configured client the async planner falls back like the sync one
+            adaptive = AdaptiveAgent()
+            adaptive.client = None
+            recommendation = await adaptive.analyze_task_and_plan_session_async(
+                TaskContext(task_name="Essay", difficulty=3, energy_level=3)
+            )
+            assert recommendation.focus_duration > 0
+        asyncio.run(scenario())
+        
+        print("✅ Async agents work correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Async agents test failed: {e}")
+        return False
+    finally:
+        Config.LLM_CACHE_ENABLED, Config.LLM_MAX_CONCURRENCY = original
+        registry.__dict__.pop("async_openai_client", None)
+
+def test_prefetcher():
+    """Test speculative prefetches are reused only for matching inputs"""
+    try:
+        import threading
+        from prefetch import Prefetcher
+        
+        prefetcher = Prefetcher(max_workers=1)
+        calls = []
+        def suggest(block_number):
+            calls.append(block_number)
+            return f"Goal for block {block_number}"
+        
+        future = prefetcher.submit("goal", (2, ("Intro",)), suggest, 2)
+        assert prefetcher.submit("goal", (2, ("Intro",)), suggest, 2) is future
+        assert prefetcher.take("goal", (2, ("Intro",))).result() == "Goal for block 2"
+        assert calls == [2] and prefetcher.take("goal", (2, ("Intro",))) is None
+        
+        # Changed inputs: a queued prefetch is cancelled, a stale one is ignored
+        release = threading.Event()
+        prefetcher.submit("busy", 1, release.wait)
+        queued = prefetcher.submit("goal", (3, ()), suggest, 3)
+        prefetcher.submit("goal", (3, ("Edited",)), suggest, 3)
+        assert queued.cancelled()
+        assert prefetcher.take("goal", (3, ("Other",))) is None
+        prefetcher.shutdown()
+        release.set()
+        assert calls == [2] and prefetcher.hits == 1 and prefetcher.misses == 2
+        
+        print("✅ Prefetcher works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Prefetcher test failed: {e}")
+        return False
+
+def test_reflection_prefetch():
+    """Test reflection prompts generated during the block are shown without a new call"""
+    try:
+        from focus_flow_agent import FocusFlowAgent
+        from models import FocusSession, Goal
+        
+        agent = FocusFlowAgent()
+        focus_session = FocusSession(
+            session_id="flow_block_1", start_time=datetime.now(), duration_minutes=25,
+            goal=Goal(description="Write the intro")
+        )
+        key = agent._reflection_key(focus_session)
+        agent.prefetcher.submit("reflection", key, lambda: {"reflection_prompt": "What slowed the intro down?"})
+        
+        def live_call(on_token):
+            raise AssertionError("prefetched reflection was not used")
+        result = agent._stream_panel(
+            "Reflection", "yellow", live_call, lambda result: result["reflection_prompt"],
+            prefetched=agent.prefetcher.take("reflection", key)
+        )
+        focus_session.reflection_prompt = result["reflection_prompt"]
+        assert focus_session.reflection_prompt == "What slowed the intro down?"
+        
+        # The prompt is UI-only: session records stay the same size in every engine
+        from serialization import session_record
+        assert "reflection_prompt" not in session_record(focus_session)
+        agent.prefetcher.shutdown()
+        
+        print("✅ Reflection prefetch works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Reflection prefetch test failed: {e}")
+        return False
+
+def test_block_plan():
+    """Test the combined block planning call and its rule-based fallback"""
+    try:
+        from nemotron_agent import NemotronAgent
+        from models import FocusSession, Goal, Reflection
+        
+        agent = NemotronAgent()
+        sent = []
+        def reply(text):
+            def make_request(messages, use_cache=True):
+                sent.append(messages)
+                return text
+            return make_request
+        
+        missed = FocusSession(
+            session_id="flow_block_1", start_time=datetime.now(), duration_minutes=25,
+            goal=Goal(description="Write the intro"),
+            reflection=Reflection(session_id="flow_block_1", goal_achieved=False)
+        )
+        agent._make_request = reply('<think>plan</think>{"duration": 20, "suggestion": "Silence your phone", "goal_prompt": "Which paragraph first?"}')
+        plan = agent.plan_block(2, [missed])
+        assert len(sent) == 1 and "Write the intro" in sent[0][-1]["content"]
+        assert plan == {"duration": 20, "suggestion": "Silence your phone",
+                        "goal_prompt": "Which paragraph first?", "success_rate": 0.0}
+        
+        # Out-of-range or unparseable replies fall back to the rules
+        for text in ['{"duration": 240, "suggestion": "x", "goal_prompt": "y"}', "Let's focus!", None]:
+            agent._make_request = reply(text)
+            plan = agent.plan_block(2, [missed])
+            assert plan["duration"] == 23 and plan["goal_prompt"] == NemotronAgent.DEFAULT_GOAL_PROMPT
+        assert agent.plan_block(1)["duration"] == 25
+        
+        # Streamed plans forward only the suggestion text as it arrives
+        raw = '{"duration": 20, "suggestion": "Say \\"no\\" to email", "goal_prompt": "Which part?"}'
+        agent.stream_request = lambda messages, use_cache=True: iter(raw[i:i + 7] for i in range(0, len(raw), 7))
+        shown = []
+        plan = agent.plan_block(2, [missed], on_token=shown.append)
+        assert "".join(shown) == 'Say "no" to email' and plan["suggestion"] == 'Say "no" to email'
+        assert plan["duration"] == 20
+        
+        print("✅ Block planning works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Block planning test failed: {e}")
+        return False
+
+def test_resilience():
+    """Test bounded retries and the circuit breaker"""
+    try:
+        import requests
+        from resilience import CircuitBreaker, CircuitOpenError, call_with_resilience
+        
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.05)
+        attempts = []
+        def flaky(timeout):
+            attempts.append(timeout)
+            if len(attempts) < 2:
+                raise requests.Timeout()
+            return "ok"
+        assert call_with_resilience(flaky, breaker, deadline=5, max_retries=2, base_delay=0.001) == "ok"
+        assert len(attempts) == 2 and breaker.state == "closed"
+        
+        # Non-retryable errors fail fast and do not count against the breaker
+        def rejected(timeout):
+            attempts.append(timeout)
+            raise ValueError("bad request")
+        for _ in range(3):
+            try:
+                call_with_resilience(rejected, breaker, deadline=5, max_retries=3, base_delay=0.001)
+            except ValueError:
+                pass
+        assert len(attempts) == 5 and breaker.state == "closed"
+        
+        # Repeated retryable failures open the circuit
+        def broken(timeout):
+            attempts.append(timeout)
+            raise requests.ConnectionError("down")
+        try:
+            call_with_resilience(broken, breaker, deadline=5, max_retries=1, base_delay=0.001)
+        except requests.ConnectionError:
+            pass
+        attempts.clear()
+        assert breaker.state == "open"
+        try:
+            call_with_resilience(flaky, breaker)
+            assert False, "open circuit should short-circuit"
+        except CircuitOpenError:
+            pass
+        assert not attempts and breaker.stats()["short_circuits"] == 1
+        
+        # An interrupted half-open trial frees the slot for the next caller
+        import time
+        time.sleep(0.06)
+        assert breaker.state == "half_open"
+        def interrupted(timeout):
+            raise KeyboardInterrupt
+        try:
+            call_with_resilience(interrupted, breaker)
+        except KeyboardInterrupt:
+            pass
+        
+        # ...so a single trial call closes it again
+        assert call_with_resilience(lambda timeout: "back", breaker) == "back"
+        assert breaker.state == "closed"
+        
+        print("✅ Resilience works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Resilience test failed: {e}")
+        return False
+
+def test_duration_model():
+    """Test the local duration model learns from outcomes and gates the LLM"""
+    try:
+        from duration_model import DurationModel
+        from adaptive_agent import AdaptiveAgent, TaskContext
+        
+        sessions = []
+        for _ in range(20):
+            # Short blocks go well when tired, long blocks when energized
+            sessions.append({"difficulty": 3, "energy_before": 1, "duration": 15, "completed": True, "focus_rating": 5})
+            sessions.append({"difficulty": 3, "energy_before": 1, "duration": 45, "completed": False, "focus_rating": 1})
+            sessions.append({"difficulty": 3, "energy_before": 5, "duration": 45, "completed": True, "focus_rating": 5})
+            sessions.append({"difficulty": 3, "energy_before": 5, "duration": 15, "completed": False, "focus_rating": 1})
+        model = DurationModel.from_sessions(sessions, exploration=0.0)
+        
+        tired = model.predict(3, 1)
+        energized = model.predict(3, 5)
+        assert tired.focus_duration == 15 and energized.focus_duration == 45
+        assert tired.confidence > 0.6 and DurationModel().predict(3, 3).confidence == 0.0
+        
+        agent = AdaptiveAgent()
+        agent.client = None
+        agent.duration_model = model
+        recommendation = agent.analyze_task_and_plan_session(
+            TaskContext(task_name="Deep work", difficulty=3, energy_level=5)
+        )
+        assert recommendation.focus_duration == 45 and recommendation.break_duration == 9
+        assert recommendation.confidence == energized.confidence
+        
+        print("✅ Duration model works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Duration model test failed: {e}")
+        return False
+
+def test_rolling_window():
+    """Test rolling weekly aggregates age sessions out as time passes"""
+    try:
+        from datetime import timedelta
+        from history_store import ColumnarHistory
+        
+        now = datetime.now()
+        history = ColumnarHistory()
+        week = history.window(timedelta(days=7).total_seconds())
+        for days_ago, completed, distractions in [(9, True, ["phone"]), (5, False, ["email", "phone"]), (1, True, ["phone"])]:
+            history.append({
+                "timestamp": (now - timedelta(days=days_ago)).isoformat(),
+                "completed": completed,
+                "duration": 25,
+                "focus_rating": 4,
+                "distractions": distractions
+            })
+        
+        totals = week.totals(now)
+        assert totals["sessions"] == 2 and totals["completed"] == 1 and totals["duration"] == 50
+        assert totals["distractions"].most_common(1) == [("phone", 2)]
+        
+        # Three days later the 5-day-old session has aged out too
+        later = week.totals(now + timedelta(days=3))
+        assert later["sessions"] == 1 and later["distractions"] == {"phone": 1}
+        
+        print("✅ Rolling window works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Rolling window test failed: {e}")
+        return False
+
+def test_distraction_classifier():
+    """Test distraction entries normalize to categories and strategies"""
+    try:
+        from datetime import timedelta
+        from distractions import DistractionClassifier, load_rules
+        from history_store import ColumnarHistory
+        
+        classifier = DistractionClassifier()
+        for entry in ["Phone", "phone notifications", "my phone", "iPhone"]:
+            assert classifier.classify(entry) == ("phone",)
+        assert classifier.classify("Slack and email") == ("messaging", "email")
+        assert classifier.classify("the weather") == ("other",)
+        assert classifier.strategies(["phone", "Phone buzzing", "noise"]) == [
+            "Put phone in another room or use Do Not Disturb",
+            "Use noise-canceling headphones or find a quieter space"
+        ]
+        
+        rules = load_rules(path="")
+        rules["gaming"] = {"patterns": ["steam", "video games?"], "strategy": "Uninstall the launcher"}
+        custom = DistractionClassifier(rules)
+        assert custom.classify("Steam sale") == ("gaming",)
+        
+        history = ColumnarHistory(classify=classifier.categorize)
+        week = history.window(timedelta(days=7).total_seconds())
+        for distractions in [["Phone"], ["my phone", "Email"], ["phone notifications"]]:
+            history.append({"timestamp": datetime.now().isoformat(), "distractions": distractions})
+        assert week.totals()["distractions"].most_common(2) == [("phone", 3), ("email", 1)]
+        
+        print("✅ Distraction classifier works correctly")
+        return True
+    except Exception as e:
+        print(f"❌ Distraction classifier test failed: {e}")
+        return False
+
 def main():
     """Run all tests"""
     print("🧪 Testing Focus Flow Agent MVP...\n")
@@ -94,7 +1214,31 @@ def main():
         test_imports,
         test_config,
         test_models,
-        test_agent_creation
+        test_agent_creation,
+        test_journal_logger,
+        test_sqlite_storage,
+        test_segmented_storage,
+        test_export_pipeline,
+        test_compaction,
+        test_write_behind_queue,
+        test_columnar_history,
+        test_serialization,
+        test_journal_index,
+        test_pattern_index,
+        test_debounced_history,
+        test_response_cache,
+        test_streaming,
+        test_json_extractor,
+        test_structured_output,
+        test_client_registry,
+        test_async_agents,
+        test_prefetcher,
+        test_reflection_prefetch,
+        test_block_plan,
+        test_resilience,
+        test_duration_model,
+        test_rolling_window,
+        test_distraction_classifier
     ]
     
     passed = 0